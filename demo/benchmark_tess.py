@@ -0,0 +1,53 @@
+#pylint: disable = wrong-import-order, wrong-import-position
+'''
+Compare the speed of the .tess parsers on the demo files, each scaled up by repeating it.
+Usage: python benchmark_tess.py [scale] [repeat]
+'''
+import os
+import sys
+from tempfile import TemporaryDirectory
+from timeit import repeat as repeat_timer
+
+import context #pylint: disable=unused-import
+from qcrit.extract_features import parse_tess, parse_tess_mmap
+
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+_PARSERS = (parse_tess, parse_tess_mmap)
+
+def _scaled_files(tmp_dir, scale):
+	#Copies of the demo files, each repeated scale times
+	file_names = []
+	for file_name in sorted(os.listdir(_CURRENT_DIR)):
+		if file_name.endswith('.tess'):
+			with open(os.path.join(_CURRENT_DIR, file_name), mode='rb') as tess_file:
+				data = tess_file.read()
+			if not data.endswith(b'\n'):
+				data += b'\n'
+			file_names.append(os.path.join(tmp_dir, file_name))
+			with open(file_names[-1], mode='wb') as tess_file:
+				tess_file.write(data * scale)
+	return file_names
+
+def _seconds(parser, file_name, repeat):
+	#The best of several runs, which is the least disturbed by other processes
+	return min(repeat_timer(lambda: parser(file_name), number=1, repeat=repeat))
+
+def main(scale=100, repeat=7):
+	with TemporaryDirectory() as tmp_dir:
+		file_names = _scaled_files(tmp_dir, scale)
+		totals = [0] * len(_PARSERS)
+		print(f'{"file":<36}{"MiB":>6}{"lines":>9}' + ''.join(f'{parser.__name__:>17}' for parser in _PARSERS))
+		for file_name in file_names:
+			assert parse_tess_mmap(file_name) == parse_tess(file_name), f'The parsers disagree on {file_name}'
+			with open(file_name, mode='rb') as tess_file:
+				num_lines = sum(1 for _ in tess_file)
+			timings = [_seconds(parser, file_name, repeat) for parser in _PARSERS]
+			totals = [total + seconds for total, seconds in zip(totals, timings)]
+			print(
+				f'{os.path.basename(file_name):<36}{os.path.getsize(file_name) / 2 ** 20:>6.1f}{num_lines:>9}'
+				+ ''.join(f'{seconds:>16.3f}s' for seconds in timings) + f'{timings[0] / timings[1]:>8.2f}x'
+			)
+		print(f'{"total":<51}' + ''.join(f'{seconds:>16.3f}s' for seconds in totals) + f'{totals[0] / totals[1]:>8.2f}x')
+
+if __name__ == '__main__':
+	main(*(int(arg) for arg in sys.argv[1:]))
@@ -11,6 +11,7 @@ import numpy as np
 
 from . import model_analyzer
 from . import color as c
+from .feature_matrix import is_matrix_file, load_matrix
 
 def _get_features(feature_data_file):
 	#Obtain features that were previously mined and serialized into a file
@@ -51,6 +52,24 @@ def _get_classifier_data(filename_to_features, filename_to_classification, file_
 	target = np.asarray(target)
 	return (data, target)
 
+def _get_matrix_classifier_data(matrix, matrix_file_names, matrix_feature_names, filename_to_classification):
+	#Select the rows of the files that have classifications, and order the rows and columns by name as is done
+	#for pickled features. Rows and columns that are already in order are used without copying the matrix
+	row_indices = sorted(
+		(i for i, file_name in enumerate(matrix_file_names) if file_name in filename_to_classification),
+		key=matrix_file_names.__getitem__
+	)
+	column_indices = sorted(range(len(matrix_feature_names)), key=matrix_feature_names.__getitem__)
+	data = matrix
+	if row_indices != list(range(len(matrix_file_names))):
+		data = data[row_indices]
+	if column_indices != list(range(len(matrix_feature_names))):
+		data = data[:, column_indices]
+	file_names = [matrix_file_names[i] for i in row_indices]
+	feature_names = [matrix_feature_names[i] for i in column_indices]
+	target = np.asarray([filename_to_classification[file_name] for file_name in file_names])
+	return data, target, file_names, feature_names
+
 #TODO unit test this
 def main(feature_data_file, classification_data_file, model_funcs=None):
 	'''Runs all decorated model analyzers'''
@@ -66,27 +85,36 @@ def main(feature_data_file, classification_data_file, model_funcs=None):
 			' are not among the decorated model analyzers in ' + str(model_analyzer.DECORATED_ANALYZERS.keys())
 		)
 
-	filename_to_features = _get_features(feature_data_file)
-
 	filename_to_classification, label_val_to_label_name = _get_file_classifications(classification_data_file)
 
-	#Filter out unused texts (i.e. features were extracted for a text, but no labels exist for it)
-	filename_to_features = {k: v for k, v in filename_to_features.items() if k in filename_to_classification}
+	if is_matrix_file(feature_data_file):
+		#Memory-map the matrix rather than rebuilding it from a dict, and leave out unused texts (i.e. features
+		#were extracted for a text, but no labels exist for it)
+		data, target, file_names, feature_names = _get_matrix_classifier_data(
+			*load_matrix(feature_data_file, mmap_mode='r'), filename_to_classification
+		)
+	else:
+		filename_to_features = _get_features(feature_data_file)
+
+		#Filter out unused texts (i.e. features were extracted for a text, but no labels exist for it)
+		filename_to_features = {k: v for k, v in filename_to_features.items() if k in filename_to_classification}
+
+		#Convert features and classifications into sorted lists
+		file_names = sorted([elem for elem in filename_to_features.keys()])
+		feature_names = sorted(
+			feature_name for feature_name in next(iter(filename_to_features.values())).keys()
+		)
+
+		data, target = _get_classifier_data(
+			filename_to_features, filename_to_classification, file_names, feature_names
+		)
 
 	#Filter out unused labels (i.e. a label exists for a file with that name but no features were extracted for it)
-	used_label_numbers = {filename_to_classification[filename] for filename in filename_to_features.keys()}
+	used_label_numbers = {filename_to_classification[filename] for filename in file_names}
 	label_val_to_label_name = OrderedDict(
 		(k, v) for k, v in label_val_to_label_name.items() if k in used_label_numbers
 	)
 
-	#Convert features and classifications into sorted lists
-	file_names = sorted([elem for elem in filename_to_features.keys()])
-	feature_names = sorted(
-		feature_name for feature_name in next(iter(filename_to_features.values())).keys()
-	)
-
-	data, target = _get_classifier_data(filename_to_features, filename_to_classification, file_names, feature_names)
-
 	from timeit import timeit
 	for funcname in model_funcs:
 		print(
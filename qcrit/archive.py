@@ -0,0 +1,128 @@
+'''
+Corpora shipped as tar (optionally compressed with gzip, bzip2 or xz) or zip archives, whose files are read
+straight from the archive instead of being extracted to disk first
+'''
+import os
+import tarfile
+import zipfile
+from time import mktime
+from hashlib import sha256
+
+from .discovery import compile_patterns, matches_pattern
+
+#Extensions of the archives that can hold a corpus
+ARCHIVE_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz', '.zip')
+
+def is_archive(path):
+	'''Whether path is a file with the extension of a tar or zip archive'''
+	return os.path.isfile(path) and path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+class CorpusArchive:
+	'''
+	A tar or zip archive holding a corpus. The files of the corpus are identified by the names of their members
+	(e.g. "texts/plato.respublica.tess"), which the archive opens as binary files.
+
+	Copying or pickling an archive (e.g. to send it to worker processes) copies its path and the list of its
+	members, and every copy opens the archive itself when a member is first opened
+	'''
+	def __init__(self, path):
+		self.path = path
+		self._archive = None
+		#Associates the names of the regular files of the archive, in the order they are stored, with their members
+		self._members = None
+
+	def __getstate__(self):
+		return {'path': self.path, 'members': self._members}
+
+	def __setstate__(self, state):
+		self.__init__(state['path'])
+		self._members = state['members']
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def _open_archive(self):
+		if zipfile.is_zipfile(self.path):
+			self._archive = zipfile.ZipFile(self.path)
+			if self._members is None:
+				self._members = {info.filename: info for info in self._archive.infolist() if not info.is_dir()}
+		else:
+			self._archive = tarfile.open(self.path)
+			if self._members is None:
+				self._members = {member.name: member for member in self._archive.getmembers() if member.isfile()}
+
+	def _members_by_name(self):
+		if self._members is None:
+			self._open_archive()
+		return self._members
+
+	def member_names(self, file_extensions, excluded_paths=frozenset(), *, include=None, exclude=None):
+		'''
+		Names of the files in the archive whose extensions are in file_extensions, in the order they are stored,
+		which is the order in which a compressed tar archive is read fastest.
+
+		excluded_paths contains names of files, and of directories (ending in /) whose files are left out.
+		include and exclude are lists of glob patterns matched against the names of the files and directories, as
+		in qcrit.discovery.discover
+		'''
+		file_extensions = set(file_extensions)
+		include_regex = compile_patterns(include)
+		exclude_regex = compile_patterns(exclude)
+		names = []
+		for name in self._members_by_name():
+			if '.' not in name or name[name.rindex('.') + 1:] not in file_extensions:
+				continue
+			if name in excluded_paths or matches_pattern(exclude_regex, name):
+				continue
+			parts = name.split('/')
+			if any(
+				'/'.join(parts[:i]) + '/' in excluded_paths or matches_pattern(exclude_regex, '/'.join(parts[:i]))
+				for i in range(1, len(parts))
+			):
+				continue
+			if include_regex is not None and not matches_pattern(include_regex, name):
+				continue
+			names.append(name)
+		return names
+
+	def open(self, name):
+		'''Open the file called name in the archive as a binary file'''
+		member = self._members_by_name()[name]
+		if self._archive is None:
+			self._open_archive()
+		if isinstance(self._archive, zipfile.ZipFile):
+			return self._archive.open(member)
+		return self._archive.extractfile(member)
+
+	def file_stat(self, name):
+		'''Size and modification time (in nanoseconds) of the file called name, or None if there is no such file'''
+		member = self._members_by_name().get(name)
+		if member is None:
+			return None
+		if isinstance(member, zipfile.ZipInfo):
+			#Zip archives record the local time, to the nearest two seconds
+			return member.file_size, int(mktime(member.date_time + (0, 0, -1))) * 10 ** 9
+		return member.size, int(member.mtime) * 10 ** 9
+
+	def file_state(self, name, previous_state=None):
+		'''The state of the file called name, like qcrit.incremental.file_state'''
+		size, mtime_ns = self.file_stat(name)
+		state = {'size': size, 'mtime_ns': mtime_ns}
+		if previous_state is not None and all(previous_state.get(key) == state[key] for key in state):
+			state['sha256'] = previous_state['sha256']
+		else:
+			digest = sha256()
+			with self.open(name) as member:
+				for block in iter(lambda: member.read(2 ** 20), b''):
+					digest.update(block)
+			state['sha256'] = digest.hexdigest()
+		return state
+
+	def close(self):
+		'''Close the archive, which is opened again if a member is opened. The names and states of its files are kept'''
+		if self._archive is not None:
+			self._archive.close()
+			self._archive = None
@@ -0,0 +1,129 @@
+'''
+Discovery of the files of a corpus, listing directories with os.scandir (in parallel if requested) and optionally
+remembering the listings in a manifest, so that later runs only list again the directories that changed
+'''
+import os
+import re
+import json
+from os.path import join, normcase
+from fnmatch import translate
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .incremental import write_atomically
+
+#Bump the version whenever the layout of the manifest changes
+_MANIFEST_VERSION = 2
+#The listing of a directory modified less than this long before it was listed is not reused, since another
+#change within the resolution of the file system's timestamps would leave the modification time unchanged
+_RACY_NANOSECONDS = 2 * 10 ** 9
+
+def compile_patterns(patterns):
+	'''A regular expression matching any of the glob patterns, or None if there are none'''
+	if not patterns:
+		return None
+	return re.compile('|'.join(f'(?:{translate(normcase(pattern))})' for pattern in patterns))
+
+def matches_pattern(regex, relative_path):
+	'''Whether relative_path matches regex, compiled by compile_patterns'''
+	return regex is not None and regex.match(normcase(relative_path)) is not None
+
+def _list_directory(path, cached_listing):
+	'''
+	Sorted names of the files and subdirectories of the directory at path, reusing cached_listing if the directory
+	was not modified since it was listed. Returns None if the directory cannot be listed
+	'''
+	try:
+		mtime_ns = os.stat(path).st_mtime_ns
+	except OSError:
+		return None
+	if (
+		cached_listing is not None and cached_listing['mtime_ns'] == mtime_ns
+		and cached_listing['listed_ns'] - mtime_ns >= _RACY_NANOSECONDS
+	):
+		return cached_listing
+	listed_ns = int(time() * 10 ** 9)
+	files = []
+	directories = []
+	try:
+		with os.scandir(path) as entries:
+			for entry in entries:
+				try:
+					is_dir = entry.is_dir()
+				except OSError:
+					is_dir = False
+				#Like os.walk, symbolic links to directories are neither files nor traversed
+				if not is_dir:
+					files.append(entry.name)
+				elif not entry.is_symlink():
+					directories.append(entry.name)
+	except OSError:
+		return None
+	return {'mtime_ns': mtime_ns, 'listed_ns': listed_ns, 'files': sorted(files), 'directories': sorted(directories)}
+
+def _read_manifest(manifest_file):
+	try:
+		with open(manifest_file, encoding='utf-8') as json_file:
+			manifest = json.load(json_file)
+	except (OSError, ValueError):
+		return {}
+	return manifest['directories'] if manifest.get('version') == _MANIFEST_VERSION else {}
+
+def discover(
+	corpus_dir, file_extensions, excluded_paths=frozenset(), *, include=None, exclude=None, jobs=1,
+	manifest_file=None
+):
+	'''
+	Sorted paths of the files in corpus_dir and its subdirectories whose extensions are in file_extensions.
+
+	excluded_paths contains paths of files, and of directories (ending in a file separator) that are not traversed.
+	include and exclude are lists of glob patterns (see fnmatch, in which * also matches file separators) matched
+	against paths relative to corpus_dir, with / separating directories. If include is given, only the files
+	matching one of its patterns are discovered. Files and directories matching a pattern of exclude are skipped.
+
+	The directories at each depth are listed by jobs threads at once, which helps on network file systems.
+	If manifest_file is given, the listing of every directory (the names of its files and subdirectories, without
+	their sizes or modification times, which a reused listing would leave stale) is written to it as JSON, and a
+	directory whose modification time has not changed since is not listed again on later runs
+	'''
+	file_extensions = set(file_extensions)
+	include_regex = compile_patterns(include)
+	exclude_regex = compile_patterns(exclude)
+	cached_listings = {} if manifest_file is None else _read_manifest(manifest_file)
+	listings = {}
+	file_names = []
+	#(path, path relative to corpus_dir) of the directories at the current depth
+	level = [(corpus_dir, '')]
+	with ThreadPoolExecutor(max_workers=jobs) as pool:
+		while level:
+			next_level = []
+			level_listings = pool.map(lambda directory: _list_directory(
+				directory[0], cached_listings.get(directory[0])
+			), level)
+			for (path, relative_path), listing in zip(level, level_listings):
+				if listing is None:
+					continue
+				listings[path] = listing
+				for name in listing['directories']:
+					if join(path, name) + os.sep in excluded_paths or matches_pattern(exclude_regex, relative_path + name):
+						continue
+					next_level.append((join(path, name), relative_path + name + '/'))
+				for name in listing['files']:
+					if '.' not in name or name[name.rindex('.') + 1:] not in file_extensions:
+						continue
+					if join(path, name) in excluded_paths or matches_pattern(exclude_regex, relative_path + name):
+						continue
+					if include_regex is not None and not matches_pattern(include_regex, relative_path + name):
+						continue
+					file_names.append(join(path, name))
+			level = next_level
+	if manifest_file is not None:
+		#Directories skipped this time (e.g. because of patterns) keep their listings, as long as they still exist
+		for path, listing in cached_listings.items():
+			if path not in listings and os.path.isdir(path):
+				listings[path] = listing
+		#Encoded as UTF-8 whatever the locale, since paths can be in any script (e.g. Greek)
+		write_atomically(manifest_file, json.dumps(
+			{'version': _MANIFEST_VERSION, 'directories': listings}, ensure_ascii=False
+		).encode('utf-8'))
+	return sorted(file_names)
@@ -0,0 +1,116 @@
+'''
+Compact, array-backed representation of a tokenized text
+'''
+from collections.abc import Sequence
+
+import numpy as np
+
+class Vocabulary:
+	'''Assigns every distinct word an integer id, so that each word is stored once per corpus'''
+	def __init__(self):
+		self.words = []
+		#Lengths of the words, in an array that is doubled in size whenever it is full, so that documents look up
+		#the lengths of their words without converting the lengths of the whole vocabulary
+		self._word_lengths = np.empty(1024, dtype=np.int32)
+		self._word_to_id = {}
+
+	def __len__(self):
+		return len(self.words)
+
+	@property
+	def word_lengths(self):
+		'''int32 array of the length in characters of the word of every id'''
+		return self._word_lengths[:len(self.words)]
+
+	def word_id(self, word):
+		'''Obtain the id of a word, assigning it a new id if it has not been seen before'''
+		word_id = self._word_to_id.get(word)
+		if word_id is None:
+			word_id = len(self.words)
+			if word_id == len(self._word_lengths):
+				self._word_lengths = np.resize(self._word_lengths, 2 * word_id)
+			self._word_to_id[word] = word_id
+			self.words.append(word)
+			self._word_lengths[word_id] = len(word)
+		return word_id
+
+class _WordsView(Sequence):
+	'''Read-only list of words whose strings are looked up in the vocabulary only when accessed'''
+	def __init__(self, vocabulary, token_ids):
+		self._words = vocabulary.words
+		self._token_ids = token_ids
+
+	def __len__(self):
+		return len(self._token_ids)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self._words[word_id] for word_id in self._token_ids[index].tolist()]
+		return self._words[self._token_ids[index]]
+
+	def __iter__(self):
+		words = self._words
+		return (words[word_id] for word_id in self._token_ids.tolist())
+
+	def __repr__(self):
+		return repr(list(self))
+
+class _SentenceWordsView(Sequence):
+	'''Read-only list of sentences, each as a lazily looked up list of words'''
+	def __init__(self, document):
+		self._document = document
+
+	def __len__(self):
+		return len(self._document.sentence_offsets) - 1
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(len(self)))]
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError('sentence index out of range')
+		offsets = self._document.sentence_offsets
+		return _WordsView(
+			self._document.vocabulary, self._document.token_ids[offsets[index]:offsets[index + 1]]
+		)
+
+	def __repr__(self):
+		return repr([list(sentence) for sentence in self])
+
+class TokenizedDocument:
+	'''
+	Words of a text as an int32 array of ids into a Vocabulary shared by the documents of a corpus.
+	The words of sentence i are token_ids[sentence_offsets[i]:sentence_offsets[i + 1]], and
+	token_lengths holds the length in characters of every word. Ids are only comparable between
+	documents that share the same vocabulary.
+	'''
+	def __init__(self, vocabulary, sentence_words):
+		self.vocabulary = vocabulary
+		token_ids = []
+		sentence_offsets = [0]
+		for sentence in sentence_words:
+			token_ids.extend(vocabulary.word_id(word) for word in sentence)
+			sentence_offsets.append(len(token_ids))
+		self.token_ids = np.array(token_ids, dtype=np.int32)
+		self.sentence_offsets = np.array(sentence_offsets, dtype=np.int32)
+		self.token_lengths = vocabulary.word_lengths[self.token_ids]
+
+	def __len__(self):
+		return len(self.token_ids)
+
+	def __sizeof__(self):
+		#The vocabulary is shared by every document of a corpus, so it is not counted
+		return object.__sizeof__(self) + sum(
+			array.nbytes for array in (self.token_ids, self.sentence_offsets, self.token_lengths)
+		)
+
+	@property
+	def words(self):
+		'''The words of every sentence of the document, in order'''
+		return _WordsView(self.vocabulary, self.token_ids)
+
+	@property
+	def sentence_words(self):
+		'''The sentences of the document, each as a list of words, like the 'sentence_words' tokenize type'''
+		return _SentenceWordsView(self)
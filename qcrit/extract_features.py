@@ -2,95 +2,515 @@
 Utilities for a feature extraction
 '''
 
-import pickle
 import os
-from os.path import join
-from io import StringIO
-import collections as clctn
+import io
+import re
+import mmap
+import codecs
+from contextlib import contextmanager
+from copy import copy
+import collections.abc as clctn
+import multiprocessing as mp
+from importlib import import_module
+import sys
+from time import perf_counter
 
 from tqdm import tqdm
 
 from . import color as c
 from . import textual_feature
+from .streaming import accumulate_features, split_text, accumulate_piece, merge_pieces
+from .profiling import Profile
+from .incremental import plan as plan_incremental, file_state, write_manifest, missing_extractions
+from .feature_matrix import read_results
+from .result_log import ResultLog, log_path, finalize, file_stat
+from .discovery import discover
+from .result_store import ResultStore, feature_hash, config_hash
+from .archive import CorpusArchive, is_archive, ARCHIVE_EXTENSIONS
+from .tei import parse_tei, parse_tei_chunks
 
-def parse_tess(file_name):
-	'''Used to parse tess tags found at the beginning of lines of .tess files'''
-	file_text = StringIO()
-	with open(file_name, mode='r', encoding='utf-8') as file:
+#The parse functions of FILE_PARSERS and FILE_CHUNK_PARSERS are given the name of a file, or a binary file object
+#(e.g. a member of an archive)
+def _open_text(file_name):
+	if isinstance(file_name, str):
+		return open(file_name, mode='r', encoding='utf-8')
+	return io.TextIOWrapper(file_name, encoding='utf-8')
+
+def parse_tess_chunks(file_name):
+	'''Yield the text of each line of a .tess file as it is read, for streaming extraction'''
+	with _open_text(file_name) as file:
 		for line in file:
 			#Ignore lines without tess tags, or parse the tag out and strip whitespace
 			if not line.startswith('<'):
 				continue
 			assert '>' in line, f'Malformed tess tag in {file_name}'
-			file_text.write(line[line.index('>') + 1:].strip())
-			file_text.write(' ')
-	return file_text.getvalue()
+			yield line[line.index('>') + 1:].strip() + ' '
+
+def parse_tess(file_name):
+	'''Used to parse tess tags found at the beginning of lines of .tess files'''
+	return ''.join(parse_tess_chunks(file_name))
+
+#The text of a tagged line without the whitespace around it, which in str patterns (unlike bytes patterns) is the
+#whitespace removed by str.strip(), or nothing for a line whose tag is not closed
+_TESS_LINE = re.compile(r'^<[^>\n]*(?:>[^\S\n]*([^\n]*\S|)|$)', re.MULTILINE)
+_MALFORMED_TESS_LINE = re.compile(r'^<[^>\n]*$', re.MULTILINE)
+
+def parse_tess_mmap(file_name):
+	'''
+	Equivalent to parse_tess, but decodes a memory map of the file at once and finds the text of all the tagged
+	lines in a single pass, instead of reading, slicing and stripping the file line by line
+	'''
+	if not isinstance(file_name, str):
+		#Files that are not on disk cannot be memory-mapped
+		text = codecs.utf_8_decode(file_name.read(), 'strict', True)[0]
+	else:
+		with open(file_name, mode='rb') as file:
+			#Empty files cannot be memory-mapped
+			if os.fstat(file.fileno()).st_size == 0:
+				return ''
+			with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+				text = codecs.utf_8_decode(buffer, 'strict', True)[0]
+	if '\r' in text:
+		#Universal newlines, as when reading in text mode
+		text = text.replace('\r\n', '\n').replace('\r', '\n')
+	lines = _TESS_LINE.findall(text)
+	#Only if the text of some line is empty can it be malformed
+	if '' in lines:
+		assert _MALFORMED_TESS_LINE.search(text) is None, f'Malformed tess tag in {file_name}'
+	if not lines:
+		return ''
+	lines.append('')
+	return ' '.join(lines)
 
 FILE_PARSERS = {
-	'tess': parse_tess,
+	'tess': parse_tess_mmap,
+	'xml': parse_tei,
+}
+
+#Parsers yielding the text of a file in chunks, which keep memory use bounded in streaming mode
+FILE_CHUNK_PARSERS = {
+	'tess': parse_tess_chunks,
+	'xml': parse_tei_chunks,
 }
 
-def _get_filenames(corpus_dir, file_extensions, excluded_paths):
+def _get_filenames(corpus_dir, file_extensions, excluded_paths, **discovery_options):
 	#Obtain all the files to parse by traversing through the corpus directory
-	file_names = []
-	for current_path, current_dir_names, current_file_names in os.walk(corpus_dir, topdown=True):
-		#Remove the excluded directories to prevent traversing into them
-		del_indexes = []
-		for i, cur_dir in enumerate(current_dir_names):
-			if join(current_path, cur_dir) + os.sep in excluded_paths:
-				del_indexes.append(i)
-		#Iterate backwards to prevent index removal issues
-		for i in range(len(del_indexes) - 1, -1, -1):
-			del current_dir_names[del_indexes[i]]
-
-		for current_file_name in current_file_names:
-			if '.' in current_file_name and current_file_name[current_file_name.rindex('.') + 1:] in file_extensions \
-			and join(current_path, current_file_name) not in excluded_paths:
-				file_names.append(join(current_path, current_file_name))
-	return sorted(file_names)
-
-def _extract_features(corpus_dir, file_extension_to_parse_function, excluded_paths, features, output_file):
-	file_names = _get_filenames(corpus_dir, file_extension_to_parse_function.keys(), excluded_paths)
+	return discover(corpus_dir, file_extensions, excluded_paths, **discovery_options)
+
+#State of a worker process during parallel extraction, assigned once by _init_worker
+_worker_parse_functions = None
+_worker_feature_tuples = None
+_worker_streaming = False
+_worker_session = None
+_worker_profile = None
+_worker_archive = None
+
+def _init_worker(
+	file_extension_to_parse_function, features, feature_modules, session, streaming, profiling, archive
+):
+	global _worker_parse_functions
+	global _worker_feature_tuples
+	global _worker_streaming
+	global _worker_session
+	global _worker_profile
+	global _worker_archive
+	#Workers that were not forked start with fresh interpreter state, so the modules declaring
+	#the features must be imported, and the session sets up its tokenizers again when it is unpickled.
+	#Forked workers inherit both.
+	for module_name in feature_modules:
+		import_module(module_name)
+	session.clear_cache()
+	#Workers report only the metrics of their own tasks
+	session.metrics.reset()
+	_worker_session = session
+	_worker_parse_functions = file_extension_to_parse_function
+	_worker_feature_tuples = [(name, textual_feature.decorated_features[name]) for name in features]
+	_worker_streaming = streaming
+	_worker_profile = Profile() if profiling else None
+	#Forked workers would otherwise share the open file of the archive, and its position, with the main process
+	_worker_archive = copy(archive)
+
+@contextmanager
+def _open_source(file_name, archive):
+	#Parse functions are given the name of the file, or the member of the archive that it names, opened as a binary
+	#file which stays open until the text has been parsed (e.g. by a parser yielding chunks while streaming)
+	if archive is None:
+		yield file_name
+	else:
+		with archive.open(file_name) as member:
+			yield member
+
+def _extract_file_features(
+	file_name, file_extension_to_parse_function, feature_tuples, streaming=False, profile=None, archive=None
+):
+	with _open_source(file_name, archive) as source:
+		return _extract_source_features(
+			file_name, source, file_extension_to_parse_function, feature_tuples, streaming, profile
+		)
+
+def _extract_source_features(
+	file_name, source, file_extension_to_parse_function, feature_tuples, streaming, profile
+):
+	file_extension = file_name[file_name.rindex('.') + 1:]
+	parse_start = perf_counter()
+	file_text = file_extension_to_parse_function[file_extension](source)
+	if profile is not None:
+		parse_seconds = perf_counter() - parse_start
+		metrics = textual_feature.current_session().metrics
+		tokenize_seconds = metrics.timer_seconds('tokenize.')
+	if streaming:
+		#Parsers that return the entire text at once still work, but do not bound memory use
+		try:
+			return accumulate_features((file_text,) if isinstance(file_text, str) else file_text, feature_tuples)
+		except Exception as exp:
+			print(f'Error while parsing {file_name}', file=sys.stderr)
+			raise exp
+	scores = {}
+	#The file is stat'ed once to identify its tokens in the memory cache, rather than once per feature
+	file_key = textual_feature._file_key(file_name)
+	for feature_name, feature_func in feature_tuples:
+		try:
+			if profile is None:
+				scores[feature_name] = feature_func(text=file_text, filepath=file_name, file_key=file_key)
+				continue
+			start = perf_counter()
+			tokenize_start = sum(metrics.timer_seconds('tokenize.').values())
+			scores[feature_name] = feature_func(text=file_text, filepath=file_name, file_key=file_key)
+			#Time spent tokenizing is attributed to the tokenize types rather than to the feature
+			profile.record_feature(feature_name, file_name, perf_counter() - start - (
+				sum(metrics.timer_seconds('tokenize.').values()) - tokenize_start
+			))
+		except Exception as exp:
+			print(f'Error while parsing {file_name}', file=sys.stderr)
+			raise exp
+	if profile is not None:
+		profile.record_file(file_name, parse_seconds, {
+			tokenize_type: seconds - tokenize_seconds.get(tokenize_type, 0)
+			for tokenize_type, seconds in metrics.timer_seconds('tokenize.').items()
+			if seconds > tokenize_seconds.get(tokenize_type, 0)
+		})
+	return scores
+
+def _extract_file_features_in_worker(file_name):
+	with _worker_session:
+		return _extract_file_features(
+			file_name, _worker_parse_functions, _worker_feature_tuples, _worker_streaming, _worker_profile,
+			_worker_archive
+		), _worker_session.metrics.pop(), None if _worker_profile is None else _worker_profile.pop()
+
+def _file_pieces(file_names, file_extension_to_parse_function, piece_size, session, archive):
+	#Yield (file name, piece, sentence spans of the piece, whether it is the last piece of the file) for the
+	#pieces of every file. Pool workers consume this generator in another thread, so the session is activated
+	#explicitly
+	for file_name in file_names:
+		file_extension = file_name[file_name.rindex('.') + 1:]
+		with _open_source(file_name, archive) as source:
+			file_text = file_extension_to_parse_function[file_extension](source)
+			with session:
+				pieces = split_text(file_text if isinstance(file_text, str) else ''.join(file_text), piece_size)
+		for i, (piece, sentence_spans) in enumerate(pieces):
+			yield file_name, piece, sentence_spans, i == len(pieces) - 1
+
+def _accumulate_file_piece(file_piece, feature_tuples):
+	file_name, piece, sentence_spans, is_last = file_piece
+	try:
+		return accumulate_piece(piece, feature_tuples, sentence_spans), is_last
+	except Exception as exp:
+		print(f'Error while parsing {file_name}', file=sys.stderr)
+		raise exp
+
+def _accumulate_file_piece_in_worker(file_piece):
+	with _worker_session:
+		return _accumulate_file_piece(file_piece, _worker_feature_tuples), _worker_session.metrics.pop(), None
+
+def _merge_worker_reports(worker_results, metrics, profile):
+	#Yield the results of worker tasks, adding the metrics and profile sent along with each to metrics and profile
+	for result, worker_metrics, worker_profile in worker_results:
+		metrics.merge(worker_metrics)
+		if worker_profile is not None:
+			profile.merge(worker_profile)
+		yield result
+
+def _merge_file_pieces(piece_results, feature_tuples):
+	#Merge the consecutive pieces of each file, yielding the features of every file in order
+	piece_states = []
+	for states, is_last in piece_results:
+		piece_states.append(states)
+		if is_last:
+			yield merge_pieces(piece_states, feature_tuples)
+			piece_states = []
+
+def _file_rows(
+	file_names, file_extension_to_parse_function, features, jobs, streaming, piece_size, session, profile,
+	archive=None
+):
+	#Yield the features of every file, in the order of file_names
 	feature_tuples = [(name, textual_feature.decorated_features[name]) for name in features]
-	text_to_features = {} #Associates file names to their respective features
+	pool = None
+	if jobs > 1:
+		#Prefer forking so that workers inherit the tokenizers and features (including lambdas and
+		#features declared in __main__) without having to pickle them
+		context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else None)
+		pool = context.Pool(
+			processes=jobs,
+			initializer=_init_worker,
+			initargs=(
+				file_extension_to_parse_function, list(features),
+				sorted({func.__module__ for _, func in feature_tuples} - {'__main__'}),
+				session, streaming, profile is not None, archive,
+			),
+		)
+		#imap yields results in the order of file_names, so output is identical to a serial run
+		if piece_size is None:
+			file_scores = _merge_worker_reports(
+				pool.imap(_extract_file_features_in_worker, file_names), session.metrics, profile
+			)
+		else:
+			file_scores = _merge_file_pieces(_merge_worker_reports(pool.imap(
+				_accumulate_file_piece_in_worker,
+				_file_pieces(file_names, file_extension_to_parse_function, piece_size, session, archive)
+			), session.metrics, profile), feature_tuples)
+	elif piece_size is not None:
+		file_scores = _merge_file_pieces((
+			_accumulate_file_piece(file_piece, feature_tuples)
+			for file_piece in _file_pieces(file_names, file_extension_to_parse_function, piece_size, session, archive)
+		), feature_tuples)
+	else:
+		file_scores = (
+			_extract_file_features(
+				file_name, file_extension_to_parse_function, feature_tuples, streaming, profile, archive
+			)
+			for file_name in file_names
+		)
+
+	#Files are tokenized lazily as the results are consumed, by the tokenizers of the session
+	with session:
+		try:
+			for scores in file_scores:
+				#Key every row with the same feature name objects so the pickled output does not depend on
+				#whether the row was computed in this process or received from a worker
+				yield {feature_name: scores[feature_name] for feature_name in features}
+		finally:
+			if pool is not None:
+				pool.terminate()
+				pool.join()
+
+#Values computed for a result store are stored in batches of at least this many files
+_STORE_BATCH_SIZE = 1000
+
+def _store_rows(store, rows, content_hashes, code_hashes, configs):
+	#Store rows, a list of (file name, dict of feature values) tuples
+	store.put(
+		(content_hashes[file_name], feature_name, code_hashes[feature_name], configs[file_name], score)
+		for file_name, scores in rows for feature_name, score in scores.items()
+	)
+
+def _print_scores(file_name, scores):
+	for feature_name, score in scores.items():
+		print(f'{file_name}, {str(feature_name)}, {c.green(str(score))}')
+
+def _extract_features(
+	corpus_dir, file_extension_to_parse_function, excluded_paths, features, output_file, jobs, streaming,
+	piece_size, session, metrics_file, profile_file, incremental, result_store, include_patterns, exclude_patterns,
+	discovery_manifest
+):
+	profile = None if profile_file is None else Profile()
+	if metrics_file is not None:
+		#Report the metrics of this run only
+		session.metrics.reset()
+	archive = CorpusArchive(corpus_dir) if is_archive(corpus_dir) else None
+	if archive is None:
+		file_names = _get_filenames(
+			corpus_dir, file_extension_to_parse_function.keys(), excluded_paths, include=include_patterns,
+			exclude=exclude_patterns, jobs=jobs, manifest_file=discovery_manifest
+		)
+		get_state = file_state
+		get_stat = file_stat
+	else:
+		#The files of an archive are extracted in the order they are stored, and named after its members
+		file_names = archive.member_names(
+			file_extension_to_parse_function.keys(), excluded_paths, include=include_patterns,
+			exclude=exclude_patterns
+		)
+		get_state = archive.file_state
+		get_stat = archive.file_stat
+	session.metrics.increment('files', len(file_names))
 	print(
 		f'Extracting features from file with extensions '
-		f'[{", ".join(file_extension_to_parse_function.keys())}] in directory {c.yellow(corpus_dir)}'
+		f'[{", ".join(file_extension_to_parse_function.keys())}] in '
+		f'{"directory" if archive is None else "archive"} {c.yellow(corpus_dir)}'
 	)
+	if incremental:
+		#Associates file names to their respective features
+		text_to_features, manifest, extractions = plan_incremental(
+			output_file, file_names, features, read_results=read_results, get_state=get_state
+		)
+		print(
+			f'Reusing the results of {len(text_to_features)} of {len(file_names)} files, and extracting '
+			f'{sum(len(group_features) * len(group_file_names) for group_features, group_file_names in extractions)}'
+			f' missing values'
+		)
+	else:
+		text_to_features = {}
+		extractions = [(list(features), file_names)]
 
-	#Feature extraction
-	for file_name in file_names if output_file is None else tqdm(file_names, dynamic_ncols=True):
-		text_to_features[file_name] = {}
-		file_extension = file_name[file_name.rindex('.') + 1:]
-		file_text = file_extension_to_parse_function[file_extension](file_name)
+	if output_file is not None or result_store is not None:
+		code_hashes = {name: feature_hash(textual_feature.decorated_features[name]) for name in features}
+	log = None
+	if output_file is not None:
+		#Results are logged as soon as they are computed, so that an interrupted extraction resumes from the log
+		log = ResultLog(log_path(output_file), code_hashes, session.tokenizer_config, get_stat=get_stat)
+		if log.completed:
+			extractions = missing_extractions(extractions, log.completed)
+			print(
+				f'Resuming from "{c.yellow(log.path)}", which holds the results of '
+				f'{len(log.completed.keys() & set(file_names))} files'
+			)
+
+	store = None if result_store is None else ResultStore(result_store)
+	if store is not None:
+		#Values are identified by the contents of the file rather than its name, so renamed files are reused too
+		content_hashes = {
+			file_name: (manifest['files'][file_name] if incremental else get_state(file_name))['sha256']
+			for _, group_file_names in extractions for file_name in group_file_names
+		}
+		extension_configs = {
+			extension: config_hash(session.tokenizer_config, parse_function)
+			for extension, parse_function in file_extension_to_parse_function.items()
+		}
+		configs = {file_name: extension_configs[file_name[file_name.rindex('.') + 1:]] for file_name in content_hashes}
+		stored_rows, extractions, reuse_report = store.plan(extractions, content_hashes, code_hashes, configs)
+		for file_name, scores in stored_rows.items():
+			text_to_features.setdefault(file_name, {}).update(scores)
+		counts = reuse_report.counts()
+		session.metrics.increment('result_store.hits', counts['reused'])
+		session.metrics.increment('result_store.misses', sum(counts.values()) - counts['reused'])
+		print(f'Values reused from, and invalidated in, the result store "{c.yellow(result_store)}":')
+		print(reuse_report.report())
 
-		for feature_name, feature_func in feature_tuples:
-			try:
-				score = feature_func(text=file_text, filepath=file_name)
-			except Exception as exp:
-				import sys #pylint:disable=import-outside-toplevel
-				print(f'Error while parsing {file_name}', file=sys.stderr)
-				raise exp
-			text_to_features[file_name][feature_name] = score
-			if output_file is None:
-				print(f'{file_name}, {str(feature_name)}, {c.green(str(score))}')
+	#Feature extraction
+	try:
+		if log is not None:
+			#Reused values are logged too, so that the log holds every result of this run
+			for file_name, scores in text_to_features.items():
+				logged = log.completed.get(file_name, {})
+				unlogged = {name: score for name, score in scores.items() if name in code_hashes and name not in logged}
+				if unlogged:
+					log.append(file_name, unlogged)
+		else:
+			#Without an output file, values reused from the result store are printed like the computed ones, in the
+			#order of the files
+			for file_name in file_names:
+				if file_name in text_to_features:
+					scores = text_to_features[file_name]
+					_print_scores(file_name, {name: scores[name] for name in features if name in scores})
+		with session.metrics.time('extract_features'):
+			for group_features, group_file_names in extractions:
+				rows = _file_rows(
+					group_file_names, file_extension_to_parse_function, group_features, jobs, streaming, piece_size,
+					session, profile, archive
+				)
+				computed = []
+				for file_name, scores in zip(group_file_names, rows if output_file is None else tqdm(
+					rows, total=len(group_file_names), dynamic_ncols=True
+				)):
+					if log is None:
+						_print_scores(file_name, scores)
+					else:
+						log.append(file_name, scores)
+					if store is not None:
+						computed.append((file_name, scores))
+						if len(computed) >= _STORE_BATCH_SIZE:
+							_store_rows(store, computed, content_hashes, code_hashes, configs)
+							computed = []
+				if store is not None:
+					_store_rows(store, computed, content_hashes, code_hashes, configs)
+	finally:
+		if store is not None:
+			store.close()
+		if log is not None:
+			log.close()
+		if archive is not None:
+			archive.close()
 
-	textual_feature.clear_cache()
+	session.clear_cache()
 
 	if output_file is not None:
 		print(f'Feature mining complete. Attempting to write feature results to "{c.yellow(output_file)}"...')
-		with open(output_file, 'wb') as pickle_file:
-			pickle_file.write(pickle.dumps(text_to_features))
+		#Rows are in the order of the names of the files, and files that no longer exist are left out
+		finalize(
+			output_file, sorted(file_names), features, feature_hashes=code_hashes,
+			tokenizer_config=session.tokenizer_config, get_stat=get_stat
+		)
+		if incremental:
+			#The manifest is written last, so that it never describes files whose results were not written
+			write_manifest(output_file, manifest)
 		print(c.green('Success!'))
 
+	if metrics_file is not None:
+		session.metrics.dump(metrics_file)
+		print(f'Wrote metrics to "{c.yellow(metrics_file)}"')
+
+	if profile is not None:
+		print('\n' + profile.report())
+		profile.dump(profile_file)
+		print(f'Wrote profile to "{c.yellow(profile_file)}"')
+
+# corpus_dir is either a directory, or a tar (optionally compressed) or zip archive (see
+# qcrit.archive.ARCHIVE_EXTENSIONS) whose files are read without extracting them to disk. The files of an archive
+# are named after its members (e.g. "texts/plato.respublica.tess"), and the parse functions are given them as
+# binary file objects instead of file names (which the parse functions of FILE_PARSERS and FILE_CHUNK_PARSERS
+# both accept)
 # Keys of file_extension_to_parse_function must not include the dot e.g. use txt not .txt
+# If output_file ends in .npy, the results are written as a float64 matrix with a row for each file and a column
+# for each feature, along with JSON lists of the file names and feature names (see qcrit.feature_matrix).
+# Otherwise they are written as a pickled dict associating file names with dicts of feature values
 # If excluded_paths is given, it must be a set and it can contain files or directories (the directories must
-# end in a file separator e.g. slash on Mac or Linux)
-#pylint: disable = too-many-branches
-def main(corpus_dir, file_extension_to_parse_function, excluded_paths=None, features=None, output_file=None):
+# end in a file separator e.g. slash on Mac or Linux). For an archive, these are the names of its members, and
+# directories end in a slash
+# If include_patterns is given, only the files matching one of its glob patterns are extracted, and files and
+# directories matching one of the glob patterns of exclude_patterns are skipped. Patterns are matched against paths
+# relative to corpus_dir (see qcrit.discovery.discover)
+# If discovery_manifest is given, the listings of the directories of the corpus are written to it, and directories
+# that have not been modified since are not listed again on later runs
+# If jobs is greater than 1, files are distributed among that many worker processes, and that many threads list the
+# directories of the corpus
+# If streaming is True, every feature must have an accumulator, and parse functions should yield the text in
+# chunks (e.g. those in FILE_CHUNK_PARSERS) so that files are never held in memory all at once
+# If piece_size is given, files are split at sentence boundaries into pieces of about that many characters, which
+# are processed separately (in parallel if jobs is greater than 1) and then merged. Every feature must then have an
+# accumulator with a merge step
+# If session is given, its tokenizers (and token cache) are used and its features are extracted by default, instead
+# of those of the current session
+# If metrics_file is given, the metrics of the session (e.g. token cache hits and misses, and the time spent on
+# each tokenize type) during the run, including those of worker processes, are written to it as JSON
+# If profile_file is given, the time spent computing each feature for each file (excluding tokenization), and
+# parsing and tokenizing each file, is written to it as JSON (see qcrit.profiling.Profile), and a report of the
+# slowest features, files, and tokenize types is printed. Profiling is not available with streaming or piece_size
+# If incremental is True, output_file may already exist, and only the values missing from it are extracted: those
+# of new features, and all features of files that are new or changed since (according to their size, modification
+# time, and content hash, recorded in a manifest next to output_file). Files that no longer exist are left out
+# If output_file is given, the features of each file are appended to a log next to it (output_file + '.log') as
+# soon as they are computed, and the log is compacted into output_file once every file is done. If the extraction
+# is interrupted, running it again with the same output_file only extracts the features missing from the log
+# If result_store is given, it is the path of an sqlite database in which every computed value is stored, keyed by
+# the content hash of the file, the name of the feature, a hash of the code of the feature (see
+# qcrit.result_store.feature_hash), and a hash of the tokenizer configuration and parse function. Stored values are
+# reused while all of these match, and a report of the values reused and invalidated is printed
+#pylint: disable = too-many-branches, too-many-statements
+def main(
+	corpus_dir, file_extension_to_parse_function, excluded_paths=None, features=None, output_file=None, jobs=None,
+	streaming=False, piece_size=None, session=None, metrics_file=None, profile_file=None, incremental=False,
+	result_store=None, include_patterns=None, exclude_patterns=None, discovery_manifest=None
+):
 	'''Run feature extraction on all decorated features'''
 	if excluded_paths is None: excluded_paths = set()
-	if features is None: features = textual_feature.decorated_features.keys()
+	if session is None: session = textual_feature.current_session()
+	if not isinstance(session, textual_feature.ExtractionSession):
+		raise ValueError('The session must be an instance of ExtractionSession, or None')
+	if features is None:
+		features = textual_feature.decorated_features.keys() if session.features is None else session.features
+	if jobs is None: jobs = 1
 
 	if not corpus_dir: raise ValueError('Must provide a directory that contains the corpus')
 	if not file_extension_to_parse_function or not isinstance(file_extension_to_parse_function, clctn.Mapping):
@@ -109,9 +529,12 @@ def main(corpus_dir, file_extension_to_parse_function, excluded_paths=None, feat
 			f'No features were provided. Ensure you have declared and annotated '
 			f'them with the decorator @textual_feature before calling this function'
 		)
-	if not os.path.isdir(corpus_dir): raise ValueError(f'Path "{corpus_dir}" is not a valid directory')
+	if not os.path.isdir(corpus_dir) and not is_archive(corpus_dir):
+		raise ValueError(
+			f'Path "{corpus_dir}" is not a valid directory, or an archive with one of the extensions {ARCHIVE_EXTENSIONS}'
+		)
 	if not isinstance(excluded_paths, set): raise ValueError('Excluded paths must be in a set')
-	if not all(os.path.isfile(path) or os.path.isdir(path) for path in excluded_paths):
+	if not is_archive(corpus_dir) and not all(os.path.isfile(path) or os.path.isdir(path) for path in excluded_paths):
 		raise ValueError(f'Each path in {str(excluded_paths)} must be a valid path for a file or directory!')
 	if not all(name in textual_feature.decorated_features.keys() for name in features):
 		raise ValueError(
@@ -119,14 +542,82 @@ def main(corpus_dir, file_extension_to_parse_function, excluded_paths=None, feat
 			f'are not among the decorated features in {str(textual_feature.decorated_features.keys())}'
 		)
 
+	if not isinstance(incremental, bool): raise ValueError('Incremental must be True or False')
 	if output_file:
 		if not isinstance(output_file, str): raise ValueError('Output file must be a string for a file path')
-		if os.path.isfile(output_file): raise ValueError(f'Output file "{output_file}" already exists!')
+		if os.path.isfile(output_file) and not incremental:
+			raise ValueError(f'Output file "{output_file}" already exists!')
 		if os.path.isdir(output_file):
 			raise ValueError(f'The end of the path "{output_file}" is a directory - please specify a filename')
 		if os.sep in output_file and not os.path.isdir(os.path.dirname(output_file)):
 			raise ValueError(f'"{os.path.dirname(output_file)}" is not a valid directory!')
 	elif output_file is not None: raise ValueError('Output file must be truthy, or None')
+	elif incremental: raise ValueError('Incremental extraction requires an output file')
+	if metrics_file:
+		if not isinstance(metrics_file, str): raise ValueError('Metrics file must be a string for a file path')
+		if os.path.isdir(metrics_file):
+			raise ValueError(f'The end of the path "{metrics_file}" is a directory - please specify a filename')
+		if os.sep in metrics_file and not os.path.isdir(os.path.dirname(metrics_file)):
+			raise ValueError(f'"{os.path.dirname(metrics_file)}" is not a valid directory!')
+	elif metrics_file is not None: raise ValueError('Metrics file must be truthy, or None')
+	if profile_file:
+		if not isinstance(profile_file, str): raise ValueError('Profile file must be a string for a file path')
+		if os.path.isdir(profile_file):
+			raise ValueError(f'The end of the path "{profile_file}" is a directory - please specify a filename')
+		if os.sep in profile_file and not os.path.isdir(os.path.dirname(profile_file)):
+			raise ValueError(f'"{os.path.dirname(profile_file)}" is not a valid directory!')
+		if streaming or piece_size is not None:
+			raise ValueError('Features cannot be profiled separately when streaming or splitting files into pieces')
+	elif profile_file is not None: raise ValueError('Profile file must be truthy, or None')
+	if result_store:
+		if not isinstance(result_store, str): raise ValueError('Result store must be a string for a file path')
+		if os.path.isdir(result_store):
+			raise ValueError(f'The end of the path "{result_store}" is a directory - please specify a filename')
+		if os.sep in result_store and not os.path.isdir(os.path.dirname(result_store)):
+			raise ValueError(f'"{os.path.dirname(result_store)}" is not a valid directory!')
+	elif result_store is not None: raise ValueError('Result store must be truthy, or None')
+	for patterns in (include_patterns, exclude_patterns):
+		if patterns is not None and (
+			isinstance(patterns, str) or not isinstance(patterns, clctn.Iterable)
+			or not all(isinstance(pattern, str) for pattern in patterns)
+		):
+			raise ValueError('Include and exclude patterns must be collections of strings, or None')
+	if discovery_manifest:
+		if not isinstance(discovery_manifest, str):
+			raise ValueError('Discovery manifest must be a string for a file path')
+		if os.path.isdir(discovery_manifest):
+			raise ValueError(f'The end of the path "{discovery_manifest}" is a directory - please specify a filename')
+		if os.sep in discovery_manifest and not os.path.isdir(os.path.dirname(discovery_manifest)):
+			raise ValueError(f'"{os.path.dirname(discovery_manifest)}" is not a valid directory!')
+	elif discovery_manifest is not None: raise ValueError('Discovery manifest must be truthy, or None')
+	if discovery_manifest and is_archive(corpus_dir):
+		raise ValueError('The files of an archive are listed from the archive itself, without a discovery manifest')
+
+	if not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1:
+		raise ValueError('The number of jobs must be a positive integer, or None')
+	if not isinstance(streaming, bool): raise ValueError('Streaming must be True or False')
+	if streaming:
+		features_without_accumulators = [
+			name for name in features if textual_feature.decorated_features[name].accumulator is None
+		]
+		if features_without_accumulators:
+			raise ValueError(
+				f'Streaming requires every feature to have an accumulator. '
+				f'The following features do not: {features_without_accumulators}'
+			)
+	if piece_size is not None:
+		if not isinstance(piece_size, int) or isinstance(piece_size, bool) or piece_size < 1:
+			raise ValueError('The piece size must be a positive integer, or None')
+		if streaming: raise ValueError('Files cannot be both streamed and split into pieces')
+		features_without_merge = [
+			name for name in features if textual_feature.decorated_features[name].accumulator is None
+			or textual_feature.decorated_features[name].accumulator.merge is None
+		]
+		if features_without_merge:
+			raise ValueError(
+				f'Splitting files into pieces requires every feature to have an accumulator with a merge step. '
+				f'The following features do not: {features_without_merge}'
+			)
 
 	from timeit import timeit
 	from functools import partial
@@ -135,7 +626,8 @@ def main(corpus_dir, file_extension_to_parse_function, excluded_paths=None, feat
 			'Feature mining elapsed time: ' + '%.4f' % timeit(
 				partial(
 					_extract_features, corpus_dir, file_extension_to_parse_function,
-					excluded_paths, features, output_file
+					excluded_paths, features, output_file, jobs, streaming, piece_size, session, metrics_file,
+					profile_file, incremental, result_store, include_patterns, exclude_patterns, discovery_manifest
 				),
 				number=1
 			) + ' seconds'
@@ -0,0 +1,82 @@
+'''
+Columnar output of a feature extraction: a contiguous float64 matrix with a row for each file and a column for
+each feature, saved in .npy format, along with JSON files listing the file names of the rows and the feature
+names of the columns. Unlike a pickled dict of dicts, the matrix can be memory-mapped and used as it is
+'''
+import os
+import io
+import json
+import pickle
+
+import numpy as np
+
+from .incremental import write_atomically
+
+MATRIX_EXTENSION = 'npy'
+
+def is_matrix_file(file_path):
+	'''Whether results are written to (or read from) file_path as a matrix rather than a pickled dict'''
+	return str(file_path).endswith(os.extsep + MATRIX_EXTENSION)
+
+def rows_path(matrix_file):
+	'''Path of the JSON list of the file names of the rows of matrix_file'''
+	return f'{matrix_file}{os.extsep}rows{os.extsep}json'
+
+def columns_path(matrix_file):
+	'''Path of the JSON list of the feature names of the columns of matrix_file'''
+	return f'{matrix_file}{os.extsep}columns{os.extsep}json'
+
+def write_matrix(matrix_file, text_to_features, feature_names):
+	'''
+	Write text_to_features (associating file names with dicts of feature values) as a matrix whose rows are in
+	the order of its file names and whose columns are in the order of feature_names, along with the index files
+	'''
+	feature_names = list(feature_names)
+	try:
+		matrix = np.fromiter(
+			(row[name] for row in text_to_features.values() for name in feature_names), dtype=np.float64,
+			count=len(text_to_features) * len(feature_names)
+		).reshape(len(text_to_features), len(feature_names))
+	except (TypeError, ValueError) as exp:
+		raise ValueError('Only features whose values are numbers can be written as a matrix') from exp
+	matrix_data = io.BytesIO()
+	np.save(matrix_data, matrix, allow_pickle=False)
+	#The matrix is written last, and load_matrix checks that the index files agree with it
+	#The index files are encoded as UTF-8 whatever the locale, since file names can be in any script (e.g. Greek)
+	write_atomically(rows_path(matrix_file), json.dumps(list(text_to_features), ensure_ascii=False).encode('utf-8'))
+	write_atomically(columns_path(matrix_file), json.dumps(feature_names, ensure_ascii=False).encode('utf-8'))
+	write_atomically(matrix_file, matrix_data.getbuffer())
+
+def load_matrix(matrix_file, mmap_mode='r'):
+	'''
+	Load a matrix written by write_matrix, memory-mapped according to mmap_mode (see numpy.load). Returns the
+	matrix, the list of the file names of its rows, and the list of the feature names of its columns
+	'''
+	matrix = np.load(matrix_file, mmap_mode=mmap_mode, allow_pickle=False)
+	with open(rows_path(matrix_file), mode='r', encoding='utf-8') as rows_file:
+		file_names = json.load(rows_file)
+	with open(columns_path(matrix_file), mode='r', encoding='utf-8') as columns_file:
+		feature_names = json.load(columns_file)
+	if matrix.shape != (len(file_names), len(feature_names)):
+		raise ValueError(
+			f'The matrix in "{matrix_file}" has shape {matrix.shape}, but its index files list '
+			f'{len(file_names)} rows and {len(feature_names)} columns'
+		)
+	return matrix, file_names, feature_names
+
+def write_results(output_file, text_to_features, feature_names):
+	'''Write the results of a feature extraction as a matrix if output_file ends in .npy, or else as a pickle'''
+	if is_matrix_file(output_file):
+		write_matrix(output_file, text_to_features, feature_names)
+	else:
+		write_atomically(output_file, pickle.dumps(text_to_features))
+
+def read_results(output_file):
+	'''Read the results written by write_results as a dict associating file names with dicts of feature values'''
+	if not is_matrix_file(output_file):
+		with open(output_file, mode='rb') as pickle_file:
+			return pickle.load(pickle_file)
+	matrix, file_names, feature_names = load_matrix(output_file)
+	return {
+		file_name: dict(zip(feature_names, row)) for file_name, row in zip(file_names, matrix.tolist())
+	}
@@ -1,133 +1,199 @@
-# pylint: disable = missing-docstring
+# pylint: disable = missing-docstring, unused-argument
 '''
 Language-independent features
 '''
 
 import re
-from statistics import mean, StatisticsError
 from collections import Counter
 from string import punctuation
 from math import nan
 
-from ..textual_feature import textual_feature
+import numpy as np
+
+from ..textual_feature import textual_feature, register_artifact, counting_accumulator, count_chars
 
 _WORD_REGEX = re.compile(r'^\w+$')
 _DEGENERATE_PLACEHOLDER = '@'
 assert not _WORD_REGEX.match(_DEGENERATE_PLACEHOLDER) and len(_DEGENERATE_PLACEHOLDER) >= 1
 
-@textual_feature(tokenize_type='sentence_words')
-def average_sentence_length(text):
-	try:
-		return mean(sum(len(word) for word in sentence) for sentence in text)
-	except StatisticsError:
+def _first_word(sentence):
+	#First word token of a sentence, or the placeholder for sentences with only non-words
+	return next((word for word in sentence if _WORD_REGEX.match(word)), _DEGENERATE_PLACEHOLDER)
+
+def _last_word(sentence):
+	#Last word token of a sentence, or the placeholder for sentences with only non-words
+	return next((word for word in reversed(sentence) if _WORD_REGEX.match(word)), _DEGENERATE_PLACEHOLDER)
+
+register_artifact('first_word_per_sentence', source='sentence_words', func=lambda sentences: [
+	_first_word(sentence) for sentence in sentences
+])
+register_artifact('last_word_per_sentence', source='sentence_words', func=lambda sentences: [
+	_last_word(sentence) for sentence in sentences
+])
+
+def _word_char_histogram(word_counts):
+	#Distinct characters (as code points) of all words, and how often each occurs, weighting every distinct
+	#word by its number of occurrences
+	if not word_counts:
+		return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int64)
+	words = list(word_counts)
+	code_points = np.frombuffer(''.join(words).encode('utf-32-le', errors='surrogatepass'), dtype=np.uint32)
+	occurrences = np.repeat(
+		np.fromiter((word_counts[word] for word in words), dtype=np.int64, count=len(words)),
+		np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+	)
+	chars, inverse = np.unique(code_points, return_inverse=True)
+	return chars, np.bincount(inverse, weights=occurrences, minlength=len(chars)).astype(np.int64)
+
+def _word_type_arrays(word_counts):
+	#Lengths and numbers of occurrences of the distinct words matching _WORD_REGEX
+	words = [word for word in word_counts if _WORD_REGEX.match(word)]
+	return (
+		np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words)),
+		np.fromiter((word_counts[word] for word in words), dtype=np.int64, count=len(words)),
+	)
+
+register_artifact('word_char_histogram', source='word_counts', func=_word_char_histogram)
+register_artifact('word_type_arrays', source='word_counts', func=_word_type_arrays)
+
+def _word_counts_accumulator(finalize):
+	#The word counts of the pieces of a text are summed, and finalize computes the feature from the total
+	return counting_accumulator((Counter(),), lambda word_counts: (word_counts,), finalize)
+
+def _char_class_count(word_char_histogram, char_class):
+	chars, counts = word_char_histogram
+	in_class = np.fromiter((char_class(chr(char)) for char in chars.tolist()), dtype=bool, count=len(chars))
+	return int(counts[in_class].sum())
+
+def _mean(total, num):
+	#Same result as statistics.mean of num integers summing to total, which is an integer when it is exact
+	if not num:
 		return 0
+	return total // num if total % num == 0 else total / num
+
+@textual_feature(tokenize_type='sentence_words', accumulator=counting_accumulator(
+	(0, 0), lambda text: (sum(len(word) for sentence in text for word in sentence), len(text)), _mean
+))
+def average_sentence_length(text, sentence_char_lengths):
+	return _mean(int(np.sum(sentence_char_lengths, dtype=np.int64)), len(sentence_char_lengths))
 
-@textual_feature(tokenize_type='words')
-def ratio_capital_to_lowercase(text):
-	capital_cnt = sum(1 for word in text for letter in word if letter.isupper())
-	lowercase_cnt = sum(1 for word in text for letter in word if letter.islower())
+def _ratio_capital_to_lowercase(word_char_histogram):
+	capital_cnt = _char_class_count(word_char_histogram, str.isupper)
+	lowercase_cnt = _char_class_count(word_char_histogram, str.islower)
 	return capital_cnt / lowercase_cnt if lowercase_cnt else nan
 
-@textual_feature(tokenize_type='words')
-def ratio_lowercase_to_totalchars(text):
-	lowercase_cnt = sum(1 for word in text for letter in word if letter.islower())
-	total_cnt = sum(len(word) for word in text)
+@textual_feature(tokenize_type='word_counts', accumulator=_word_counts_accumulator(
+	lambda word_counts: _ratio_capital_to_lowercase(_word_char_histogram(word_counts))
+))
+def ratio_capital_to_lowercase(text, word_char_histogram):
+	return _ratio_capital_to_lowercase(word_char_histogram)
+
+def _ratio_lowercase_to_totalchars(word_char_histogram):
+	lowercase_cnt = _char_class_count(word_char_histogram, str.islower)
+	total_cnt = int(word_char_histogram[1].sum())
 	return lowercase_cnt / total_cnt if total_cnt else 0
 
-@textual_feature(tokenize_type=None)
-def ratio_punctuation_to_spaces(text):
-	punctuation_cnt = sum(text.count(punc) for punc in f'{punctuation}‘’“”') #include slant quotes
-	space_cnt = text.count(' ')
+@textual_feature(tokenize_type='word_counts', accumulator=_word_counts_accumulator(
+	lambda word_counts: _ratio_lowercase_to_totalchars(_word_char_histogram(word_counts))
+))
+def ratio_lowercase_to_totalchars(text, word_char_histogram):
+	return _ratio_lowercase_to_totalchars(word_char_histogram)
+
+_PUNCTUATION = f'{punctuation}‘’“”' #include slant quotes
+
+def _punctuation_and_space_counts(char_counts):
+	return sum(char_counts[punc] for punc in _PUNCTUATION), char_counts[' ']
+
+def _ratio_punctuation_to_spaces(punctuation_cnt, space_cnt):
 	return punctuation_cnt / space_cnt if space_cnt else nan
 
-@textual_feature(tokenize_type='words')
-def mean_word_length(text):
-	try:
-		return mean(len(word) for word in text if _WORD_REGEX.match(word))
-	except StatisticsError:
-		return 0
+@textual_feature(tokenize_type=None, accumulator=counting_accumulator(
+	(0, 0), lambda text: _punctuation_and_space_counts(count_chars(text)), _ratio_punctuation_to_spaces
+))
+def ratio_punctuation_to_spaces(text, char_counts):
+	return _ratio_punctuation_to_spaces(*_punctuation_and_space_counts(char_counts))
+
+def _mean_word_length(word_type_arrays):
+	lengths, counts = word_type_arrays
+	return _mean(int(np.dot(lengths, counts)), int(counts.sum()))
+
+@textual_feature(tokenize_type='word_counts', accumulator=_word_counts_accumulator(
+	lambda word_counts: _mean_word_length(_word_type_arrays(word_counts))
+))
+def mean_word_length(text, word_type_arrays):
+	return _mean_word_length(word_type_arrays)
 
-def _sentence_boundary_counter_helper(generator, sentence_cnt):
-	counts = Counter(generator)
+def _sentence_boundary_counter_helper(counts, sentence_cnt):
+	#counts associates words (or letters) with the number of sentences they start or end
 	sent_cnt_with_only_non_words = counts[_DEGENERATE_PLACEHOLDER]
-	del counts[_DEGENERATE_PLACEHOLDER] #remove placeholder for sentences with only non-words
 	return (
-		counts.most_common(1)[0][1] / (sentence_cnt - sent_cnt_with_only_non_words)
+		max(count for word, count in counts.items() if word != _DEGENERATE_PLACEHOLDER) /
+		(sentence_cnt - sent_cnt_with_only_non_words)
 		if sentence_cnt - sent_cnt_with_only_non_words else 0
 	)
 
-@textual_feature(tokenize_type='sentence_words')
-def freq_most_frequent_start_word(text):
-	return _sentence_boundary_counter_helper(
-		(
-			#Search forward for first word token in sentence
-			next((word for word in sentence if _WORD_REGEX.match(word)), _DEGENERATE_PLACEHOLDER)
-			for sentence in text
-		),
-		len(text)
+def _sentence_boundary_accumulator(boundary):
+	#Counts the result of boundary(sentence) for every sentence, as well as the number of sentences
+	return counting_accumulator(
+		(Counter(), 0), lambda text: (Counter(boundary(sentence) for sentence in text), len(text)),
+		_sentence_boundary_counter_helper
 	)
 
-@textual_feature(tokenize_type='sentence_words')
-def freq_most_frequent_stop_word(text):
-	return _sentence_boundary_counter_helper(
-		(
-			#Search backward for last word token in sentence
-			next((word for word in reversed(sentence) if _WORD_REGEX.match(word)), _DEGENERATE_PLACEHOLDER)
-			for sentence in text
-		),
-		len(text)
+@textual_feature(tokenize_type='sentence_words', accumulator=_sentence_boundary_accumulator(_first_word))
+def freq_most_frequent_start_word(text, first_word_per_sentence):
+	return _sentence_boundary_counter_helper(Counter(first_word_per_sentence), len(text))
+
+@textual_feature(tokenize_type='sentence_words', accumulator=_sentence_boundary_accumulator(_last_word))
+def freq_most_frequent_stop_word(text, last_word_per_sentence):
+	return _sentence_boundary_counter_helper(Counter(last_word_per_sentence), len(text))
+
+@textual_feature(tokenize_type='sentence_words', accumulator=_sentence_boundary_accumulator(
+	lambda sentence: _first_word(sentence)[0].lower()
+))
+def freq_most_frequent_start_letter_start_word(text, first_word_per_sentence):
+	return _sentence_boundary_counter_helper(Counter(word[0].lower() for word in first_word_per_sentence), len(text))
+
+@textual_feature(tokenize_type='sentence_words', accumulator=_sentence_boundary_accumulator(
+	lambda sentence: _last_word(sentence)[0].lower()
+))
+def freq_most_frequent_start_letter_stop_word(text, last_word_per_sentence):
+	return _sentence_boundary_counter_helper(Counter(word[0].lower() for word in last_word_per_sentence), len(text))
+
+def _word_type_frequency(word_type_arrays, select):
+	#Number of occurrences of the words selected by select(lengths, counts), out of all occurrences of words
+	lengths, counts = word_type_arrays
+	total = int(counts.sum())
+	return int(counts[select(lengths, counts)].sum()) / total if total else 0
+
+def _word_type_frequency_accumulator(select):
+	return _word_counts_accumulator(
+		lambda word_counts: _word_type_frequency(_word_type_arrays(word_counts), select)
 	)
 
-@textual_feature(tokenize_type='sentence_words')
-def freq_most_frequent_start_letter_start_word(text):
-	return _sentence_boundary_counter_helper(
-		(
-			next((word for word in sentence if _WORD_REGEX.match(word)), _DEGENERATE_PLACEHOLDER)[0].lower()
-			for sentence in text
-		),
-		len(text)
-	)
+def _single_occurrence(lengths, counts):
+	return counts == 1
 
-@textual_feature(tokenize_type='sentence_words')
-def freq_most_frequent_start_letter_stop_word(text):
-	return _sentence_boundary_counter_helper(
-		(
-			next((
-				word for word in reversed(sentence) if _WORD_REGEX.match(word)
-			), _DEGENERATE_PLACEHOLDER)[0].lower()
-			for sentence in text
-		),
-		len(text)
-	)
+def _double_occurrence(lengths, counts):
+	return counts == 2
 
-@textual_feature(tokenize_type='words')
-def freq_single_occurrence_words(text):
-	counts = Counter(word for word in text if _WORD_REGEX.match(word))
-	total = sum(counts.values())
-	return sum(freq for _, freq in counts.items() if freq == 1) / total if total else 0
-
-@textual_feature(tokenize_type='words')
-def freq_double_occurrence_words(text):
-	counts = Counter(word for word in text if _WORD_REGEX.match(word))
-	total = sum(counts.values())
-	return sum(freq for _, freq in counts.items() if freq == 2) / total if total else 0
-
-@textual_feature(tokenize_type='words')
-def freq_words_with_word_length_three(text):
-	counts = Counter(
-		'invalid_word_placeholder' if not _WORD_REGEX.match(word) else
-		'valid_word_invalid_len_placeholder' if len(word) != 3 else
-		'valid_word_valid_len_placeholder' for word in text
-	)
-	valid_word_cnt = len(text) - counts['invalid_word_placeholder']
-	return counts['valid_word_valid_len_placeholder'] / valid_word_cnt if valid_word_cnt else 0
-
-@textual_feature(tokenize_type='words')
-def freq_words_in_interval_word_length_4_6_inclusive(text):
-	counts = Counter(
-		'invalid_word_placeholder' if not _WORD_REGEX.match(word) else
-		'valid_word_invalid_len_placeholder' if not 4 <= len(word) <= 6 else
-		'valid_word_valid_len_placeholder' for word in text
-	)
-	valid_word_cnt = len(text) - counts['invalid_word_placeholder']
-	return counts['valid_word_valid_len_placeholder'] / valid_word_cnt if valid_word_cnt else 0
+def _length_three(lengths, counts):
+	return lengths == 3
+
+def _length_4_6_inclusive(lengths, counts):
+	return (lengths >= 4) & (lengths <= 6)
+
+@textual_feature(tokenize_type='word_counts', accumulator=_word_type_frequency_accumulator(_single_occurrence))
+def freq_single_occurrence_words(text, word_type_arrays):
+	return _word_type_frequency(word_type_arrays, _single_occurrence)
+
+@textual_feature(tokenize_type='word_counts', accumulator=_word_type_frequency_accumulator(_double_occurrence))
+def freq_double_occurrence_words(text, word_type_arrays):
+	return _word_type_frequency(word_type_arrays, _double_occurrence)
+
+@textual_feature(tokenize_type='word_counts', accumulator=_word_type_frequency_accumulator(_length_three))
+def freq_words_with_word_length_three(text, word_type_arrays):
+	return _word_type_frequency(word_type_arrays, _length_three)
+
+@textual_feature(tokenize_type='word_counts', accumulator=_word_type_frequency_accumulator(_length_4_6_inclusive))
+def freq_words_in_interval_word_length_4_6_inclusive(text, word_type_arrays):
+	return _word_type_frequency(word_type_arrays, _length_4_6_inclusive)
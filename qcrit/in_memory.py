@@ -0,0 +1,149 @@
+'''
+Feature extraction from texts held in memory (e.g. read from a database), given as (document id, text) pairs,
+without writing them to files or parsing them
+'''
+from collections import deque
+from itertools import islice
+from importlib import import_module
+import multiprocessing as mp
+import sys
+
+import numpy as np
+
+from . import textual_feature
+
+#Rows of the matrix of extract_matrix are allocated this many at a time
+_BLOCK_ROWS = 4096
+
+def _text_key(document_id):
+	#Tokens are cached in memory under a name that no file can have (it contains a null character, so that
+	#textual_feature._file_key does not look for a file), and are removed once the features of the text are computed
+	return f'\0text:{document_id}'
+
+def _extract_text_features(document_id, text, feature_tuples, session):
+	key = _text_key(document_id)
+	file_key = textual_feature._file_key(key)
+	try:
+		return {
+			name: feature(text=text, filepath=key, session=session, file_key=file_key) for name, feature in feature_tuples
+		}
+	except Exception as exp:
+		print(f'Error while extracting the features of text {document_id!r}', file=sys.stderr)
+		raise exp
+	finally:
+		session.memory_cache.remove_if(lambda cache_key: cache_key[1] == key)
+
+#State of a worker process during parallel extraction, assigned once by _init_worker
+_worker_feature_tuples = None
+_worker_session = None
+
+def _init_worker(features, feature_modules, session):
+	global _worker_feature_tuples
+	global _worker_session
+	#As in qcrit.extract_features, workers that were not forked import the modules declaring the features
+	for module_name in feature_modules:
+		import_module(module_name)
+	session.clear_cache()
+	session.metrics.reset()
+	_worker_session = session
+	_worker_feature_tuples = session.feature_tuples(features)
+
+def _extract_batch_in_worker(batch):
+	with _worker_session:
+		return [
+			_extract_text_features(document_id, text, _worker_feature_tuples, _worker_session)
+			for document_id, text in batch
+		], _worker_session.metrics.pop()
+
+def _serial_rows(texts, feature_tuples, session):
+	with session:
+		for document_id, text in texts:
+			yield document_id, _extract_text_features(document_id, text, feature_tuples, session)
+
+def _parallel_rows(texts, feature_tuples, session, jobs, batch_size):
+	#Texts are sent to the workers in batches, at most two per worker at a time, so that the texts are read from
+	#the iterable only as fast as the workers compute their features
+	context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else None)
+	pool = context.Pool(processes=jobs, initializer=_init_worker, initargs=(
+		[name for name, _ in feature_tuples],
+		sorted({feature.__module__ for _, feature in feature_tuples} - {'__main__'}),
+		session,
+	))
+	texts = iter(texts)
+	pending = deque()
+	try:
+		while True:
+			while len(pending) < 2 * jobs:
+				batch = list(islice(texts, batch_size))
+				if not batch:
+					break
+				pending.append(([document_id for document_id, _ in batch], pool.apply_async(
+					_extract_batch_in_worker, (batch,)
+				)))
+			if not pending:
+				break
+			document_ids, result = pending.popleft()
+			rows, worker_metrics = result.get()
+			session.metrics.merge(worker_metrics)
+			yield from zip(document_ids, rows)
+	finally:
+		pool.terminate()
+		pool.join()
+
+def extract_text_features(texts, features=None, *, session=None, jobs=1, batch_size=64):
+	'''
+	Iterator over (document id, dict associating the name of each feature with its value) for each
+	(document id, text) pair of texts, in order. texts can be any iterable, such as a generator over the rows of a
+	database, and is read lazily, only as fast as the features are computed, so it is never held in memory at once.
+
+	features lists the names of the decorated features to compute, by default those of the session (see
+	ExtractionSession.features). The tokens of each text are shared by its features as with files, through the
+	memory cache and the token cache of session (by default the current session, see current_session()).
+
+	If jobs is greater than 1, texts are distributed among that many worker processes in batches of batch_size
+	'''
+	if not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1:
+		raise ValueError('The number of jobs must be a positive integer')
+	if not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1:
+		raise ValueError('The batch size must be a positive integer')
+	if session is None:
+		session = textual_feature.current_session()
+	if not session.word_tokenizer or not session.sentence_tokenizer:
+		raise ValueError(
+			'Tokenizers not initialized: Use "setup_tokenizers(terminal_punctuation=<tuple of punctutation>)" '
+			'before extracting features'
+		)
+	feature_tuples = session.feature_tuples(None if features is None else list(features))
+	if not feature_tuples:
+		raise ValueError('Feature list cannot be empty')
+	#Arguments are checked right away, while texts are only read as the rows are
+	if jobs > 1:
+		return _parallel_rows(texts, feature_tuples, session, jobs, batch_size)
+	return _serial_rows(texts, feature_tuples, session)
+
+def extract_matrix(texts, features=None, *, session=None, jobs=1, batch_size=64):
+	'''
+	Compute the features of texts, (document id, text) pairs, as extract_text_features does. Returns a float64
+	matrix with a row for each text and a column for each feature, the list of the document ids of its rows,
+	and the list of the feature names of its columns, like qcrit.feature_matrix.load_matrix
+	'''
+	if session is None:
+		session = textual_feature.current_session()
+	feature_names = [name for name, _ in session.feature_tuples(None if features is None else list(features))]
+	rows = extract_text_features(texts, feature_names, session=session, jobs=jobs, batch_size=batch_size)
+	#Rows are written into blocks as they are computed, so only the values of the features are held in memory
+	blocks = []
+	document_ids = []
+	for document_id, values in rows:
+		if len(document_ids) % _BLOCK_ROWS == 0:
+			blocks.append(np.empty((_BLOCK_ROWS, len(feature_names)), dtype=np.float64))
+		try:
+			blocks[-1][len(document_ids) % _BLOCK_ROWS] = [values[name] for name in feature_names]
+		except (TypeError, ValueError) as exp:
+			rows.close()
+			raise ValueError('Only features whose values are numbers can be written as a matrix') from exp
+		document_ids.append(document_id)
+	if not blocks:
+		return np.empty((0, len(feature_names)), dtype=np.float64), document_ids, feature_names
+	blocks[-1] = blocks[-1][:len(document_ids) - (len(blocks) - 1) * _BLOCK_ROWS]
+	return np.concatenate(blocks), document_ids, feature_names
@@ -0,0 +1,120 @@
+'''
+Incremental feature extraction: the results of a previous run are reused for the files that have not changed
+since, so that only new files, changed files, and new features need to be computed
+'''
+import os
+from os.path import join, dirname, basename, abspath, lexists
+import json
+import pickle
+from hashlib import sha256
+from threading import get_ident
+
+#Bump the version whenever the layout of the manifest changes
+_MANIFEST_VERSION = 1
+
+def manifest_path(output_file):
+	'''Path of the manifest describing the files from which the results in output_file were extracted'''
+	return f'{output_file}{os.extsep}manifest'
+
+def _content_hash(file_name):
+	digest = sha256()
+	with open(file_name, mode='rb') as text_file:
+		for block in iter(lambda: text_file.read(2 ** 20), b''):
+			digest.update(block)
+	return digest.hexdigest()
+
+def file_state(file_name, previous_state=None):
+	'''
+	Size, modification time, and content hash of a file. The hash is only computed again if the size or
+	modification time differ from those of previous_state
+	'''
+	stat = os.stat(file_name)
+	state = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+	if previous_state is not None and all(previous_state.get(key) == state[key] for key in state):
+		state['sha256'] = previous_state['sha256']
+	else:
+		state['sha256'] = _content_hash(file_name)
+	return state
+
+def _unchanged(state, previous_state):
+	#Files whose size or modification time changed may have been touched without changing their contents
+	return (
+		previous_state is not None and state['size'] == previous_state.get('size')
+		and state['sha256'] == previous_state.get('sha256')
+	)
+
+def _read_pickle(output_file):
+	with open(output_file, mode='rb') as pickle_file:
+		return pickle.load(pickle_file)
+
+def plan(output_file, file_names, features, *, read_results=_read_pickle, get_state=file_state):
+	'''
+	Compare the files and features of this run with the results in output_file, read by read_results as a dict
+	associating file names with dicts of feature values, and its manifest. The state of every file is obtained by
+	get_state (e.g. qcrit.archive.CorpusArchive.file_state for the files of an archive). Returns the rows of the
+	previous results that are still valid, the manifest of this run, and a list of (feature names, file names)
+	tuples of the features that must be computed for those files
+	'''
+	rows = {}
+	previous_manifest = {}
+	if os.path.isfile(output_file):
+		rows = read_results(output_file)
+		try:
+			with open(manifest_path(output_file)) as manifest_file:
+				manifest = json.load(manifest_file)
+			if manifest.get('version') == _MANIFEST_VERSION:
+				previous_manifest = manifest['files']
+		except (OSError, ValueError):
+			#Results without a manifest cannot be trusted to match the files
+			pass
+
+	file_states = {}
+	kept_rows = {}
+	for file_name in file_names:
+		previous_state = previous_manifest.get(file_name)
+		file_states[file_name] = get_state(file_name, previous_state)
+		if file_name in rows and _unchanged(file_states[file_name], previous_state):
+			kept_rows[file_name] = rows[file_name]
+
+	return kept_rows, {'version': _MANIFEST_VERSION, 'files': file_states}, missing_extractions(
+		[(list(features), file_names)], kept_rows
+	)
+
+def missing_extractions(extractions, rows):
+	'''
+	The features of extractions, a list of (feature names, file names) tuples, that are not in rows (associating
+	file names with dicts of feature values), in the same form. Files missing the same features are grouped together
+	'''
+	missing = {}
+	for features, file_names in extractions:
+		for file_name in file_names:
+			row = rows.get(file_name, {})
+			missing_features = tuple(name for name in features if name not in row)
+			if missing_features:
+				missing.setdefault(missing_features, []).append(file_name)
+	return [
+		(list(missing_features), missing_file_names) for missing_features, missing_file_names in missing.items()
+	]
+
+def write_atomically(file_path, data, *, mode='wb'):
+	'''
+	Write data to file_path by writing a temporary file in the same directory and renaming it, so that
+	file_path holds either its previous contents or all of data, even if the process is interrupted
+	'''
+	#The temporary file is created like any other file, so that it gets the usual permissions, with a name unique
+	#to the process and thread writing it
+	temp_path = join(dirname(abspath(file_path)), f'.{basename(file_path)}.{os.getpid()}.{get_ident()}.tmp')
+	try:
+		with open(temp_path, mode=mode) as temp_file:
+			temp_file.write(data)
+			temp_file.flush()
+			os.fsync(temp_file.fileno())
+		os.replace(temp_path, file_path)
+	except BaseException:
+		if lexists(temp_path):
+			os.remove(temp_path)
+		raise
+
+def write_manifest(output_file, manifest):
+	'''Write the manifest of the results in output_file'''
+	write_atomically(manifest_path(output_file), json.dumps(manifest, indent='\t', sort_keys=True) + '\n', mode='w')
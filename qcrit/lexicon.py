@@ -0,0 +1,90 @@
+'''
+Lexicons and lexicon features: the frequency with which the words of a lexicon occur in a text.
+
+Lexicons are compiled once, when they are registered, into the set of all the normalization forms of their words.
+Rather than each feature scanning the words of a text, the counts of every lexicon feature are computed
+together in a single pass over the distinct words of the text, looking up each of them once.
+'''
+from collections import OrderedDict, Counter
+from unicodedata import normalize
+from inspect import currentframe
+from operator import truediv
+
+from . import textual_feature as tf
+
+NORMALIZATION_FORMS = ('NFD', 'NFC', 'NFKD', 'NFKC')
+DENOMINATORS = ('characters', 'words')
+
+#Associates the name of each registered lexicon with its compiled words
+compiled_lexicons = OrderedDict()
+#Associates the name of each lexicon feature with its denominator and bit in _word_to_bitmask
+lexicons = OrderedDict()
+#Associates every compiled word of every lexicon feature with the bitwise or of the bits of the lexicons
+#containing it
+_word_to_bitmask = {}
+
+def compile_lexicon(words):
+	'''
+	Compile words into a frozenset of the words and their NFD, NFC, NFKD, and NFKC normalization forms. Words of
+	a text match a compiled lexicon exactly as they are written, so that a word matches in any of these forms
+	'''
+	if isinstance(words, str): raise ValueError('Words must be a collection of strings, not a single string')
+	return frozenset(words) | {normalize(form, word) for word in words for form in NORMALIZATION_FORMS}
+
+def register_lexicon(name, words):
+	'''Compile words and make them available in compiled_lexicons under the given name'''
+	if name in compiled_lexicons: raise ValueError(f'A lexicon named "{name}" has already been registered')
+	compiled_lexicons[name] = compile_lexicon(words)
+	return compiled_lexicons[name]
+
+def count_lexicons(word_counts):
+	'''
+	Count the occurrences of the words of every lexicon feature, as well as the total number of
+	words and characters, given the number of occurrences of each distinct word
+	'''
+	#Each distinct word is looked up once, however often it occurs
+	bitmask_counts = Counter()
+	for word, count in word_counts.items():
+		bitmask = _word_to_bitmask.get(word)
+		if bitmask:
+			bitmask_counts[bitmask] += count
+	return {
+		'lexicons': {
+			name: sum(count for bitmask, count in bitmask_counts.items() if bitmask & lexicon['bit'])
+			for name, lexicon in lexicons.items()
+		},
+		'characters': sum(len(word) * count for word, count in word_counts.items()),
+		'words': sum(word_counts.values()),
+	}
+
+tf.tokenize_types['lexicon_counts'] = tf.derived_tokenize_type('word_counts', count_lexicons)
+
+def lexicon_feature(name, words, *, denominator='characters'):
+	'''
+	Declare a feature named name, computing the number of occurrences of the given words divided by either
+	the number of characters or the number of words in the text. The words are registered as a lexicon
+	under the same name, and match in any of their NFD, NFC, NFKD, or NFKC unicode normalization forms
+	'''
+	if denominator not in DENOMINATORS:
+		raise ValueError(f'"{denominator}" is not a valid denominator: Choose from among {list(DENOMINATORS)}')
+	words = register_lexicon(name, words)
+
+	bit = 1 << len(lexicons)
+	lexicons[name] = {'denominator': denominator, 'bit': bit}
+	for word in words:
+		_word_to_bitmask[word] = _word_to_bitmask.get(word, 0) | bit
+
+	#Counts computed before this lexicon was declared do not include it
+	tf.invalidate_tokens('lexicon_counts')
+
+	def counts(text):
+		return text['lexicons'][name], text[denominator]
+	def feature(text):
+		return truediv(*counts(text))
+	feature.__name__ = name
+	feature.__qualname__ = name
+	#Attribute the feature to the module declaring it, so worker processes know which module to import
+	feature.__module__ = currentframe().f_back.f_globals.get('__name__')
+	return tf.textual_feature(
+		tokenize_type='lexicon_counts', accumulator=tf.counting_accumulator((0, 0), counts, truediv)
+	)(feature)
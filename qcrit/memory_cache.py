@@ -0,0 +1,146 @@
+'''
+In-memory cache of the tokens of recently seen files, so that features of several files can be computed
+in any order without tokenizing any file again
+'''
+import sys
+from itertools import chain, islice
+from collections import OrderedDict
+
+import numpy as np
+
+#Number of items of a large container whose sizes are measured to approximate the size of the container
+_SAMPLE_SIZE = 16
+
+def approximate_bytes(value):
+	'''
+	Approximate number of bytes of memory held by value. Containers are measured from a sample of their items,
+	so that measuring takes about the same time for any value. Other objects may define __sizeof__
+	'''
+	size = sys.getsizeof(value)
+	if isinstance(value, (str, bytes, np.ndarray)):
+		return size
+	if isinstance(value, dict):
+		num_items = 2 * len(value)
+		items = chain.from_iterable(value.items())
+	elif isinstance(value, (list, tuple, set, frozenset)):
+		num_items = len(value)
+		items = iter(value)
+	else:
+		return size
+	if not num_items:
+		return size
+	sample = list(islice(items, 0, None, max(num_items // _SAMPLE_SIZE, 1)))
+	return size + sum(approximate_bytes(item) for item in sample) * num_items // len(sample)
+
+class MemoryCache:
+	'''
+	Maps keys to values, evicting the least recently used entries once there are more than max_entries of
+	them, or once their approximate sizes add up to more than max_bytes. Counts the hits, misses, and
+	evictions since the cache was created, and also records them (and the bytes added and removed) in
+	metrics if it is given
+	'''
+	def __init__(self, *, max_entries=128, max_bytes=2 ** 28, metrics=None):
+		if not isinstance(max_entries, int) or max_entries <= 0:
+			raise ValueError('max_entries must be a positive integer')
+		if not isinstance(max_bytes, int) or max_bytes <= 0: raise ValueError('max_bytes must be a positive integer')
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.metrics = metrics
+		#Associates every key with its value and size, the least recently used first
+		self._entries = OrderedDict()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return key in self._entries
+
+	def get(self, key, default=None):
+		'''Return the value of key, marking it as the most recently used, or default if it is not cached'''
+		entry = self._entries.get(key)
+		if entry is None:
+			self.misses += 1
+			if self.metrics is not None:
+				self.metrics.increment('memory_cache.misses')
+			return default
+		self.hits += 1
+		if self.metrics is not None:
+			self.metrics.increment('memory_cache.hits')
+		self._entries.move_to_end(key)
+		return entry[0]
+
+	def put(self, key, value):
+		'''Cache the value of key, evicting the least recently used entries if the cache is full'''
+		self._remove(key)
+		nbytes = approximate_bytes(value)
+		#A value larger than the entire cache would only evict everything else before being evicted itself
+		if nbytes > self.max_bytes:
+			return
+		self._entries[key] = (value, nbytes)
+		self._add_bytes(nbytes)
+		self._evict()
+
+	def remeasure(self, key):
+		'''
+		Measure the value of key again, e.g. once it has computed values that it creates lazily, evicting the
+		least recently used entries if the cache is now full
+		'''
+		entry = self._entries.get(key)
+		if entry is None:
+			return
+		nbytes = approximate_bytes(entry[0])
+		if nbytes == entry[1]:
+			return
+		self._entries[key] = (entry[0], nbytes)
+		if nbytes > entry[1]:
+			self._add_bytes(nbytes - entry[1])
+		else:
+			self.nbytes -= entry[1] - nbytes
+			if self.metrics is not None:
+				self.metrics.increment('memory_cache.bytes_removed', entry[1] - nbytes)
+		self._evict()
+
+	def _add_bytes(self, nbytes):
+		self.nbytes += nbytes
+		if self.metrics is not None:
+			self.metrics.increment('memory_cache.bytes_added', nbytes)
+
+	def _evict(self):
+		while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+			self._remove(next(iter(self._entries)))
+			self.evictions += 1
+			if self.metrics is not None:
+				self.metrics.increment('memory_cache.evictions')
+
+	def _remove(self, key):
+		entry = self._entries.pop(key, None)
+		if entry is not None:
+			self.nbytes -= entry[1]
+			if self.metrics is not None:
+				self.metrics.increment('memory_cache.bytes_removed', entry[1])
+
+	def remove_if(self, predicate):
+		'''Remove the entries whose keys satisfy predicate'''
+		for key in [key for key in self._entries if predicate(key)]:
+			self._remove(key)
+
+	def clear(self):
+		'''Remove every entry, keeping the counts of hits, misses, and evictions'''
+		if self.metrics is not None and self.nbytes:
+			self.metrics.increment('memory_cache.bytes_removed', self.nbytes)
+		self._entries.clear()
+		self.nbytes = 0
+
+	def stats(self):
+		'''The counts of hits, misses, and evictions, and the number and approximate size of the entries'''
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions,
+			'entries': len(self._entries),
+			'bytes': self.nbytes,
+		}
@@ -0,0 +1,79 @@
+'''
+Counters and timers describing how feature extraction spends its time, e.g. how often the token caches are hit
+and how long each tokenize type takes to compute
+'''
+import json
+from time import perf_counter
+from collections import Counter
+from contextlib import contextmanager
+
+class Metrics:
+	'''
+	Named counters, and named timers totaling the seconds and number of calls of a measured operation.
+	Metrics of worker processes are combined with merge
+	'''
+	def __init__(self):
+		self.counters = Counter()
+		#Associates the name of each timer with [total seconds, number of calls]
+		self.timers = {}
+
+	def increment(self, name, amount=1):
+		'''Add amount to the counter name'''
+		self.counters[name] += amount
+
+	def add_time(self, name, seconds, calls=1):
+		'''Add seconds spent in calls of the operation timed by name'''
+		timer = self.timers.get(name)
+		if timer is None:
+			self.timers[name] = [seconds, calls]
+		else:
+			timer[0] += seconds
+			timer[1] += calls
+
+	@contextmanager
+	def time(self, name):
+		'''Time the body of a with statement with the timer name'''
+		start = perf_counter()
+		try:
+			yield
+		finally:
+			self.add_time(name, perf_counter() - start)
+
+	def timer_seconds(self, prefix):
+		'''Associates the rest of the name of each timer whose name begins with prefix with its total seconds'''
+		return {name[len(prefix):]: timer[0] for name, timer in self.timers.items() if name.startswith(prefix)}
+
+	def as_dict(self):
+		'''The counters and timers as a dict of plain values, sorted by name'''
+		return {
+			'counters': {name: self.counters[name] for name in sorted(self.counters)},
+			'timers': {
+				name: {'seconds': self.timers[name][0], 'calls': self.timers[name][1]} for name in sorted(self.timers)
+			},
+		}
+
+	def merge(self, other):
+		'''Add the counters and timers of other, either Metrics or the result of its as_dict'''
+		if isinstance(other, Metrics):
+			other = other.as_dict()
+		for name, amount in other['counters'].items():
+			self.increment(name, amount)
+		for name, timer in other['timers'].items():
+			self.add_time(name, timer['seconds'], timer['calls'])
+
+	def pop(self):
+		'''Return the counters and timers as a dict, as as_dict does, and reset them'''
+		result = self.as_dict()
+		self.reset()
+		return result
+
+	def reset(self):
+		'''Reset every counter and timer'''
+		self.counters.clear()
+		self.timers.clear()
+
+	def dump(self, file_path):
+		'''Write the counters and timers to file_path as JSON'''
+		with open(file_path, mode='w') as json_file:
+			json.dump(self.as_dict(), json_file, indent='\t')
+			json_file.write('\n')
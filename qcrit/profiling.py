@@ -0,0 +1,129 @@
+'''
+Profiling of feature extraction: the time spent computing each feature for each file, apart from the time
+spent tokenizing it, which is recorded for each tokenize type, and the time spent parsing each file
+'''
+import json
+
+def _add_seconds(seconds_by_name, name, seconds):
+	seconds_by_name[name] = seconds_by_name.get(name, 0) + seconds
+
+def _ranking(title, seconds_by_name, total, top):
+	#Lines of a table of the names taking the most seconds, with their percentages of total
+	ranked = sorted(seconds_by_name.items(), key=lambda item: (-item[1], item[0]))
+	lines = [f'{title} ({min(top, len(ranked))} of {len(ranked)})', f'{"seconds":>12} {"%":>7} {"cumul. %":>9}  name']
+	cumulative = 0
+	for name, seconds in ranked[:top]:
+		cumulative += seconds
+		lines.append(
+			f'{seconds:12.4f} {100 * seconds / total if total else 0:7.2f} '
+			f'{100 * cumulative / total if total else 0:9.2f}  {name}'
+		)
+	return lines
+
+class Profile:
+	'''
+	Seconds spent computing each feature for each file (excluding tokenization), and seconds spent parsing
+	each file and tokenizing it in each tokenize type. Profiles of worker processes are combined with merge
+	'''
+	def __init__(self):
+		#Associates the name of each feature with a dict associating file names with seconds
+		self.features = {}
+		#Associates each file name with the seconds spent parsing it, and a dict associating tokenize types
+		#with the seconds spent tokenizing it
+		self.files = {}
+
+	def record_feature(self, feature_name, file_name, seconds):
+		'''Add seconds spent computing a feature of a file'''
+		_add_seconds(self.features.setdefault(feature_name, {}), file_name, seconds)
+
+	def record_file(self, file_name, parse_seconds, tokenize_seconds):
+		'''Add seconds spent parsing a file, and tokenizing it (a dict associating tokenize types with seconds)'''
+		file_info = self.files.setdefault(file_name, {'parse': 0, 'tokenize': {}})
+		file_info['parse'] += parse_seconds
+		for tokenize_type, seconds in tokenize_seconds.items():
+			_add_seconds(file_info['tokenize'], tokenize_type, seconds)
+
+	def feature_seconds(self):
+		'''Associates the name of each feature with the seconds spent computing it for all files'''
+		return {name: sum(file_seconds.values()) for name, file_seconds in self.features.items()}
+
+	def tokenize_seconds(self):
+		'''Associates each tokenize type with the seconds spent tokenizing all files'''
+		seconds_by_type = {}
+		for file_info in self.files.values():
+			for tokenize_type, seconds in file_info['tokenize'].items():
+				_add_seconds(seconds_by_type, tokenize_type, seconds)
+		return seconds_by_type
+
+	def file_seconds(self):
+		'''Associates each file name with the seconds spent parsing, tokenizing, and computing features of it'''
+		seconds_by_file = {
+			name: file_info['parse'] + sum(file_info['tokenize'].values()) for name, file_info in self.files.items()
+		}
+		for file_seconds in self.features.values():
+			for file_name, seconds in file_seconds.items():
+				_add_seconds(seconds_by_file, file_name, seconds)
+		return seconds_by_file
+
+	def report(self, top=10):
+		'''
+		Tables of the top features and files taking the most time, and of the tokenize types, with the
+		percentage of the total profiled time each takes and the cumulative percentage
+		'''
+		file_seconds = self.file_seconds()
+		total = sum(file_seconds.values())
+		parse_seconds = sum(file_info['parse'] for file_info in self.files.values())
+		return '\n'.join([
+			*_ranking('Slowest features, excluding tokenization', self.feature_seconds(), total, top), '',
+			*_ranking('Slowest files', file_seconds, total, top), '',
+			*_ranking('Tokenization by tokenize type or artifact', self.tokenize_seconds(), total, top), '',
+			f'Parsing: {parse_seconds:.4f} seconds, total profiled time: {total:.4f} seconds',
+		])
+
+	def as_dict(self):
+		'''The recorded seconds as a dict of plain values, sorted by name'''
+		return {
+			'features': {
+				name: dict(sorted(self.features[name].items())) for name in sorted(self.features)
+			},
+			'files': {
+				name: {
+					'parse': self.files[name]['parse'], 'tokenize': dict(sorted(self.files[name]['tokenize'].items()))
+				} for name in sorted(self.files)
+			},
+		}
+
+	def merge(self, other):
+		'''Add the seconds recorded by other, either a Profile or the result of its as_dict'''
+		if isinstance(other, Profile):
+			other = other.as_dict()
+		for feature_name, file_seconds in other['features'].items():
+			for file_name, seconds in file_seconds.items():
+				self.record_feature(feature_name, file_name, seconds)
+		for file_name, file_info in other['files'].items():
+			self.record_file(file_name, file_info['parse'], file_info['tokenize'])
+
+	def pop(self):
+		'''Return the recorded seconds as a dict, as as_dict does, and reset them'''
+		result = self.as_dict()
+		self.reset()
+		return result
+
+	def reset(self):
+		'''Forget every recorded time'''
+		self.features.clear()
+		self.files.clear()
+
+	def dump(self, file_path):
+		'''Write the recorded seconds to file_path as JSON'''
+		with open(file_path, mode='w') as json_file:
+			json.dump(self.as_dict(), json_file, indent='\t')
+			json_file.write('\n')
+
+	@staticmethod
+	def load(file_path):
+		'''Read a Profile written by dump, e.g. to compare the report with that of another release'''
+		profile = Profile()
+		with open(file_path) as json_file:
+			profile.merge(json.load(json_file))
+		return profile
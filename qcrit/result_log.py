@@ -0,0 +1,141 @@
+'''
+Append-only log of the results of a feature extraction, to which the features of each file are written as soon as
+they are computed, so that an interrupted extraction resumes where it stopped instead of starting over
+'''
+import os
+import zlib
+import pickle
+import struct
+from time import monotonic
+
+from . import textual_feature as tf
+from .result_store import feature_hash
+from .feature_matrix import write_results
+
+#Every record is preceded by the length and CRC32 checksum of its pickled contents
+_RECORD_HEADER = struct.Struct('<II')
+#The log is flushed after every record, which survives the process crashing, and synced to disk at most this
+#often, which also survives the machine crashing
+_SYNC_SECONDS = 1
+
+def log_path(output_file):
+	'''Path of the log of the results that are written to output_file once the extraction finishes'''
+	return f'{output_file}{os.extsep}log'
+
+def file_stat(file_name):
+	'''Size and modification time (in nanoseconds) of a file, or None if it does not exist'''
+	try:
+		stat = os.stat(file_name)
+	except OSError:
+		return None
+	return stat.st_size, stat.st_mtime_ns
+
+def _records(path):
+	#Yield the records of the log, and the offset after each, stopping at a record cut short by a crash
+	with open(path, mode='rb') as log_file:
+		offset = 0
+		while True:
+			header = log_file.read(_RECORD_HEADER.size)
+			if len(header) < _RECORD_HEADER.size:
+				return
+			length, checksum = _RECORD_HEADER.unpack(header)
+			data = log_file.read(length)
+			if len(data) < length or zlib.crc32(data) != checksum:
+				return
+			offset += _RECORD_HEADER.size + length
+			yield pickle.loads(data), offset
+
+def read_log(path, feature_hashes, tokenizer_config, *, get_stat=file_stat):
+	'''
+	Read the log at path. Returns a dict associating file names with dicts of the values of the features in
+	feature_hashes (associating feature names with the hashes of their code, see qcrit.result_store.feature_hash),
+	and the length of the valid part of the log. Values computed by other code or another tokenizer configuration,
+	and values of files that changed since (according to get_stat, which returns the size and modification time of
+	a file), are left out
+	'''
+	rows = {}
+	valid_length = 0
+	if not os.path.isfile(path):
+		return rows, valid_length
+	#Associates the name of each feature computed by the current code with the hash of its code
+	valid_hashes = {}
+	for record, valid_length in _records(path):
+		if record[0] == 'header':
+			_, logged_hashes, logged_config = record
+			valid_hashes = {
+				name: code_hash for name, code_hash in logged_hashes.items()
+				if logged_config == tokenizer_config and feature_hashes.get(name) == code_hash
+			}
+		else:
+			_, file_name, stat, scores = record
+			if stat != get_stat(file_name):
+				#The file changed after its features were computed
+				rows.pop(file_name, None)
+				continue
+			rows.setdefault(file_name, {}).update(
+				(name, value) for name, value in scores.items() if name in valid_hashes
+			)
+	return rows, valid_length
+
+class ResultLog:
+	'''
+	An append-only log of the features of each file. Opening a log reads the results it already holds (see
+	read_log) into completed, discards a record cut short by a crash, and records the hashes of the code of
+	the features and the tokenizer configuration with which the following results are computed
+	'''
+	def __init__(self, path, feature_hashes, tokenizer_config, *, get_stat=file_stat):
+		self.path = path
+		self._get_stat = get_stat
+		self.completed, valid_length = read_log(path, feature_hashes, tokenizer_config, get_stat=get_stat)
+		self._file = open(path, mode='ab')
+		self._file.truncate(valid_length)
+		self._last_sync = monotonic()
+		self._write(('header', dict(feature_hashes), tokenizer_config))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def _write(self, record):
+		data = pickle.dumps(record)
+		self._file.write(_RECORD_HEADER.pack(len(data), zlib.crc32(data)) + data)
+		self._file.flush()
+		if monotonic() - self._last_sync >= _SYNC_SECONDS:
+			os.fsync(self._file.fileno())
+			self._last_sync = monotonic()
+
+	def append(self, file_name, scores):
+		'''Log scores, a dict associating feature names with their values for file_name'''
+		self._write(('row', file_name, self._get_stat(file_name), scores))
+
+	def close(self):
+		'''Sync the log to disk and close it'''
+		if not self._file.closed:
+			self._file.flush()
+			os.fsync(self._file.fileno())
+			self._file.close()
+
+def finalize(
+	output_file, file_names, features, *, feature_hashes=None, tokenizer_config=None, get_stat=file_stat
+):
+	'''
+	Compact the log of output_file into output_file (see qcrit.feature_matrix.write_results), with a row for
+	each of file_names that has a value for every feature, and remove the log. By default the values must have been
+	computed by the current code of the decorated features and the tokenizer configuration of the current session,
+	for files that have not changed since (see read_log). Returns the rows that were written
+	'''
+	features = list(features)
+	if feature_hashes is None:
+		feature_hashes = {name: feature_hash(tf.decorated_features[name]) for name in features}
+	if tokenizer_config is None:
+		tokenizer_config = tf.current_session().tokenizer_config
+	rows, _ = read_log(log_path(output_file), feature_hashes, tokenizer_config, get_stat=get_stat)
+	text_to_features = {
+		file_name: {name: rows[file_name][name] for name in features} for file_name in file_names
+		if all(name in rows.get(file_name, {}) for name in features)
+	}
+	write_results(output_file, text_to_features, features)
+	os.remove(log_path(output_file))
+	return text_to_features
@@ -0,0 +1,251 @@
+'''
+Persistent store of feature values, so that a feature is only computed again for a file once the contents of the
+file, the code of the feature, or the configuration of the tokenizers and parser change
+'''
+import pickle
+import sqlite3
+from hashlib import sha256
+from functools import partial
+from collections import Counter
+from types import FunctionType, MethodType, CodeType, ModuleType
+
+from . import __version__
+from . import textual_feature as tf
+
+#Bump the version whenever the schema of the store or the way code is hashed changes
+_SCHEMA_VERSION = 1
+
+#Values whose repr identifies them
+_PLAIN_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+def _update(digest, *parts):
+	for part in parts:
+		digest.update(repr(part).encode('utf-8', errors='surrogatepass'))
+		digest.update(b'\0')
+
+def _digest_value(digest, value, seen, packages):
+	#Functions are identified by their code, and containers by their items in a deterministic order
+	#Values that were already hashed, e.g. helpers referring to each other, are only hashed once. They are kept
+	#in seen so that their ids are not reused by other values
+	if isinstance(value, (FunctionType, list, dict)):
+		if id(value) in seen:
+			_update(digest, 'seen')
+			return
+		seen[id(value)] = value
+	if isinstance(value, MethodType):
+		_digest_value(digest, value.__func__, seen, packages)
+	elif isinstance(value, partial):
+		_update(digest, 'partial')
+		_digest_value(digest, (value.func, value.args, value.keywords), seen, packages)
+	elif isinstance(value, FunctionType) and str(value.__module__).partition('.')[0] not in packages:
+		#Functions of other packages, such as libraries, are identified by their names
+		_update(digest, 'function', value.__module__, value.__qualname__)
+	elif isinstance(value, FunctionType):
+		_update(digest, value.__qualname__)
+		_digest_code(digest, value.__code__, value.__globals__, seen, packages)
+		_digest_value(digest, (value.__defaults__, value.__kwdefaults__), seen, packages)
+		for cell in value.__closure__ or ():
+			try:
+				_digest_value(digest, cell.cell_contents, seen, packages)
+			except ValueError:
+				#The variable of the cell has not been assigned yet
+				_update(digest, 'empty cell')
+	elif isinstance(value, ModuleType):
+		_update(digest, 'module', value.__name__)
+	elif isinstance(value, (list, tuple)):
+		_update(digest, type(value).__name__, len(value))
+		for item in value:
+			_digest_value(digest, item, seen, packages)
+	elif isinstance(value, dict):
+		#The iteration order of sets of strings differs between interpreters, and so does the order of dicts filled
+		#from them, so items are hashed in the order of their keys
+		_update(digest, type(value).__name__, len(value))
+		for _, key, item in sorted((repr(key), key, item) for key, item in value.items()):
+			if isinstance(item, _PLAIN_TYPES):
+				_update(digest, key, item)
+			else:
+				_digest_value(digest, key, seen, packages)
+				_digest_value(digest, item, seen, packages)
+	elif isinstance(value, (set, frozenset)):
+		_update(digest, type(value).__name__, sorted(repr(item) for item in value))
+	else:
+		_update(digest, value)
+
+def _digest_code(digest, code, global_vars, seen, packages):
+	_update(digest, code.co_code, code.co_names, code.co_varnames, code.co_freevars)
+	for const in code.co_consts:
+		if isinstance(const, CodeType):
+			_digest_code(digest, const, global_vars, seen, packages)
+		else:
+			_digest_value(digest, const, seen, packages)
+	#Module-level helper functions and constants that the code refers to
+	for name in code.co_names:
+		if name in global_vars:
+			_update(digest, name)
+			_digest_value(digest, global_vars[name], seen, packages)
+
+def _digest_artifact(digest, name, seen, packages):
+	#The code computing a tokenize type or derived artifact from its source, and that of its sources
+	entry = tf.derived_artifacts[name] if name in tf.derived_artifacts else tf.tokenize_types[name]
+	_update(digest, name)
+	if 'source' in entry:
+		_digest_value(digest, entry['derive'], seen, packages)
+		_digest_artifact(digest, entry['source'], seen, packages)
+	else:
+		_digest_value(digest, entry['func'], seen, packages)
+
+def _packages(func):
+	#The code of functions of qcrit and of the package declaring func is hashed, but not that of libraries
+	return {__name__.partition('.')[0], str(getattr(func, '__module__', None)).partition('.')[0]}
+
+def feature_hash(feature):
+	'''
+	Hash of the code of a decorated feature: its bytecode, constants, default arguments, the values in its
+	closure, the module-level functions and values it refers to (recursively, except those of libraries), its
+	accumulator, and the code computing its tokenize type and derived artifacts
+	'''
+	digest = sha256()
+	seen = {}
+	func = getattr(feature, '__wrapped__', feature)
+	packages = _packages(func)
+	_digest_value(digest, func, seen, packages)
+	accumulator = getattr(feature, 'accumulator', None)
+	if accumulator is not None:
+		_digest_value(
+			digest, (accumulator.init, accumulator.update, accumulator.finalize, accumulator.merge), seen, packages
+		)
+	for name in (getattr(feature, 'tokenize_type', None), *getattr(feature, 'artifact_names', ())):
+		_digest_artifact(digest, name, seen, packages)
+	return digest.hexdigest()
+
+def config_hash(tokenizer_config, parse_function):
+	'''Hash of the tokenizer configuration, the code of the function parsing a file, and the version of qcrit'''
+	digest = sha256()
+	_update(digest, __version__, tokenizer_config)
+	_digest_value(digest, parse_function, {}, _packages(parse_function))
+	return digest.hexdigest()
+
+class ReuseReport:
+	'''
+	Which values were reused from a ResultStore, and which were computed again and why: 'code changed' (the
+	code of the feature changed), 'configuration changed' (the tokenizer configuration or parser changed),
+	or 'not stored' (a new file or changed contents, or a new feature)
+	'''
+	OUTCOMES = ('reused', 'code changed', 'configuration changed', 'not stored')
+
+	def __init__(self):
+		#Associates the name of each feature with a Counter of outcomes
+		self.features = {}
+		#(file name, feature name) tuples of the values that were stored but are no longer valid
+		self.invalidated = []
+
+	def record(self, file_name, feature_name, outcome):
+		'''Count the outcome of looking up the value of a feature for a file'''
+		self.features.setdefault(feature_name, Counter())[outcome] += 1
+		if outcome in ('code changed', 'configuration changed'):
+			self.invalidated.append((file_name, feature_name))
+
+	def counts(self):
+		'''Associates each outcome with the number of values with that outcome'''
+		return {outcome: sum(counts[outcome] for counts in self.features.values()) for outcome in self.OUTCOMES}
+
+	def report(self):
+		'''Table of the number of values of each feature with each outcome'''
+		width = max((len(name) for name in self.features), default=7)
+		lines = [f'{"feature":<{width}} ' + ' '.join(f'{outcome:>21}' for outcome in self.OUTCOMES)]
+		for name, counts in self.features.items():
+			lines.append(f'{name:<{width}} ' + ' '.join(f'{counts[outcome]:>21}' for outcome in self.OUTCOMES))
+		lines.append(f'{"total":<{width}} ' + ' '.join(f'{count:>21}' for count in self.counts().values()))
+		return '\n'.join(lines)
+
+class ResultStore:
+	'''
+	An sqlite database of feature values, keyed by the content hash of a file and the name of a feature, along
+	with the hashes of the code of the feature and of the configuration that computed the value. A stored value
+	is reused only while both hashes still match, and is replaced once the value is computed again
+	'''
+	def __init__(self, db_path):
+		self.db_path = db_path
+		self._connection = sqlite3.connect(db_path)
+		if self._connection.execute('PRAGMA user_version').fetchone()[0] != _SCHEMA_VERSION:
+			with self._connection:
+				self._connection.execute('DROP TABLE IF EXISTS results')
+				self._connection.execute(
+					'CREATE TABLE results (content_hash TEXT, feature TEXT, code_hash TEXT, config_hash TEXT, '
+					'value BLOB, PRIMARY KEY (content_hash, feature))'
+				)
+				self._connection.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def close(self):
+		'''Close the database'''
+		self._connection.close()
+
+	def __len__(self):
+		return self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+	def lookup(self, content_hash, code_hashes, config):
+		'''
+		Look up the values of the features of a file. code_hashes associates the name of each feature with the
+		hash of its code. Returns a dict associating the name of each feature with its value, or with the
+		outcome explaining why it must be computed (see ReuseReport), and whether the value was found
+		'''
+		stored = {
+			feature_name: (code_hash, config_hash, value) for feature_name, code_hash, config_hash, value in
+			self._connection.execute(
+				'SELECT feature, code_hash, config_hash, value FROM results WHERE content_hash = ?', (content_hash,)
+			) if feature_name in code_hashes
+		}
+		results = {}
+		for feature_name, code_hash in code_hashes.items():
+			if feature_name not in stored:
+				results[feature_name] = ('not stored', False)
+			elif stored[feature_name][0] != code_hash:
+				results[feature_name] = ('code changed', False)
+			elif stored[feature_name][1] != config:
+				results[feature_name] = ('configuration changed', False)
+			else:
+				results[feature_name] = (pickle.loads(stored[feature_name][2]), True)
+		return results
+
+	def put(self, values):
+		'''Store values, an iterable of (content hash, feature name, code hash, config hash, value) tuples'''
+		with self._connection:
+			self._connection.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', (
+				(content_hash, feature_name, code_hash, config, pickle.dumps(value))
+				for content_hash, feature_name, code_hash, config, value in values
+			))
+
+	def plan(self, extractions, content_hashes, code_hashes, configs):
+		'''
+		Look up the values of extractions, a list of (feature names, file names) tuples, given the content hash
+		and config hash of every file, and the code hash of every feature. Returns rows of the values found
+		(associating file names with dicts of feature values), the extractions still needed in the same form,
+		and a ReuseReport
+		'''
+		rows = {}
+		report = ReuseReport()
+		#Files missing the same features are extracted together
+		missing = {}
+		for features, file_names in extractions:
+			for file_name in file_names:
+				results = self.lookup(
+					content_hashes[file_name], {name: code_hashes[name] for name in features}, configs[file_name]
+				)
+				missing_features = []
+				for feature_name in features:
+					value, found = results[feature_name]
+					if found:
+						rows.setdefault(file_name, {})[feature_name] = value
+						report.record(file_name, feature_name, 'reused')
+					else:
+						missing_features.append(feature_name)
+						report.record(file_name, feature_name, value)
+				if missing_features:
+					missing.setdefault(tuple(missing_features), []).append(file_name)
+		return rows, [(list(features), file_names) for features, file_names in missing.items()], report
@@ -0,0 +1,124 @@
+'''
+Streaming feature extraction: texts are read as a sequence of chunks and split into sentences
+incrementally, so that memory use is bounded by the length of a few sentences rather than of the text.
+Texts are tokenized by the current extraction session
+'''
+from . import textual_feature as tf
+
+def _splits_word(text, position, start=0):
+	#Whether a word of text (word tokenized from start) begins before position and ends after it, as the spaced
+	#ellipsis ". . ." does when the sentence tokenizer finds a boundary inside it
+	for match in tf.current_session().word_tokenizer._re_word_tokenizer.finditer(text, start):
+		if match.start() >= position:
+			return False
+		if match.end() > position:
+			return True
+	return False
+
+def _tokenized_pieces(chunks):
+	#Yield consecutive pieces of the text, each a _TokenizedText of whole sentences.
+	#The sentence tokenizer decides whether a sentence ends by looking at the start of the next one,
+	#so the last two sentences found in the buffer are kept until more of the text has been read
+	session = tf.current_session()
+	terminal_punctuation = session.tokenizer_config['terminal_punctuation']
+	buffer = ''
+	for chunk in chunks:
+		buffer += chunk
+		#New sentences can only be found once more terminal punctuation has been read
+		if not any(punc in chunk for punc in terminal_punctuation):
+			continue
+		spans = list(session.sentence_tokenizer.span_tokenize(buffer))
+		#Pieces extend to the start of the next sentence, so that together they cover the entire text,
+		#and never end inside a word, so that they have the same words as the entire text
+		end = next((i for i in range(len(spans) - 2, 0, -1) if not _splits_word(buffer, spans[i][0])), None)
+		if end is not None:
+			yield tf._TokenizedText(buffer[:spans[end][0]], spans[:end])
+			buffer = buffer[spans[end][0]:]
+	spans = list(session.sentence_tokenizer.span_tokenize(buffer))
+	if spans:
+		yield tf._TokenizedText(buffer, spans)
+
+def stream_sentences(chunks):
+	'''Yield the sentences of the text formed by concatenating the given chunks, as soon as they are read'''
+	for piece in _tokenized_pieces(chunks):
+		yield from piece.sentences()
+
+def _update_states(states, feature_tuples, tokenized_text):
+	#Features sharing a tokenize type share the tokens of the text
+	metrics = tf.current_session().metrics
+	tokens = {}
+	for name, feature in feature_tuples:
+		if feature.tokenize_type not in tokens:
+			with metrics.time(f'tokenize.{feature.tokenize_type}'):
+				tokens[feature.tokenize_type] = tf._derive_tokens(feature.tokenize_type, tokenized_text)
+		states[name] = feature.accumulator.update(states[name], tokens[feature.tokenize_type])
+
+def _finalize_states(states, feature_tuples):
+	return {name: feature.accumulator.finalize(states[name]) for name, feature in feature_tuples}
+
+def accumulate_features(chunks, feature_tuples):
+	'''
+	Compute features, given as (name, decorated feature) tuples, from the chunks of a text using
+	their accumulators. Returns a dict associating the name of each feature with its value
+	'''
+	states = {name: feature.accumulator.init() for name, feature in feature_tuples}
+	raw_text_features = [(name, feature) for name, feature in feature_tuples if feature.tokenize_type is None]
+	tokenized_features = [(name, feature) for name, feature in feature_tuples if feature.tokenize_type is not None]
+
+	def read(chunks):
+		#Features of the raw text are updated with every chunk as it passes through to the sentence tokenizer
+		for chunk in chunks:
+			for name, feature in raw_text_features:
+				states[name] = feature.accumulator.update(states[name], chunk)
+			yield chunk
+
+	for piece in _tokenized_pieces(read(chunks)):
+		_update_states(states, tokenized_features, piece)
+	return _finalize_states(states, feature_tuples)
+
+def _shift_spans(spans, offset):
+	return [(start - offset, end - offset) for start, end in spans]
+
+def split_text(text, piece_size):
+	'''
+	Split text into consecutive pieces of at least piece_size characters that begin at sentence boundaries.
+	Returns a list of (piece, (start, end) offsets of each sentence in the piece) tuples. The sentences are found
+	in the entire text, since the sentence tokenizer may decide a boundary near the end of a piece differently
+	on its own (e.g. after an abbreviation)
+	'''
+	spans = list(tf.current_session().sentence_tokenizer.span_tokenize(text))
+	pieces = []
+	#Offset and index of the first sentence of the current piece
+	start = 0
+	first = 0
+	for i in range(1, len(spans)):
+		boundary = spans[i][0]
+		#Pieces never end inside a word, so that they have the same words as the entire text
+		if boundary - start < piece_size or _splits_word(text, boundary, start):
+			continue
+		pieces.append((text[start:boundary], _shift_spans(spans[first:i], start)))
+		start = boundary
+		first = i
+	pieces.append((text[start:], _shift_spans(spans[first:], start)))
+	return pieces
+
+def accumulate_piece(text, feature_tuples, sentence_spans=None):
+	'''
+	Return the states of the accumulators of features, given as (name, decorated feature) tuples, after
+	accounting for text, a piece of a longer text beginning at a sentence boundary, whose sentences are given
+	by sentence_spans as split_text returns them (if None, they are found in the piece alone)
+	'''
+	states = {name: feature.accumulator.init() for name, feature in feature_tuples}
+	_update_states(states, feature_tuples, tf._TokenizedText(text, sentence_spans))
+	return states
+
+def merge_pieces(piece_states, feature_tuples):
+	'''
+	Merge the states of the consecutive pieces of a text, as returned by accumulate_piece. Returns a dict
+	associating the name of each feature with its value
+	'''
+	states = {name: feature.accumulator.init() for name, feature in feature_tuples}
+	for next_states in piece_states:
+		for name, feature in feature_tuples:
+			states[name] = feature.accumulator.merge(states[name], next_states[name])
+	return _finalize_states(states, feature_tuples)
@@ -0,0 +1,91 @@
+'''
+Parsing of TEI XML files (e.g. those of Perseus and First1KGreek), which are read incrementally with iterparse
+so that only the elements being read are held in memory, however large the edition
+'''
+from html.entities import entitydefs
+from xml.etree.ElementTree import XMLParser, iterparse
+
+#Only the text within these elements is kept
+DEFAULT_INCLUDED_ELEMENTS = frozenset({'body'})
+#The text within these elements is left out: notes, the readings and witnesses of the apparatus (but not its
+#lemma, which is the text of the edition), headings, speakers and stage directions, bibliographic references,
+#and the original or erroneous forms where a normalized or corrected one is given
+DEFAULT_SKIPPED_ELEMENTS = frozenset({
+	'note', 'rdg', 'rdgGrp', 'wit', 'witDetail', 'head', 'speaker', 'stage', 'castList', 'label', 'bibl', 'fw',
+	'figDesc', 'del', 'sic', 'orig', 'abbr',
+})
+#Elements whose boundaries separate words, at which the text read so far is yielded
+_BREAKING_ELEMENTS = frozenset({
+	'body', 'div', 'div1', 'div2', 'div3', 'div4', 'div5', 'div6', 'div7', 'p', 'ab', 'lg', 'l', 'lb', 'sp',
+	'list', 'item', 'table', 'row', 'cell', 'note', 'head', 'speaker', 'stage', 'castList', 'label', 'bibl',
+	'fw', 'figure',
+})
+
+def _is_break(name, element):
+	#A line break within a word (<lb break="no"/>) does not separate words
+	return name in _BREAKING_ELEMENTS and (name != 'lb' or element.get('break') != 'no')
+
+def _chunk(pieces):
+	#The text read so far, with its runs of whitespace (e.g. the indentation of the XML) collapsed
+	text = ' '.join(''.join(pieces).split())
+	pieces.clear()
+	return text + ' ' if text else ''
+
+def parse_tei_chunks(
+	file_name, *, include=DEFAULT_INCLUDED_ELEMENTS, skip=DEFAULT_SKIPPED_ELEMENTS, entities=entitydefs
+):
+	'''
+	Yield the text of a TEI file, a paragraph or line at a time as it is read, for streaming extraction.
+
+	Only the text within the elements named in include is kept, leaving out that within the elements named in
+	skip. Elements are named without their namespace, so that both TEI P5 (e.g. First1KGreek) and P4 (e.g.
+	Perseus) files are read. entities associates the names of the entities that the file refers to but does not
+	declare (by default, those of HTML, such as &mdash;) with their text.
+	To configure the parser of an extension, use e.g. functools.partial(parse_tei_chunks, skip={'note'})
+	'''
+	include = frozenset(include)
+	skip = frozenset(skip)
+	parser = XMLParser()
+	parser.entity.update(entities)
+	#(element, whether its text is kept, whether it is included, whether it is skipped) of the open elements
+	stack = []
+	#The last child of each open element whose end was read, whose tail is the text following it
+	last_children = []
+	pieces = []
+	for event, element in iterparse(file_name, events=('start', 'end'), parser=parser):
+		name = element.tag.rpartition('}')[2] if isinstance(element.tag, str) else ''
+		if event == 'start':
+			if stack:
+				parent, kept, included, skipped = stack[-1]
+				last_child = last_children[-1]
+				text = parent.text if last_child is None else last_child.tail
+				if kept and text:
+					pieces.append(text)
+				#The children read in full are dropped, so that memory use does not grow with the file
+				del parent[:-1]
+			else:
+				included = skipped = False
+			included = included or name in include
+			skipped = skipped or name in skip
+			stack.append((element, included and not skipped, included, skipped))
+			last_children.append(None)
+		else:
+			kept = stack.pop()[1]
+			last_child = last_children.pop()
+			text = element.text if last_child is None else last_child.tail
+			if kept and text:
+				pieces.append(text)
+			del element[:]
+			if last_children:
+				last_children[-1] = element
+		if _is_break(name, element):
+			chunk = _chunk(pieces)
+			if chunk:
+				yield chunk
+	chunk = _chunk(pieces)
+	if chunk:
+		yield chunk
+
+def parse_tei(file_name, **options):
+	'''The text of a TEI file, like parse_tei_chunks, which options configure'''
+	return ''.join(parse_tei_chunks(file_name, **options))
@@ -2,174 +2,583 @@
 '''Utilities for textual feature decorator'''
 import re
 from inspect import signature
-from collections import OrderedDict
+from functools import wraps
+from collections import OrderedDict, Counter
 from io import StringIO
+from copy import copy
 import os
 from os.path import join, dirname, isdir, isfile, abspath, lexists
 import sys
 import pickle
+import threading
+import weakref
 
+import numpy as np
 import nltk
 import nltk.tokenize.punkt as punkt
 
+from .token_cache import TokenCache
+from .memory_cache import MemoryCache, approximate_bytes
+from .metrics import Metrics
+from .document import Vocabulary, TokenizedDocument
+
 decorated_features = OrderedDict()
 word_tokenizer = None
 sentence_tokenizer = None
+tokenizer_config = None
+token_cache = None
+metrics = Metrics()
+memory_cache = MemoryCache(metrics=metrics)
+vocabulary = Vocabulary()
 debug_output = StringIO()
 NON_WORD_CHARS = (
 	r"\?¿؟\!¡！‽…⋯᠁ฯ,،，､、。°※··᛫~\:;;\\\/⧸⁄（）\(\)\[\]\{\}\<\>"
 	r"\'\"‘’“”`‹›«»《》\|‖\=\-\‐\‒\–\—\―_\+\*\^\$£€§%#@&†‡"
 )
 
+class _TokenizedText:
+	'''
+	Splits a text into sentences and into words at most once each. The 'sentences', 'words', and
+	'sentence_words' tokenize types are all views of one instance, so a file is never tokenized
+	more than once no matter how many tokenize types its features use
+	'''
+	def __init__(self, text, sentence_spans=None):
+		self.text = text
+		self._session = current_session()
+		#Texts whose sentences were already found are pieces of a larger text, too small to be worth persisting
+		self._persist = sentence_spans is None
+		self._sentence_spans = sentence_spans
+		self._sentences = None
+		self._word_spans = None
+		self._words = None
+		self._sentence_words = None
+
+	def __sizeof__(self):
+		#Sizes of the text and of the spans found so far, for the byte budget of the memory cache. The sentences
+		#and words are cached (and measured) as the tokens of the tokenize types derived from this instance
+		return object.__sizeof__(self) + sum(approximate_bytes(value) for value in (
+			self.text, self._sentence_spans, self._word_spans
+		))
+
+	def _cached_spans(self, kind, tokenize):
+		token_cache = self._session.token_cache
+		if token_cache is None or not self._persist:
+			return tokenize()
+		key = TokenCache.key(kind, self.text, (self._session.tokenizer_config, NON_WORD_CHARS))
+		spans = token_cache.get(key)
+		if spans is None:
+			self._session.metrics.increment('token_cache.misses')
+			spans = tokenize()
+			token_cache.put(key, spans)
+		else:
+			self._session.metrics.increment('token_cache.hits')
+		return spans
+
+	def sentence_spans(self):
+		'''(start, end) offsets of each sentence in the text'''
+		if self._sentence_spans is None:
+			self._sentence_spans = self._cached_spans(
+				'sentences', lambda: list(self._session.sentence_tokenizer.span_tokenize(self.text))
+			)
+		return self._sentence_spans
+
+	def sentences(self):
+		'''Sentences of the text, each as a string'''
+		if self._sentences is None:
+			self._sentences = [self.text[start:end] for start, end in self.sentence_spans()]
+		return self._sentences
+
+	def _find_word_spans(self):
+		if self._word_spans is not None:
+			return self._word_spans
+		return self._cached_spans(
+			'words', lambda: [
+				match.span() for match in self._session.word_tokenizer._re_word_tokenizer.finditer(self.text)
+			]
+		)
+
+	def word_spans(self):
+		'''(start, end) offsets of each word in the text'''
+		if self._word_spans is None:
+			self._word_spans = self._find_word_spans()
+		return self._word_spans
+
+	def words(self):
+		'''Words of the text, identical to word tokenizing the entire text'''
+		if self._words is None:
+			self._words = [self.text[start:end] for start, end in self.word_spans()]
+		return self._words
+
+	def _sentence_word_slices(self, word_spans):
+		#Yield, for every sentence, either the slice of word_spans holding its words or, if a word of the
+		#entire text straddles the sentence boundary (e.g. the spaced ellipsis ". . ."), the words obtained
+		#by word tokenizing the sentence on its own
+		i = 0
+		for start, end in self.sentence_spans():
+			while i < len(word_spans) and word_spans[i][1] <= start:
+				i += 1
+			j = i
+			while j < len(word_spans) and word_spans[j][1] <= end:
+				j += 1
+			if (i < len(word_spans) and word_spans[i][0] < start) or (j < len(word_spans) and word_spans[j][0] < end):
+				yield self._session.word_tokenizer.word_tokenize(self.text[start:end])
+			else:
+				yield slice(i, j)
+			i = j
+
+	def sentence_words(self):
+		'''Sentences of the text, each as a list of words, identical to word tokenizing every sentence'''
+		if self._sentence_words is None:
+			words = self.words()
+			self._sentence_words = [
+				words[word_slice] if isinstance(word_slice, slice) else word_slice
+				for word_slice in self._sentence_word_slices(self.word_spans())
+			]
+		return self._sentence_words
+
+	def document(self):
+		'''
+		The sentence words as a TokenizedDocument, built without holding the words as lists. The word spans are
+		not kept for it, since they take far more memory than the arrays of the document
+		'''
+		text = self.text
+		word_spans = self._find_word_spans()
+		return TokenizedDocument(self._session.vocabulary, (
+			(text[start:end] for start, end in word_spans[word_slice]) if isinstance(word_slice, slice) else word_slice
+			for word_slice in self._sentence_word_slices(word_spans)
+		))
+
+def derived_tokenize_type(source, derive):
+	'''Describe a tokenize type whose tokens are computed from the tokens of the source tokenize type'''
+	return {
+		'func': lambda text: derive(_cache_entry(source)['func'](text)),
+		'source': source,
+		'derive': derive,
+	}
+
+#Tokenize types beginning with an underscore are shared intermediates, not for use by features
 tokenize_types = {
 	None: {
 		'func': lambda text: text,
-		'prev_filepath': None,
-		'tokens': None,
-	},
-	'sentences': {
-		'func': lambda text: sentence_tokenizer.tokenize(text),
-		'prev_filepath': None,
-		'tokens': None,
 	},
-	'words': {
-		'func': lambda text: word_tokenizer.word_tokenize(text),
-		'prev_filepath': None,
-		'tokens': None,
-	},
-	'sentence_words': {
-		'func': lambda text: [word_tokenizer.word_tokenize(s) for s in sentence_tokenizer.tokenize(text)],
-		'prev_filepath': None,
-		'tokens': None,
+	'_tokenized_text': {
+		'func': _TokenizedText,
 	},
+	'sentences': derived_tokenize_type('_tokenized_text', _TokenizedText.sentences),
+	'words': derived_tokenize_type('_tokenized_text', _TokenizedText.words),
+	'sentence_words': derived_tokenize_type('_tokenized_text', _TokenizedText.sentence_words),
+	'document': derived_tokenize_type('_tokenized_text', _TokenizedText.document),
+	'word_counts': derived_tokenize_type('words', Counter),
 }
 
-def clear_cache():
-	'''Clear tokens from previously parsed texts'''
-	global tokenize_types
-	global debug_output
-	for _, val in tokenize_types.items():
-		val['prev_filepath'] = None
-		val['tokens'] = None
-	debug_output.truncate(0)
-	debug_output.seek(0)
+#Associates the name of each derived artifact with how to compute it from the tokens of its source
+derived_artifacts = {}
 
-def setup_tokenizers(*, terminal_punctuation, language=None):
-	'''Initialize the word tokenizer and sentence tokenizer given the terminal punctuation'''
-	global word_tokenizer
-	global sentence_tokenizer
-	global tokenize_types
-	if word_tokenizer or sentence_tokenizer:
-		raise Exception('Tokenizers have already been initialized')
-
-	clear_cache()
-	punkt.PunktLanguageVars.sent_end_chars = terminal_punctuation
-	punkt.PunktLanguageVars.re_boundary_realignment = re.compile(
-		r'[›»》’”\'\"）\)\]\}\>]+?(?:\s+|(?=--)|$)', re.MULTILINE
+def register_artifact(name, *, source, func):
+	'''
+	Register a derived artifact: an intermediate value computed by func from the tokens of source (a tokenize
+	type or another artifact). Features receive an artifact by naming it as a parameter, and it is computed
+	at most once per file no matter how many features use it
+	'''
+	if name in tokenize_types or name in derived_artifacts:
+		raise ValueError(f'"{name}" is already the name of a tokenize type or derived artifact')
+	if source not in tokenize_types and source not in derived_artifacts:
+		raise ValueError(f'"{source}" is not a valid tokenize type or derived artifact')
+	derived_artifacts[name] = derived_tokenize_type(source, func)
+
+def _cache_entry(name):
+	return derived_artifacts[name] if name in derived_artifacts else tokenize_types[name]
+
+def count_chars(text):
+	'''A Counter of the number of occurrences of every character of text, counted in a single pass'''
+	#Counting the code points with NumPy avoids hashing every character in Python, as Counter(text) would
+	code_points, counts = np.unique(
+		np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32), return_counts=True
 	)
+	return Counter(dict(zip(map(chr, code_points.tolist()), counts.tolist())))
+
+#Artifacts needed by many features of any language
+register_artifact('char_counts', source=None, func=count_chars)
+register_artifact('total_chars', source='words', func=lambda words: sum(len(word) for word in words))
+register_artifact(
+	'sentence_char_lengths', source='sentence_words',
+	func=lambda sentences: [sum(len(word) for word in sentence) for sentence in sentences]
+)
+
+def _derive_tokens(tokenize_type, tokenized_text):
+	#Obtain the tokens of the given tokenize type or artifact from a _TokenizedText
+	if tokenize_type == '_tokenized_text':
+		return tokenized_text
+	tokenize_info = _cache_entry(tokenize_type)
+	if 'source' in tokenize_info:
+		return tokenize_info['derive'](_derive_tokens(tokenize_info['source'], tokenized_text))
+	return tokenized_text.text
+
+def _file_key(filepath):
+	#Identifies the contents of a file by its path, modification time, and size, so that the tokens of a file
+	#are not reused once it changes. Paths that are not files (e.g. names of texts) are identified by the path alone
+	try:
+		stat = os.stat(filepath)
+	except (OSError, ValueError):
+		return filepath, None, None
+	return filepath, stat.st_mtime_ns, stat.st_size
+
+_NOT_CACHED = object()
+
+def _get_tokens(tokenize_type, text, file_key, session):
+	'''Obtain the tokens of a text, reusing those cached for this file by the tokenize type or its source'''
+	tokenize_info = _cache_entry(tokenize_type)
+	if file_key is None:
+		return tokenize_info['func'](text)
+	key = (tokenize_type, *file_key)
+	tokens = session.memory_cache.get(key, _NOT_CACHED)
+	if tokens is not _NOT_CACHED:
+		session.metrics.increment(f'tokens.{tokenize_type}.hits')
+		return tokens
+	session.metrics.increment(f'tokens.{tokenize_type}.misses')
+	#Only the time spent on this tokenize type is measured, not the time spent on its source
+	if 'source' in tokenize_info:
+		source_tokens = _get_tokens(tokenize_info['source'], text, file_key, session)
+		with session.metrics.time(f'tokenize.{tokenize_type}'):
+			tokens = tokenize_info['derive'](source_tokens)
+		#Deriving tokens may have filled in the lazily computed tokens of the source (e.g. of a _TokenizedText),
+		#which were not measured when it was cached
+		session.memory_cache.remeasure((tokenize_info['source'], *file_key))
+	else:
+		with session.metrics.time(f'tokenize.{tokenize_type}'):
+			tokens = tokenize_info['func'](text)
+	session.memory_cache.put(key, tokens)
+	return tokens
+
+_RE_BOUNDARY_REALIGNMENT = re.compile(r'[›»》’”\'\"）\)\]\}\>]+?(?:\s+|(?=--)|$)', re.MULTILINE)
+
+#Sessions activated with a with statement in each thread, the innermost last
+_active_sessions = threading.local()
+#Every session that has not been garbage collected
+_sessions = weakref.WeakSet()
 
+class ExtractionSession:
 	'''
-	Accessing private variables of punkt.PunktLanguageVars because
-	nltk has a faulty design pattern that necessitates it.
-	Issue reported here: https://github.com/nltk/nltk/issues/2068
-	'''
-
-	'''
-	A word tokenizer should strip the non word chars from words,
-	as well as periods and numbers
-	'''
-	word_tokenizer = punkt.PunktLanguageVars()
-	word_tokenizer._re_word_tokenizer = re.compile(punkt.PunktLanguageVars._word_tokenize_fmt % {
-		'NonWord': fr"(?:[\d\.{NON_WORD_CHARS}])",
-		'MultiChar': punkt.PunktLanguageVars._re_multi_char_punct,
-		'WordStart': fr"[^\d\.{NON_WORD_CHARS}]",
-	}, re.UNICODE | re.VERBOSE)
-	word_tokenizer._re_period_context = re.compile(punkt.PunktLanguageVars._period_context_fmt % {
-		'NonWord': fr"(?:[\d\.{NON_WORD_CHARS}])",
-		'SentEndChars': word_tokenizer._re_sent_end_chars,
-	}, re.UNICODE | re.VERBOSE)
-
-	'''
-	A sentence tokenizer should strip the non word chars from words.
-	This regex excludes periods because the original regex in the Punkt class
-	excludes them, and it excludes numbers because we do not want to
-	treat numbers with decimals as if they were sentences
-	'''
-	sent_tok_vars = punkt.PunktLanguageVars()
-	sent_tok_vars._re_word_tokenizer = re.compile(punkt.PunktLanguageVars._word_tokenize_fmt % {
-		'NonWord': fr"(?:[{NON_WORD_CHARS}])",
-		'MultiChar': punkt.PunktLanguageVars._re_multi_char_punct,
-		'WordStart': fr"[^{NON_WORD_CHARS}]",
-	}, re.UNICODE | re.VERBOSE)
-	sent_tok_vars._re_period_context = re.compile(punkt.PunktLanguageVars._period_context_fmt % {
-		'NonWord': fr"(?:[{NON_WORD_CHARS}])",
-		'SentEndChars': sent_tok_vars._re_sent_end_chars,
-	}, re.UNICODE | re.VERBOSE)
-
-	if language:
-		#Attempt to download language-specific pretrained sentence tokenizer models from nltk
-		#Assume that the directory name that was downloaded from running
-		#`nltk.download('punkt')` will always be named 'tokenizers'
-		nltk_punkt_dir = join(dirname(__file__), 'tokenizers')
-		if not lexists(nltk_punkt_dir):
-			print('Attempting to download language-specific sentence tokenizer models from nltk...')
-			try:
-				nltk.download(info_or_id='punkt', download_dir=dirname(__file__), raise_on_error=True)
-			except Exception as e:
-				print(
-					'Failed to download sentence tokenization language data.'
-					' Consider leaving the language unspecified. This may cause sentence tokenization to'
-					' not properly recognize abbreviations, but otherwise it has reasonable performance.',
-					file=sys.stderr
-				)
-				raise e
-			print(
-				f'Successfully downloaded tokenizer models to '
-				f'{join(abspath(dirname(__file__)), "tokenizers")}'
+	Owns the tokenizers, token caches, and feature selection of a feature extraction, so that extractions with
+	different configurations can run concurrently, one session per thread. Features use the session passed to
+	them, or else the innermost session activated in the current thread with a with statement, or else the
+	default session, which is the state set up by the module-level functions
+	'''
+	def __init__(self, *, terminal_punctuation=None, language=None, features=None):
+		self.word_tokenizer = None
+		self.sentence_tokenizer = None
+		self.tokenizer_config = None
+		self.token_cache = None
+		#Counters and timers of the tokenization and caching done by this session
+		self.metrics = Metrics()
+		self.memory_cache = MemoryCache(metrics=self.metrics)
+		self.vocabulary = Vocabulary()
+		self.debug_output = StringIO()
+		#Names of the decorated features extracted by this session, or None for all of them
+		self.features = None if features is None else list(features)
+		_sessions.add(self)
+		if terminal_punctuation is not None:
+			self.setup_tokenizers(terminal_punctuation=terminal_punctuation, language=language)
+
+	def __enter__(self):
+		if not hasattr(_active_sessions, 'stack'):
+			_active_sessions.stack = []
+		_active_sessions.stack.append(self)
+		return self
+
+	def __exit__(self, *exc_info):
+		_active_sessions.stack.pop()
+
+	def __reduce__(self):
+		#Tokenizers cannot be pickled, so worker processes that are not forked set them up again
+		return (_restore_session, (
+			self is default_session, self.tokenizer_config, self.token_cache, self.features,
+			self.memory_cache.max_entries, self.memory_cache.max_bytes,
+		))
+
+	def _language_vars(self, terminal_punctuation):
+		#nltk configures sentence boundaries with class attributes, so every session has its own subclass
+		return type('SessionLanguageVars', (punkt.PunktLanguageVars,), {
+			'__slots__': (),
+			'sent_end_chars': terminal_punctuation,
+			're_boundary_realignment': _RE_BOUNDARY_REALIGNMENT,
+		})
+
+	def clear_cache(self):
+		'''Clear tokens from previously parsed texts'''
+		#Start a new vocabulary because the cleared texts may belong to a different corpus
+		self.vocabulary = Vocabulary()
+		self.memory_cache.clear()
+		self.debug_output.truncate(0)
+		self.debug_output.seek(0)
+
+	def setup_tokenizers(self, *, terminal_punctuation, language=None):
+		'''Initialize the word tokenizer and sentence tokenizer given the terminal punctuation'''
+		if self.word_tokenizer or self.sentence_tokenizer:
+			raise Exception('Tokenizers have already been initialized')
+		#Remember the configuration so that worker processes can reproduce these tokenizers
+		self.tokenizer_config = {'terminal_punctuation': terminal_punctuation, 'language': language}
+
+		self.clear_cache()
+		language_vars = self._language_vars(terminal_punctuation)
+
+		'''
+		Accessing private variables of punkt.PunktLanguageVars because
+		nltk has a faulty design pattern that necessitates it.
+		Issue reported here: https://github.com/nltk/nltk/issues/2068
+		'''
+
+		'''
+		A word tokenizer should strip the non word chars from words,
+		as well as periods and numbers
+		'''
+		word_tokenizer = language_vars()
+		word_tokenizer._re_word_tokenizer = re.compile(punkt.PunktLanguageVars._word_tokenize_fmt % {
+			'NonWord': fr"(?:[\d\.{NON_WORD_CHARS}])",
+			'MultiChar': punkt.PunktLanguageVars._re_multi_char_punct,
+			'WordStart': fr"[^\d\.{NON_WORD_CHARS}]",
+		}, re.UNICODE | re.VERBOSE)
+		word_tokenizer._re_period_context = re.compile(punkt.PunktLanguageVars._period_context_fmt % {
+			'NonWord': fr"(?:[\d\.{NON_WORD_CHARS}])",
+			'SentEndChars': word_tokenizer._re_sent_end_chars,
+		}, re.UNICODE | re.VERBOSE)
+
+		'''
+		A sentence tokenizer should strip the non word chars from words.
+		This regex excludes periods because the original regex in the Punkt class
+		excludes them, and it excludes numbers because we do not want to
+		treat numbers with decimals as if they were sentences
+		'''
+		sent_tok_vars = language_vars()
+		sent_tok_vars._re_word_tokenizer = re.compile(punkt.PunktLanguageVars._word_tokenize_fmt % {
+			'NonWord': fr"(?:[{NON_WORD_CHARS}])",
+			'MultiChar': punkt.PunktLanguageVars._re_multi_char_punct,
+			'WordStart': fr"[^{NON_WORD_CHARS}]",
+		}, re.UNICODE | re.VERBOSE)
+		sent_tok_vars._re_period_context = re.compile(punkt.PunktLanguageVars._period_context_fmt % {
+			'NonWord': fr"(?:[{NON_WORD_CHARS}])",
+			'SentEndChars': sent_tok_vars._re_sent_end_chars,
+		}, re.UNICODE | re.VERBOSE)
+
+		if language:
+			sentence_tokenizer = _load_language_sentence_tokenizer(language)
+			#The pickled model has language variables of its own, which would ignore the terminal punctuation
+			sentence_tokenizer._lang_vars = sent_tok_vars
+		else:
+			sentence_tokenizer = punkt.PunktSentenceTokenizer(lang_vars=sent_tok_vars)
+
+		self.word_tokenizer = word_tokenizer
+		self.sentence_tokenizer = sentence_tokenizer
+
+	def setup_token_cache(self, cache_dir, *, max_bytes=2 ** 30):
+		'''
+		Persist tokenizations in cache_dir so that later runs over unchanged texts do not tokenize them again.
+		The least recently used tokenizations are evicted once the cache exceeds max_bytes
+		'''
+		self.token_cache = TokenCache(cache_dir, max_bytes=max_bytes)
+
+	def setup_memory_cache(self, *, max_entries=128, max_bytes=2 ** 28):
+		'''
+		Keep the tokens of the most recently used files in memory, at most max_entries tokenizations (one per
+		tokenize type or artifact of a file) of at most about max_bytes altogether
+		'''
+		self.memory_cache = MemoryCache(max_entries=max_entries, max_bytes=max_bytes, metrics=self.metrics)
+
+	def feature_tuples(self, names=None):
+		'''(name, decorated feature) tuples of the features named in names, or else of those this session extracts'''
+		if names is None:
+			names = list(decorated_features) if self.features is None else self.features
+		unknown = [name for name in names if name not in decorated_features]
+		if unknown:
+			raise ValueError(
+				f'The values in set {str(set(unknown))} '
+				f'are not among the decorated features in {str(decorated_features.keys())}'
 			)
+		return [(name, decorated_features[name]) for name in names]
 
-		#Attempt to load nltk data
-		models_dir = join(nltk_punkt_dir, 'punkt', 'PY3')
-		if not isdir(models_dir):
-			import errno
-			print(
-				'NLTK language data may not have been downloaded correctly.'
-				f' Consider leaving the language unspecified, or delete {abspath(nltk_punkt_dir)}'
-				' if it exists, and try again.',
-				file=sys.stderr)
-			raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), models_dir)
+	def extract(self, text, filepath=None):
+		'''Compute the features of a text. Returns a dict associating the name of each feature with its value'''
+		return {name: feature(text=text, filepath=filepath, session=self) for name, feature in self.feature_tuples()}
+
+def _module_global(name):
+	#Attribute of the default session stored in a module global, so that code using the globals keeps working
+	return property(lambda self: globals()[name], lambda self, value: globals().__setitem__(name, value))
+
+class _DefaultSession(ExtractionSession):
+	'''The session of the module-level functions, whose state is kept in the module globals'''
+	word_tokenizer = _module_global('word_tokenizer')
+	sentence_tokenizer = _module_global('sentence_tokenizer')
+	tokenizer_config = _module_global('tokenizer_config')
+	token_cache = _module_global('token_cache')
+	memory_cache = _module_global('memory_cache')
+	metrics = _module_global('metrics')
+	vocabulary = _module_global('vocabulary')
+	debug_output = _module_global('debug_output')
+
+	def _language_vars(self, terminal_punctuation):
+		#The terminal punctuation of the default session applies to every PunktLanguageVars created elsewhere
+		punkt.PunktLanguageVars.sent_end_chars = terminal_punctuation
+		punkt.PunktLanguageVars.re_boundary_realignment = _RE_BOUNDARY_REALIGNMENT
+		return punkt.PunktLanguageVars
+
+default_session = _DefaultSession()
+
+def _restore_session(is_default, tokenizer_config, token_cache, features, max_cached_entries, max_cached_bytes):
+	session = default_session if is_default else ExtractionSession()
+	if tokenizer_config is not None and not session.word_tokenizer:
+		session.setup_tokenizers(**tokenizer_config)
+	session.token_cache = token_cache
+	session.setup_memory_cache(max_entries=max_cached_entries, max_bytes=max_cached_bytes)
+	session.features = features
+	return session
+
+def current_session():
+	'''The innermost session activated in the current thread with a with statement, or else the default session'''
+	stack = getattr(_active_sessions, 'stack', None)
+	return stack[-1] if stack else default_session
+
+def _load_language_sentence_tokenizer(language):
+	#Attempt to download language-specific pretrained sentence tokenizer models from nltk
+	#Assume that the directory name that was downloaded from running
+	#`nltk.download('punkt')` will always be named 'tokenizers'
+	nltk_punkt_dir = join(dirname(__file__), 'tokenizers')
+	if not lexists(nltk_punkt_dir):
+		print('Attempting to download language-specific sentence tokenizer models from nltk...')
 		try:
-			sentence_tokenizer = pickle.load(open(join(
-				models_dir, f'{language}{os.extsep}pickle'
-			), mode='rb'))
+			nltk.download(info_or_id='punkt', download_dir=dirname(__file__), raise_on_error=True)
 		except Exception as e:
-			sep = '", "'
 			print(
-				f'Unable to load language data for "{language}"\nAvailable languages: '
-				f'''"{
-					sep.join(
-						['None'] + [m[:m.index(os.extsep)] for m in os.listdir(models_dir)
-						if m.endswith(f"{os.extsep}pickle") and isfile(join(models_dir, m))]
-					)
-				}"''',
+				'Failed to download sentence tokenization language data.'
+				' Consider leaving the language unspecified. This may cause sentence tokenization to'
+				' not properly recognize abbreviations, but otherwise it has reasonable performance.',
 				file=sys.stderr
 			)
 			raise e
-	else:
-		sentence_tokenizer = punkt.PunktSentenceTokenizer(lang_vars=punkt.PunktLanguageVars())
+		print(
+			f'Successfully downloaded tokenizer models to '
+			f'{join(abspath(dirname(__file__)), "tokenizers")}'
+		)
 
-	sentence_tokenizer._lang_vars._re_period_context = sent_tok_vars._re_period_context
-	sentence_tokenizer._lang_vars._re_word_tokenizer = sent_tok_vars._re_word_tokenizer
+	#Attempt to load nltk data
+	models_dir = join(nltk_punkt_dir, 'punkt', 'PY3')
+	if not isdir(models_dir):
+		import errno
+		print(
+			'NLTK language data may not have been downloaded correctly.'
+			f' Consider leaving the language unspecified, or delete {abspath(nltk_punkt_dir)}'
+			' if it exists, and try again.',
+			file=sys.stderr)
+		raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), models_dir)
+	try:
+		return pickle.load(open(join(
+			models_dir, f'{language}{os.extsep}pickle'
+		), mode='rb'))
+	except Exception as e:
+		sep = '", "'
+		print(
+			f'Unable to load language data for "{language}"\nAvailable languages: '
+			f'''"{
+				sep.join(
+					['None'] + [m[:m.index(os.extsep)] for m in os.listdir(models_dir)
+					if m.endswith(f"{os.extsep}pickle") and isfile(join(models_dir, m))]
+				)
+			}"''',
+			file=sys.stderr
+		)
+		raise e
+
+def clear_cache():
+	'''Clear tokens from previously parsed texts'''
+	default_session.clear_cache()
 
-def textual_feature(*, tokenize_type=None, debug=False):
-	'''Decorator for textual features'''
-	if tokenize_type not in tokenize_types:
+def setup_tokenizers(*, terminal_punctuation, language=None):
+	'''Initialize the word tokenizer and sentence tokenizer given the terminal punctuation'''
+	default_session.setup_tokenizers(terminal_punctuation=terminal_punctuation, language=language)
+
+def setup_token_cache(cache_dir, *, max_bytes=2 ** 30):
+	'''
+	Persist tokenizations in cache_dir so that later runs over unchanged texts do not tokenize them again.
+	The least recently used tokenizations are evicted once the cache exceeds max_bytes
+	'''
+	default_session.setup_token_cache(cache_dir, max_bytes=max_bytes)
+
+def setup_memory_cache(*, max_entries=128, max_bytes=2 ** 28):
+	'''
+	Keep the tokens of the most recently used files in memory, at most max_entries tokenizations (one per
+	tokenize type or artifact of a file) of at most about max_bytes altogether
+	'''
+	default_session.setup_memory_cache(max_entries=max_entries, max_bytes=max_bytes)
+
+def invalidate_tokens(name):
+	'''
+	Remove the cached tokens of a tokenize type or artifact, and of those derived from it, from every session,
+	e.g. because the function computing them changed
+	'''
+	names = {name}
+	#Sources are registered before the tokenize types and artifacts derived from them
+	for other_name, info in (*tokenize_types.items(), *derived_artifacts.items()):
+		if 'source' in info and info['source'] in names:
+			names.add(other_name)
+	for session in list(_sessions):
+		session.memory_cache.remove_if(lambda key: key[0] in names)
+
+class Accumulator:
+	'''
+	Computes a feature incrementally, so that a text never needs to be held in memory all at once.
+	init() returns the initial state, update(state, tokens) returns the state after also accounting for
+	tokens (those of the next few sentences, in the tokenize type of the feature, or the next chunk of the
+	raw text if the tokenize type is None), and finalize(state) returns the value of the feature.
+	If merge(state, next_state) is given, combining the states of consecutive pieces of a text, the pieces
+	of a long text can also be processed in parallel
+	'''
+	def __init__(self, *, init, update, finalize, merge=None):
+		if not all(callable(f) for f in (init, update, finalize)):
+			raise ValueError('init, update, and finalize must be callable')
+		if merge is not None and not callable(merge):
+			raise ValueError('merge must be callable, or None')
+		self.init = init
+		self.update = update
+		self.finalize = finalize
+		self.merge = merge
+
+def _add_counts(counts, other_counts):
+	summed = []
+	for count, other_count in zip(counts, other_counts):
+		if isinstance(count, Counter):
+			#Counters are updated in place rather than copied, since they can be as large as the vocabulary. Unlike
+			#+=, update only visits the counts being added instead of rescanning the whole Counter
+			count.update(other_count)
+		else:
+			count = count + other_count
+		summed.append(count)
+	return tuple(summed)
+
+def counting_accumulator(init, count, finalize):
+	'''
+	Accumulator of a feature computed from counts (numbers or Counters) that are summed over the pieces of a
+	text. init is the tuple of counts of an empty text, count(tokens) returns the tuple of counts of a piece,
+	and finalize(*counts) returns the value of the feature
+	'''
+	return Accumulator(
+		init=lambda: tuple(copy(count) for count in init),
+		update=lambda counts, tokens: _add_counts(counts, count(tokens)),
+		finalize=lambda counts: finalize(*counts),
+		merge=_add_counts,
+	)
+
+def textual_feature(*, tokenize_type=None, debug=False, accumulator=None):
+	'''
+	Decorator for textual features. An Accumulator computing the same feature incrementally
+	can be given, which allows the feature to be extracted in streaming mode
+	'''
+	if tokenize_type not in tokenize_types or str(tokenize_type).startswith('_'):
 		raise ValueError(
 			'"' + str(tokenize_type) + '" is not a valid tokenize type: Choose from among ' +
-			str(list(tokenize_types.keys()))
+			str([key for key in tokenize_types.keys() if not str(key).startswith('_')])
 		)
+	if accumulator is not None and not isinstance(accumulator, Accumulator):
+		raise ValueError('The accumulator must be an instance of Accumulator, or None')
 	def decor(f):
-		#TODO make this more extensible. Use keyword args somehow instead of 'text' parameter?
 		#TODO Ensure that features with duplicated names aren’t put in the ordered dict (this can happen if they come from different files)
 		reqrd_params = {'text'}
 		sig_params = signature(f).parameters
@@ -179,23 +588,43 @@ def textual_feature(*, tokenize_type=None, debug=False):
 				f'\nMinimal required parameters: {str(reqrd_params)}'
 				f'\nFound parameters: {set(sig_params) if sig_params else "{}"}'
 			)
-		def wrapper(*, text, filepath=None):
-			if not word_tokenizer or not sentence_tokenizer:
+		#Every other parameter without a default names a derived artifact (or tokenize type) passed as a keyword
+		#argument. Parameters with defaults (e.g. options bound by functools.partial) keep their values
+		artifact_names = [
+			name for name, param in sig_params.items()
+			if name not in reqrd_params and param.default is param.empty
+			and param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD)
+		]
+		for name in artifact_names:
+			if str(name).startswith('_') or (name not in tokenize_types and name not in derived_artifacts):
+				raise ValueError(
+					f'Error for feature "{f.__name__}"'
+					f'\nParameter "{name}" is not a valid derived artifact: Choose from among '
+					f'{[key for key in (*tokenize_types, *derived_artifacts) if not str(key).startswith("_")]}'
+				)
+		@wraps(f)
+		def wrapper(*, text, filepath=None, session=None, file_key=None):
+			if session is None:
+				session = current_session()
+			if not session.word_tokenizer or not session.sentence_tokenizer:
 				raise ValueError(
 					f'Tokenizers not initialized: Use'
 					f' "setup_tokenizers(terminal_punctuation=<tuple of punctutation>)"'
 					f' before running functions'
 				)
-			if not filepath:
-				return f(tokenize_types[tokenize_type]['func'](text))
-
-			#Cache the tokenized version of this text if this filepath is new
-			if tokenize_types[tokenize_type]['prev_filepath'] != filepath:
-				tokenize_types[tokenize_type]['prev_filepath'] = filepath
-				tokenize_types[tokenize_type]['tokens'] = tokenize_types[tokenize_type]['func'](text)
-			elif debug:
-				debug_output.write('Cache hit! ' + 'function: <' + f.__name__ + '>, filepath: ' + filepath + '\n')
-			return f(tokenize_types[tokenize_type]['tokens'])
+			#Callers computing several features of a file identify it once, rather than each feature stat'ing it
+			if file_key is None and filepath:
+				file_key = _file_key(filepath)
+			if debug and file_key and (tokenize_type, *file_key) in session.memory_cache:
+				session.debug_output.write('Cache hit! ' + 'function: <' + f.__name__ + '>, filepath: ' + filepath + '\n')
+			#Tokenizing without a filepath uses the active session, so the session is activated for the call
+			with session:
+				return f(_get_tokens(tokenize_type, text, file_key, session), **{
+					name: _get_tokens(name, text, file_key, session) for name in artifact_names
+				})
+		wrapper.tokenize_type = tokenize_type
+		wrapper.artifact_names = artifact_names
+		wrapper.accumulator = accumulator
 		decorated_features[f.__name__] = wrapper
 		return wrapper
 	return decor
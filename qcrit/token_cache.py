@@ -0,0 +1,100 @@
+'''
+Persistent cache of tokenizations, so that texts which have not changed since a previous run
+do not need to be tokenized again
+'''
+import os
+from os.path import join, isdir
+from threading import get_ident
+from array import array
+from hashlib import sha256
+
+#Bump the version whenever the layout of cached entries changes
+_MAGIC = b'QCTK\x01'
+_TYPECODE = 'I'
+
+class TokenCache:
+	'''
+	A directory of cached (start, end) offset spans, keyed by a hash of the text and the tokenizer
+	configuration. Each entry is a small header followed by the offsets as a packed array of unsigned
+	integers, which loads much faster than tokenizing the text again. Once the entries exceed max_bytes,
+	the least recently used entries are evicted.
+	'''
+	def __init__(self, cache_dir, *, max_bytes=2 ** 30):
+		if not isdir(cache_dir): raise ValueError(f'Path "{cache_dir}" is not a valid directory')
+		if not isinstance(max_bytes, int) or max_bytes <= 0: raise ValueError('max_bytes must be a positive integer')
+		self.cache_dir = cache_dir
+		self.max_bytes = max_bytes
+		self._size = None
+
+	@staticmethod
+	def key(kind, text, config):
+		'''Hash identifying the spans of the given kind for a text tokenized with the given configuration'''
+		digest = sha256(repr((_MAGIC, kind, config)).encode('utf-8'))
+		digest.update(text.encode('utf-8', errors='surrogatepass'))
+		return digest.hexdigest()
+
+	def _path(self, key):
+		return join(self.cache_dir, f'{key}{os.extsep}spans')
+
+	def get(self, key):
+		'''Return the list of cached (start, end) spans, or None if they are not cached'''
+		path = self._path(key)
+		try:
+			with open(path, mode='rb') as cache_file:
+				data = cache_file.read()
+			#Refresh the modification time, which orders entries for least recently used eviction
+			os.utime(path)
+		except OSError:
+			return None
+		if not data.startswith(_MAGIC):
+			return None
+		offsets = array(chr(data[len(_MAGIC)]))
+		offsets.frombytes(data[len(_MAGIC) + 1:])
+		it = iter(offsets)
+		return list(zip(it, it))
+
+	def put(self, key, spans):
+		'''Store (start, end) spans'''
+		offsets = array(_TYPECODE)
+		for start, end in spans:
+			offsets.append(start)
+			offsets.append(end)
+		data = _MAGIC + _TYPECODE.encode('ascii') + offsets.tobytes()
+
+		#Write to a temporary file first so that concurrent readers never observe a partial entry. Its name is
+		#unique to the process and thread, since sessions in several threads may share the directory
+		path = self._path(key)
+		tmp_path = f'{path}{os.extsep}{os.getpid()}{os.extsep}{get_ident()}{os.extsep}tmp'
+		with open(tmp_path, mode='wb') as cache_file:
+			cache_file.write(data)
+		os.replace(tmp_path, path)
+
+		if self._size is None:
+			self._size = self._entry_sizes_by_age()[1]
+		else:
+			self._size += len(data)
+		if self._size > self.max_bytes:
+			self._evict()
+
+	def _entry_sizes_by_age(self):
+		entries = []
+		total = 0
+		with os.scandir(self.cache_dir) as dir_entries:
+			for entry in dir_entries:
+				if entry.name.endswith(f'{os.extsep}spans') and entry.is_file():
+					stat = entry.stat()
+					entries.append((stat.st_mtime, entry.path, stat.st_size))
+					total += stat.st_size
+		return sorted(entries), total
+
+	def _evict(self):
+		#Other processes may share this directory, so measure it rather than trusting the running total
+		entries, self._size = self._entry_sizes_by_age()
+		for _, path, size in entries:
+			if self._size <= self.max_bytes:
+				break
+			try:
+				os.remove(path)
+			except FileNotFoundError:
+				pass
+			self._size -= size
@@ -0,0 +1,118 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test extraction from corpora in archives'''
+import unittest
+import os
+import pickle
+import tarfile
+import zipfile
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature, counting_accumulator
+from qcrit.archive import CorpusArchive
+from qcrit.extract_features import main, parse_tess, parse_tess_chunks, parse_tess_mmap
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+_TESS_FILES = sorted(file_name for file_name in os.listdir(_DEMO_DIR) if file_name.endswith('.tess'))
+
+@feature(tokenize_type='words', accumulator=counting_accumulator((0,), lambda words: (len(words),), lambda n: n))
+def archived_num_words(text):
+	return len(text)
+
+@feature(tokenize_type='sentences', accumulator=counting_accumulator(
+	(0,), lambda sentences: (len(sentences),), lambda n: n
+))
+def archived_num_sentences(text):
+	return len(text)
+
+_FEATURES = ['archived_num_words', 'archived_num_sentences']
+
+def _member_names():
+	#Members in reverse order, so that the order they are stored in differs from the order of their names
+	return {
+		f'texts/{"verse" if i % 2 else "prose"}/{file_name}': os.path.join(_DEMO_DIR, file_name)
+		for i, file_name in reversed(list(enumerate(_TESS_FILES)))
+	}
+
+def _make_archives(tmp_dir):
+	paths = {}
+	for extension, mode in (('tar', 'w'), ('tar.gz', 'w:gz'), ('tar.xz', 'w:xz')):
+		paths[extension] = os.path.join(tmp_dir, f'corpus.{extension}')
+		with tarfile.open(paths[extension], mode=mode) as tar_file:
+			for member_name, file_name in _member_names().items():
+				tar_file.add(file_name, arcname=member_name)
+			tar_file.add(os.path.join(_DEMO_DIR, 'classifications.csv'), arcname='texts/classifications.csv')
+	paths['zip'] = os.path.join(tmp_dir, 'corpus.zip')
+	with zipfile.ZipFile(paths['zip'], mode='w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+		for member_name, file_name in _member_names().items():
+			zip_file.write(file_name, arcname=member_name)
+	return paths
+
+def _extract(corpus_dir, output_file, **options):
+	main(
+		corpus_dir=corpus_dir, file_extension_to_parse_function={'tess': parse_tess}, features=_FEATURES,
+		output_file=output_file, **options
+	)
+	with open(output_file, mode='rb') as pickle_file:
+		return pickle.load(pickle_file)
+
+class TestArchive(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def test_members(self):
+		with TemporaryDirectory() as tmp_dir:
+			for path in _make_archives(tmp_dir).values():
+				with CorpusArchive(path) as archive:
+					self.assertEqual(archive.member_names(['tess']), list(_member_names()))
+					self.assertEqual(archive.member_names(['tess'], {'texts/verse/'}, exclude=['*/aristoph*']), [
+						'texts/prose/euripides.heracles.tess'
+					])
+					self.assertEqual(archive.member_names(['tess'], include=['texts/verse/*']), [
+						name for name in _member_names() if '/verse/' in name
+					])
+					for member_name, file_name in _member_names().items():
+						for parser in (parse_tess, parse_tess_mmap):
+							with archive.open(member_name) as member:
+								self.assertEqual(parser(member), parse_tess(file_name))
+						with archive.open(member_name) as member:
+							self.assertEqual(list(parse_tess_chunks(member)), list(parse_tess_chunks(file_name)))
+						self.assertEqual(archive.file_stat(member_name)[0], os.path.getsize(file_name))
+					self.assertIsNone(archive.file_stat('texts/missing.tess'))
+
+	def test_main(self):
+		with TemporaryDirectory() as tmp_dir:
+			expected = _extract(_DEMO_DIR, os.path.join(tmp_dir, 'expected.pickle'))
+			expected = {
+				member_name: expected[os.path.join(_DEMO_DIR, os.path.basename(member_name))]
+				for member_name in sorted(_member_names())
+			}
+			for extension, path in _make_archives(tmp_dir).items():
+				for i, options in enumerate(({}, {'jobs': 2}, {'streaming': True}, {'piece_size': 50000, 'jobs': 2})):
+					output_file = os.path.join(tmp_dir, f'{extension}.{i}.pickle')
+					rows = _extract(path, output_file, **options)
+					self.assertEqual(rows, expected)
+					self.assertEqual(list(rows), list(expected))
+			self.assertRaises(
+				ValueError, main, corpus_dir=os.path.join(tmp_dir, 'corpus.tar'),
+				file_extension_to_parse_function={'tess': parse_tess},
+				discovery_manifest=os.path.join(tmp_dir, 'manifest.json')
+			)
+
+	def test_incremental(self):
+		with TemporaryDirectory() as tmp_dir:
+			path = _make_archives(tmp_dir)['tar.gz']
+			output_file = os.path.join(tmp_dir, 'output.pickle')
+			store = os.path.join(tmp_dir, 'store.sqlite')
+			expected = _extract(path, output_file, incremental=True, result_store=store)
+			self.assertEqual(_extract(path, output_file, incremental=True, result_store=store), expected)
+			os.remove(output_file)
+			#Every value is reused from the store
+			self.assertEqual(_extract(path, output_file, result_store=store), expected)
+
+if __name__ == '__main__':
+	unittest.main()
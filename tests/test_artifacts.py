@@ -0,0 +1,85 @@
+#pylint: disable = missing-docstring, invalid-name, unused-argument
+'''Test derived artifacts'''
+import unittest
+from collections import Counter
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', '?'))
+
+calls = []
+
+def _longest_word(words):
+	calls.append(words)
+	return max(words, key=len)
+
+textual_feature.register_artifact('longest_word', source='words', func=_longest_word)
+textual_feature.register_artifact('longest_word_length', source='longest_word', func=len)
+
+@textual_feature.textual_feature(tokenize_type='sentences')
+def longest_word(text, longest_word):
+	return longest_word
+
+@textual_feature.textual_feature(tokenize_type='words')
+def longest_word_share(text, longest_word_length, total_chars):
+	return longest_word_length / total_chars
+
+@textual_feature.textual_feature(tokenize_type='sentence_words')
+def sentence_lengths(text, sentence_char_lengths):
+	return sentence_char_lengths
+
+@textual_feature.textual_feature(tokenize_type='words')
+def num_long_words(text, total_chars, min_length=3, *args, **kwargs):
+	return sum(1 for word in text if len(word) >= min_length) + total_chars
+
+class TestArtifacts(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+		calls.clear()
+
+	def test_values(self):
+		file = 'ab abcd. a abc? abcde a.'
+		self.assertEqual(longest_word(text=file), 'abcde')
+		self.assertEqual(longest_word_share(text=file, filepath='abc/def'), 5 / 19)
+		self.assertEqual(sentence_lengths(text=file, filepath='abc/def'), [7, 5, 7])
+		for text in ('', file, 'ἄλλη ἀλλή; “quoted” \U0001F600 \ud800'):
+			char_counts = textual_feature.count_chars(text)
+			self.assertIsInstance(char_counts, Counter)
+			self.assertEqual(char_counts, Counter(text))
+
+	def test_computed_once_per_file(self):
+		file = 'ab abcd. a abc? abcde a.'
+		longest_word(text=file, filepath='abc/def')
+		longest_word_share(text=file, filepath='abc/def')
+		self.assertEqual(len(calls), 1)
+		longest_word(text=file, filepath='abc/ghi')
+		self.assertEqual(len(calls), 2)
+		textual_feature.clear_cache()
+		self.assertEqual(len(textual_feature.memory_cache), 0)
+		longest_word(text=file, filepath='abc/ghi')
+		self.assertEqual(len(calls), 3)
+
+	def test_parameters_with_defaults(self):
+		#Parameters with default values are not artifacts, and keep their values
+		self.assertEqual(num_long_words(text='Aaa bb cccc d.'), 2 + 11)
+
+	def test_invalid_declarations(self):
+		with self.assertRaises(ValueError):
+			textual_feature.register_artifact('words', source='words', func=len)
+		with self.assertRaises(ValueError):
+			textual_feature.register_artifact('longest_word', source='words', func=len)
+		with self.assertRaises(ValueError):
+			textual_feature.register_artifact('num_words', source='nonexistent', func=len)
+		with self.assertRaises(ValueError):
+			@textual_feature.textual_feature(tokenize_type='words')
+			def nonexistent_artifact(text, nonexistent):
+				return nonexistent
+		with self.assertRaises(ValueError):
+			@textual_feature.textual_feature(tokenize_type='words')
+			def private_artifact(text, _tokenized_text):
+				return _tokenized_text
+
+if __name__ == '__main__':
+	unittest.main()
@@ -56,13 +56,12 @@ class TestTextualFeature(unittest.TestCase):
 			'Cache hit! function: <rup>, filepath: abc/def\n'
 		)
 
-		self.assertEqual(qcrit.textual_feature.tokenize_types['sentences']['prev_filepath'], 'abc/def')
-		self.assertEqual(qcrit.textual_feature.tokenize_types['sentences']['tokens'], ['test test.', 'test test test test test test?', 'test test.', 'test.'])
+		self.assertEqual(qcrit.textual_feature.memory_cache.get(('sentences', 'abc/def', None, None)), ['test test.', 'test test test test test test?', 'test test.', 'test.'])
 
 		qcrit.textual_feature.clear_cache()
 
-		self.assertEqual(qcrit.textual_feature.tokenize_types[None]['prev_filepath'], None)
-		self.assertEqual(qcrit.textual_feature.tokenize_types[None]['tokens'], None)
+		self.assertNotIn(('sentences', 'abc/def', None, None), qcrit.textual_feature.memory_cache)
+		self.assertEqual(len(qcrit.textual_feature.memory_cache), 0)
 
 		filename = 'abc/ghi'
 		foo(text=file, filepath=filename)
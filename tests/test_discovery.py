@@ -0,0 +1,149 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test discovery of the files of a corpus'''
+import unittest
+import os
+from os.path import join
+import json
+import pickle
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import context #pylint: disable=unused-import
+from qcrit import discovery, textual_feature
+from qcrit.discovery import discover
+from qcrit.extract_features import main, parse_tess
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+@textual_feature.textual_feature(tokenize_type='words')
+def discovered_num_words(text):
+	return len(text)
+
+def _walk(corpus_dir, file_extensions, excluded_paths):
+	#Discovery as it was done with os.walk
+	file_names = []
+	for current_path, current_dir_names, current_file_names in os.walk(corpus_dir, topdown=True):
+		current_dir_names[:] = [
+			name for name in current_dir_names if join(current_path, name) + os.sep not in excluded_paths
+		]
+		for current_file_name in current_file_names:
+			if '.' in current_file_name and current_file_name[current_file_name.rindex('.') + 1:] in file_extensions \
+			and join(current_path, current_file_name) not in excluded_paths:
+				file_names.append(join(current_path, current_file_name))
+	return sorted(file_names)
+
+def _make_corpus(corpus_dir):
+	for relative_path in (
+		'a.tess', 'b.txt', 'c', 'drafts/d.tess', 'x/e.tess', 'x/drafts/f.tess', 'x/y/g.tess', 'x/y/h.tess.bak',
+		'z/i.tess',
+	):
+		os.makedirs(join(corpus_dir, os.path.dirname(relative_path)), exist_ok=True)
+		with open(join(corpus_dir, relative_path), mode='w') as text_file:
+			text_file.write('<tag> text. ')
+	os.symlink(join(corpus_dir, 'x'), join(corpus_dir, 'link'))
+	os.symlink(join(corpus_dir, 'a.tess'), join(corpus_dir, 'linked.tess'))
+
+def _relative(corpus_dir, file_names):
+	return [os.path.relpath(file_name, corpus_dir).replace(os.sep, '/') for file_name in file_names]
+
+class TestDiscovery(unittest.TestCase):
+
+	def test_same_as_walk(self):
+		self.assertEqual(discover(_DEMO_DIR, ['tess']), _walk(_DEMO_DIR, ['tess'], set()))
+		with TemporaryDirectory() as corpus_dir:
+			_make_corpus(corpus_dir)
+			for excluded_paths in (set(), {join(corpus_dir, 'x') + os.sep, join(corpus_dir, 'a.tess')}):
+				for jobs in (1, 3):
+					self.assertEqual(
+						discover(corpus_dir, ['tess', 'txt'], excluded_paths, jobs=jobs),
+						_walk(corpus_dir, ['tess', 'txt'], excluded_paths)
+					)
+
+	def test_patterns(self):
+		with TemporaryDirectory() as corpus_dir:
+			_make_corpus(corpus_dir)
+			self.assertEqual(_relative(corpus_dir, discover(corpus_dir, ['tess'], exclude=['*drafts'])), [
+				'a.tess', 'linked.tess', 'x/e.tess', 'x/y/g.tess', 'z/i.tess'
+			])
+			self.assertEqual(_relative(corpus_dir, discover(corpus_dir, ['tess'], include=['x/*', 'z/*'])), [
+				'x/drafts/f.tess', 'x/e.tess', 'x/y/g.tess', 'z/i.tess'
+			])
+			self.assertEqual(_relative(corpus_dir, discover(
+				corpus_dir, ['tess'], include=['x/*'], exclude=['x/y', '*/f.tess'], jobs=2
+			)), ['x/e.tess'])
+			self.assertRaises(
+				ValueError, main, corpus_dir=corpus_dir, file_extension_to_parse_function={'tess': parse_tess},
+				include_patterns='x/*'
+			)
+
+	def test_manifest_encoding(self):
+		#The manifest is UTF-8 whatever the locale
+		with TemporaryDirectory() as tmp_dir:
+			corpus_dir = join(tmp_dir, 'corpus')
+			os.mkdir(corpus_dir)
+			with open(join(corpus_dir, 'πλάτων.tess'), mode='w') as text_file:
+				text_file.write('<tag> text. ')
+			manifest_file = join(tmp_dir, 'manifest.json')
+			expected = [join(corpus_dir, 'πλάτων.tess')]
+			self.assertEqual(discover(corpus_dir, ['tess'], manifest_file=manifest_file), expected)
+			with open(manifest_file, mode='rb') as json_file:
+				self.assertIn('"πλάτων.tess"'.encode('utf-8'), json_file.read())
+			os.utime(corpus_dir, ns=(0, 0))
+			discover(corpus_dir, ['tess'], manifest_file=manifest_file)
+			with mock.patch.object(discovery.os, 'scandir', wraps=os.scandir) as scandir:
+				self.assertEqual(discover(corpus_dir, ['tess'], manifest_file=manifest_file), expected)
+				self.assertEqual(scandir.call_count, 0)
+
+	def test_manifest(self):
+		with TemporaryDirectory() as tmp_dir:
+			corpus_dir = join(tmp_dir, 'corpus')
+			_make_corpus(corpus_dir)
+			manifest_file = join(tmp_dir, 'manifest.json')
+			expected = discover(corpus_dir, ['tess'])
+			#Directories modified just before they are listed are listed again on the next run
+			self.assertEqual(discover(corpus_dir, ['tess'], manifest_file=manifest_file), expected)
+			with open(manifest_file, encoding='utf-8') as json_file:
+				listings = json.load(json_file)['directories']
+			#Only the names of the files are recorded, since their sizes and modification times would be stale once
+			#the listing is reused
+			self.assertIn('g.tess', listings[join(corpus_dir, 'x', 'y')]['files'])
+			self.assertTrue(all(isinstance(name, str) for listing in listings.values() for name in listing['files']))
+			for path in listings:
+				os.utime(path, ns=(0, 0))
+			discover(corpus_dir, ['tess'], manifest_file=manifest_file)
+
+			#Unmodified directories are not listed again
+			with mock.patch.object(discovery.os, 'scandir', wraps=os.scandir) as scandir:
+				self.assertEqual(discover(corpus_dir, ['tess'], manifest_file=manifest_file, jobs=2), expected)
+				self.assertEqual(scandir.call_count, 0)
+				#Patterns apply to the cached listings too
+				self.assertEqual(_relative(corpus_dir, discover(
+					corpus_dir, ['tess'], exclude=['x'], manifest_file=manifest_file
+				)), ['a.tess', 'drafts/d.tess', 'linked.tess', 'z/i.tess'])
+
+				#Only modified directories are listed again
+				with open(join(corpus_dir, 'x', 'y', 'new.tess'), mode='w') as text_file:
+					text_file.write('<tag> text. ')
+				os.remove(join(corpus_dir, 'z', 'i.tess'))
+				self.assertEqual(
+					discover(corpus_dir, ['tess'], manifest_file=manifest_file),
+					sorted(set(expected) - {join(corpus_dir, 'z', 'i.tess')} | {join(corpus_dir, 'x', 'y', 'new.tess')})
+				)
+				self.assertEqual(scandir.call_count, 2)
+
+			#Extraction uses the patterns and the manifest too
+			output_file = join(tmp_dir, 'output.pickle')
+			main(
+				corpus_dir=corpus_dir, file_extension_to_parse_function={'tess': parse_tess},
+				features=['discovered_num_words'], output_file=output_file, include_patterns=['x/*'],
+				exclude_patterns=['*drafts'], discovery_manifest=manifest_file
+			)
+			with open(output_file, mode='rb') as pickle_file:
+				self.assertEqual(_relative(corpus_dir, pickle.load(pickle_file)), [
+					'x/e.tess', 'x/y/g.tess', 'x/y/new.tess'
+				])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -1,19 +1,32 @@
 #pylint: disable = missing-docstring, blacklisted-name, unused-argument, invalid-name
 '''Test feature extraction'''
 import unittest
+import os
+import pickle
+from io import StringIO
+from collections import Counter
+from contextlib import redirect_stdout
+from tempfile import TemporaryDirectory
+from unittest import mock
 
 import context #pylint: disable=unused-import
-from qcrit.extract_features import main, parse_tess
+from qcrit.extract_features import main, parse_tess, parse_tess_mmap
 from qcrit.textual_feature import textual_feature, setup_tokenizers
 
 #Run this file with "-b" to ignore output in passing tests (failing tests still display output)
 
 setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
 
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
 @textual_feature(tokenize_type='words', debug=True)
 def dummy_feature(text):
 	pass
 
+@textual_feature(tokenize_type='sentence_words')
+def num_sentence_words(text):
+	return sum(len(sentence) for sentence in text)
+
 class TestExtractFeatures(unittest.TestCase):
 
 	def testAllNone(self):
@@ -46,5 +59,51 @@ class TestExtractFeatures(unittest.TestCase):
 	def testOutputDirectoryValidAndNoFile2(self):
 		self.assertRaises(ValueError, main, corpus_dir='.', file_extension_to_parse_function={'tess': parse_tess}, output_file='.')
 
+	def testInvalidJobs(self):
+		self.assertRaises(ValueError, main, corpus_dir='.', file_extension_to_parse_function={'tess': parse_tess}, jobs=0)
+
+	def testParallelMatchesSerial(self):
+		with TemporaryDirectory() as tmp_dir:
+			serial_file = os.path.join(tmp_dir, 'serial.pickle')
+			parallel_file = os.path.join(tmp_dir, 'parallel.pickle')
+			main(corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess}, output_file=serial_file)
+			main(
+				corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+				output_file=parallel_file, jobs=2
+			)
+			with open(serial_file, mode='rb') as serial, open(parallel_file, mode='rb') as parallel:
+				serial_bytes = serial.read()
+				self.assertEqual(serial_bytes, parallel.read())
+			self.assertEqual(list(pickle.loads(serial_bytes)), sorted(pickle.loads(serial_bytes)))
+
+	def testFilesStatedOnce(self):
+		#Features share the key identifying the tokens of a file, so it is stat'ed once, not once per feature
+		file_names = [os.path.join(_DEMO_DIR, name) for name in os.listdir(_DEMO_DIR) if name.endswith('.tess')]
+		with mock.patch.object(os, 'stat', wraps=os.stat) as stat, redirect_stdout(StringIO()):
+			main(
+				corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+				features=['dummy_feature', 'num_sentence_words']
+			)
+		stats = Counter(call[0][0] for call in stat.call_args_list if call[0][0] in file_names)
+		self.assertEqual(stats, Counter(file_names))
+
+	def testParseTessMmap(self):
+		for file_name in os.listdir(_DEMO_DIR):
+			if file_name.endswith('.tess'):
+				file_name = os.path.join(_DEMO_DIR, file_name)
+				self.assertEqual(parse_tess_mmap(file_name), parse_tess(file_name))
+		with TemporaryDirectory() as tmp_dir:
+			file_name = os.path.join(tmp_dir, 'text.tess')
+			for data in (
+				'', 'untagged\n', '<a> one\n\n<b>two > three \t\x1f\nfour\n<c>\n<d>\x0bfive', '<a>\xa0one\xa0\n<b>two\u3000',
+				'<a> one\r\n<b> two\r<c>three', '\ufeff<a> one\n<b> two\n', '<a>τρία δύο \n',
+			):
+				with open(file_name, mode='w', encoding='utf-8', newline='') as tess_file:
+					tess_file.write(data)
+				self.assertEqual(parse_tess_mmap(file_name), parse_tess(file_name))
+			with open(file_name, mode='w') as tess_file:
+				tess_file.write('<a> one\n<b two\n')
+			self.assertRaises(AssertionError, parse_tess_mmap, file_name)
+
 if __name__ == '__main__':
 	unittest.main()
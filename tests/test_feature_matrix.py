@@ -0,0 +1,112 @@
+#pylint: disable = missing-docstring, invalid-name, unused-argument
+'''Test the columnar output format of feature extraction'''
+import unittest
+import os
+import pickle
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature, analyze_models
+from qcrit.textual_feature import textual_feature as feature
+from qcrit.extract_features import main, parse_tess
+from qcrit.feature_matrix import write_matrix, load_matrix, read_results, rows_path
+from qcrit.model_analyzer import model_analyzer
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+_FEATURES = ['num_words', 'mean_word_length', 'num_sentences']
+
+@feature(tokenize_type='words')
+def num_words(text):
+	return len(text)
+
+@feature(tokenize_type='words')
+def mean_word_length(text):
+	return sum(len(word) for word in text) / len(text)
+
+@feature(tokenize_type='sentences')
+def num_sentences(text):
+	return len(text)
+
+analyzed = []
+
+@model_analyzer()
+def capture(data, target, file_names, feature_names, labels_key):
+	analyzed.append((data, target, file_names, feature_names, labels_key))
+
+class TestFeatureMatrix(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+		analyzed.clear()
+
+	def test_write_and_load(self):
+		with TemporaryDirectory() as tmp_dir:
+			matrix_file = os.path.join(tmp_dir, 'output.npy')
+			text_to_features = {'b': {'x': 1, 'y': 2.5}, 'a': {'y': 4, 'x': 3}}
+			write_matrix(matrix_file, text_to_features, ['x', 'y'])
+			matrix, file_names, feature_names = load_matrix(matrix_file)
+			self.assertIsInstance(matrix, np.memmap)
+			self.assertEqual(matrix.dtype, np.float64)
+			self.assertEqual(matrix.tolist(), [[1, 2.5], [3, 4]])
+			self.assertEqual((file_names, feature_names), (['b', 'a'], ['x', 'y']))
+			self.assertEqual(read_results(matrix_file), text_to_features)
+			self.assertRaises(ValueError, write_matrix, matrix_file, {'a': {'x': 'text'}}, ['x'])
+			with open(rows_path(matrix_file), mode='w') as rows_file:
+				rows_file.write('["a"]')
+			self.assertRaises(ValueError, load_matrix, matrix_file)
+
+			#The index files are UTF-8 whatever the locale
+			write_matrix(matrix_file, {'πλάτων.tess': {'μῆκος': 1}}, ['μῆκος'])
+			with open(rows_path(matrix_file), mode='rb') as rows_file:
+				self.assertEqual(rows_file.read(), '["πλάτων.tess"]'.encode('utf-8'))
+			self.assertEqual(load_matrix(matrix_file)[1:], (['πλάτων.tess'], ['μῆκος']))
+
+	def test_main(self):
+		with TemporaryDirectory() as tmp_dir:
+			pickle_file = os.path.join(tmp_dir, 'output.pickle')
+			matrix_file = os.path.join(tmp_dir, 'output.npy')
+			for output_file in (pickle_file, matrix_file):
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+					features=_FEATURES, output_file=output_file
+				)
+			with open(pickle_file, mode='rb') as output:
+				expected = pickle.load(output)
+			matrix, file_names, feature_names = load_matrix(matrix_file)
+			self.assertEqual(file_names, list(expected))
+			self.assertEqual(feature_names, _FEATURES)
+			self.assertEqual(matrix.tolist(), [[row[name] for name in _FEATURES] for row in expected.values()])
+
+			#The rows of unclassified files are left out, and rows and columns are sorted, as for pickles
+			classification_file = os.path.join(tmp_dir, 'classifications.csv')
+			with open(classification_file, mode='w') as csv_file:
+				csv_file.write('verse:0,prose:1\nFilename,Label\n')
+				for i, file_name in enumerate(reversed(file_names[1:])):
+					csv_file.write(f'{file_name},{i % 2}\n')
+			for output_file in (pickle_file, matrix_file):
+				analyze_models.main(output_file, classification_file, model_funcs=['capture'])
+			(pickle_data, *pickle_rest), (matrix_data, *matrix_rest) = analyzed
+			self.assertEqual(pickle_rest[1:], matrix_rest[1:])
+			self.assertEqual(pickle_rest[0].tolist(), matrix_rest[0].tolist())
+			self.assertEqual(matrix_rest[1], sorted(file_names[1:]))
+			self.assertEqual(matrix_rest[2], sorted(_FEATURES))
+			self.assertTrue(np.array_equal(pickle_data, matrix_data))
+
+	def test_incremental(self):
+		with TemporaryDirectory() as tmp_dir:
+			matrix_file = os.path.join(tmp_dir, 'output.npy')
+			for features in (_FEATURES[:1], _FEATURES):
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+					features=features, output_file=matrix_file, incremental=True
+				)
+			matrix, _, feature_names = load_matrix(matrix_file)
+			self.assertEqual(feature_names, _FEATURES)
+			self.assertFalse(np.isnan(matrix).any())
+
+if __name__ == '__main__':
+	unittest.main()
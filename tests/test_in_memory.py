@@ -0,0 +1,132 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test feature extraction from texts in memory'''
+import unittest
+import os
+import pickle
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import numpy as np
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature, in_memory
+from qcrit.textual_feature import textual_feature as feature, ExtractionSession
+from qcrit.extract_features import main, parse_tess
+from qcrit.in_memory import extract_text_features, extract_matrix
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+_FEATURES = ['in_memory_num_words', 'in_memory_num_long_words', 'in_memory_num_sentences']
+
+@feature(tokenize_type='words')
+def in_memory_num_words(text):
+	return len(text)
+
+@feature(tokenize_type='words')
+def in_memory_num_long_words(text):
+	return sum(1 for word in text if len(word) > 5)
+
+@feature(tokenize_type='sentences')
+def in_memory_num_sentences(text):
+	return len(text)
+
+@feature(tokenize_type='words')
+def in_memory_first_word(text):
+	return text[0]
+
+def _demo_texts():
+	return [
+		(file_name, parse_tess(os.path.join(_DEMO_DIR, file_name)))
+		for file_name in sorted(os.listdir(_DEMO_DIR)) if file_name.endswith('.tess')
+	]
+
+class TestInMemory(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def test_same_as_files(self):
+		with TemporaryDirectory() as tmp_dir:
+			output_file = os.path.join(tmp_dir, 'output.pickle')
+			main(
+				corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess}, features=_FEATURES,
+				output_file=output_file
+			)
+			with open(output_file, mode='rb') as pickle_file:
+				expected = {
+					os.path.basename(file_name): values for file_name, values in pickle.load(pickle_file).items()
+				}
+		for jobs in (1, 2):
+			rows = list(extract_text_features((text for text in _demo_texts()), _FEATURES, jobs=jobs, batch_size=1))
+			self.assertEqual(dict(rows), expected)
+			self.assertEqual([document_id for document_id, _ in rows], list(expected))
+			matrix, document_ids, feature_names = extract_matrix(iter(_demo_texts()), _FEATURES, jobs=jobs)
+			self.assertEqual((document_ids, feature_names), (list(expected), _FEATURES))
+			self.assertEqual(matrix.dtype, np.float64)
+			self.assertEqual(matrix.tolist(), [
+				[expected[name][feature_name] for feature_name in _FEATURES] for name in expected
+			])
+
+	def test_lazy(self):
+		num_read = [0]
+		def texts():
+			for i in range(10 ** 6):
+				num_read[0] += 1
+				yield i, 'Aaa bbb. Ccc ddd eeeeeee; ' * (i % 5 + 1)
+		rows = extract_text_features(texts(), _FEATURES)
+		self.assertEqual(num_read[0], 0)
+		for i, (document_id, values) in zip(range(100), rows):
+			self.assertEqual(document_id, i)
+			self.assertEqual(values['in_memory_num_sentences'], 2 * (i % 5 + 1))
+		self.assertEqual(num_read[0], 100)
+		rows.close()
+		#Workers are sent at most two batches each at a time
+		rows = extract_text_features(texts(), _FEATURES, jobs=2, batch_size=10)
+		self.assertEqual(next(rows)[0], 0)
+		self.assertLessEqual(num_read[0], 100 + 2 * 2 * 10)
+		rows.close()
+
+	def test_tokens(self):
+		session = ExtractionSession(terminal_punctuation=('.',), features=_FEATURES[:2])
+		texts = [(1, 'Aaa bbbbbbbb. Ccc.'), (2, 'Ddd eee.'), (1, 'Fff ggggggg hhhhhhhh.')]
+		self.assertEqual(list(extract_text_features(texts, session=session)), [
+			(1, {'in_memory_num_words': 5, 'in_memory_num_long_words': 1}),
+			(2, {'in_memory_num_words': 3, 'in_memory_num_long_words': 0}),
+			(1, {'in_memory_num_words': 4, 'in_memory_num_long_words': 2}),
+		])
+		#The features of a text share its tokens, which are not kept once its features are computed
+		counters = session.metrics.as_dict()['counters']
+		self.assertEqual((counters['tokens.words.misses'], counters['tokens.words.hits']), (3, 3))
+		self.assertEqual(len(session.memory_cache), 0)
+
+		with TemporaryDirectory() as tmp_dir:
+			session.setup_token_cache(tmp_dir)
+			list(extract_text_features(texts, session=session))
+			list(extract_text_features(texts, session=session))
+			self.assertEqual(session.metrics.as_dict()['counters']['token_cache.hits'], 3)
+
+	def test_matrix(self):
+		texts = [(str(i), 'Aaa bbb. ' * i) for i in range(1, 12)]
+		with mock.patch.object(in_memory, '_BLOCK_ROWS', 4):
+			matrix, document_ids, feature_names = extract_matrix(
+				texts, ['in_memory_num_sentences', 'in_memory_num_words']
+			)
+		self.assertEqual(matrix.shape, (11, 2))
+		self.assertEqual(document_ids, [str(i) for i in range(1, 12)])
+		self.assertEqual(feature_names, ['in_memory_num_sentences', 'in_memory_num_words'])
+		self.assertEqual(matrix.tolist(), [[i, 3 * i] for i in range(1, 12)])
+		matrix, document_ids, _ = extract_matrix([], ['in_memory_num_words'])
+		self.assertEqual((matrix.shape, document_ids), ((0, 1), []))
+
+		self.assertRaises(ValueError, extract_matrix, texts, ['in_memory_first_word'])
+		self.assertRaises(ValueError, extract_text_features, texts, ['not_a_feature'])
+		self.assertRaises(ValueError, extract_text_features, texts, [])
+		self.assertRaises(ValueError, extract_text_features, texts, session=ExtractionSession())
+		#jobs and batch_size are checked before any text is read
+		for options in ({'batch_size': 0, 'jobs': 2}, {'jobs': '2'}, {'jobs': 0}, {'batch_size': 1.5}):
+			self.assertRaises(ValueError, extract_text_features, texts, ['in_memory_num_words'], **options)
+			self.assertRaises(ValueError, extract_matrix, texts, ['in_memory_num_words'], **options)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,124 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test incremental feature extraction'''
+import unittest
+import os
+import pickle
+import shutil
+from threading import Thread
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature
+from qcrit.extract_features import main, parse_tess
+from qcrit.incremental import manifest_path, write_atomically
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+calls = []
+
+@feature(tokenize_type='sentences')
+def num_sentences(text):
+	calls.append('num_sentences')
+	return len(text)
+
+@feature(tokenize_type='words')
+def num_words(text):
+	calls.append('num_words')
+	return len(text)
+
+def _load(output_file):
+	with open(output_file, mode='rb') as pickle_file:
+		return pickle.load(pickle_file)
+
+class TestIncremental(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+		calls.clear()
+
+	def extract(self, corpus_dir, output_file, features, incremental=True):
+		calls.clear()
+		main(
+			corpus_dir=corpus_dir, file_extension_to_parse_function={'tess': parse_tess}, features=features,
+			output_file=output_file, incremental=incremental
+		)
+		return _load(output_file)
+
+	def test_incremental(self):
+		with TemporaryDirectory() as tmp_dir:
+			corpus_dir = os.path.join(tmp_dir, 'corpus')
+			shutil.copytree(_DEMO_DIR, corpus_dir)
+			file_names = sorted(
+				os.path.join(corpus_dir, file_name) for file_name in os.listdir(corpus_dir) if file_name.endswith('.tess')
+			)
+			output_file = os.path.join(tmp_dir, 'output.pickle')
+
+			self.extract(corpus_dir, output_file, ['num_sentences'])
+			self.assertEqual(len(calls), len(file_names))
+			self.assertTrue(os.path.isfile(manifest_path(output_file)))
+
+			#Only the new feature is computed
+			result = self.extract(corpus_dir, output_file, ['num_sentences', 'num_words'])
+			self.assertEqual(calls, ['num_words'] * len(file_names))
+			self.assertEqual(list(result), file_names)
+
+			#Nothing is computed for files that were only touched
+			os.utime(file_names[0], (0, 0))
+			self.assertEqual(self.extract(corpus_dir, output_file, ['num_sentences', 'num_words']), result)
+			self.assertEqual(calls, [])
+
+			#Changed and new files are computed, and deleted files are left out
+			with open(file_names[1], mode='a') as tess_file:
+				tess_file.write('<tlg.x.y> Καὶ τοῦτο. ')
+			shutil.copy(file_names[2], os.path.join(corpus_dir, 'copy.tess'))
+			os.remove(file_names[3])
+			result = self.extract(corpus_dir, output_file, ['num_sentences', 'num_words'])
+			self.assertEqual(sorted(calls), ['num_sentences'] * 2 + ['num_words'] * 2)
+			expected = self.extract(corpus_dir, os.path.join(tmp_dir, 'full.pickle'), None, incremental=False)
+			self.assertEqual(result, {
+				file_name: {name: row[name] for name in ('num_sentences', 'num_words')} for file_name, row in expected.items()
+			})
+			self.assertNotIn(file_names[3], result)
+
+			#Results without a manifest are extracted again
+			os.remove(manifest_path(output_file))
+			self.assertEqual(self.extract(corpus_dir, output_file, ['num_sentences']), {
+				file_name: {'num_sentences': row['num_sentences']} for file_name, row in result.items()
+			})
+			self.assertEqual(len(calls), len(result))
+
+	def test_concurrent_writes(self):
+		with TemporaryDirectory() as tmp_dir:
+			file_path = os.path.join(tmp_dir, 'output.pickle')
+			errors = []
+			def write(data):
+				try:
+					for _ in range(200):
+						write_atomically(file_path, data)
+				except Exception as exp: #pylint: disable=broad-except
+					errors.append(exp)
+			threads = [Thread(target=write, args=(bytes([i]) * 1000,)) for i in range(4)]
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+			self.assertEqual(errors, [])
+			self.assertEqual(os.listdir(tmp_dir), ['output.pickle'])
+			with open(file_path, mode='rb') as output:
+				self.assertIn(output.read(), [bytes([i]) * 1000 for i in range(4)])
+
+	def test_invalid(self):
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+			incremental=True
+		)
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+			output_file='output.pickle', incremental=1
+		)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,60 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test lexicon features'''
+import unittest
+from unicodedata import normalize
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature, lexicon
+from qcrit.features.ancient_greek_features import freq_conditional_markers
+from qcrit.lexicon import lexicon_feature, compile_lexicon, register_lexicon, compiled_lexicons
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';'))
+
+freq_alpha = lexicon_feature('freq_alpha', {'ἄλφα', 'αβ'})
+freq_beta_per_word = lexicon_feature('freq_beta_per_word', {'αβ', 'γ'}, denominator='words')
+
+class TestLexicon(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def test_counts(self):
+		text = f'ἄλφα αβ γ. {normalize("NFD", "ἄλφα")} δέ; γ αβ.'
+		num_characters = sum(len(word) for word in textual_feature.tokenize_types['words']['func'](text))
+		self.assertEqual(freq_alpha(text=text, filepath='a'), 4 / num_characters)
+		self.assertEqual(freq_beta_per_word(text=text, filepath='a'), 4 / 10)
+		self.assertEqual(freq_alpha(text=text), 4 / num_characters)
+
+	def test_registered_after_caching(self):
+		text = 'ε ζ. ε.'
+		self.assertEqual(freq_alpha(text=text, filepath='b'), 0)
+		freq_epsilon = lexicon_feature('freq_epsilon', {'ε'})
+		self.assertEqual(freq_epsilon(text=text, filepath='b'), 2 / 5)
+
+	def test_compile_lexicon(self):
+		words = {normalize('NFD', 'ἄλφα'), 'μέϰρι'}
+		compiled = compile_lexicon(words)
+		self.assertEqual(compiled, {normalize(form, word) for form in lexicon.NORMALIZATION_FORMS for word in words})
+		#The compatibility forms replace the kappa symbol, and the decomposed forms split off the accents
+		self.assertEqual(len(compiled), 6)
+		self.assertTrue({normalize('NFC', 'ἄλφα'), 'μέϰρι', 'μέκρι', normalize('NFD', 'μέκρι')} <= compiled)
+
+	def test_exact_matching(self):
+		#Words of the text are not normalized: 'ἐάν' written with an oxia (U+1F71) is in none of the forms of
+		#the lexicon's 'ἐάν' (written with a tonos, U+03AC, to which the oxia normalizes), as in the original
+		#implementation of the feature
+		self.assertEqual(freq_conditional_markers(text='τις ἄλλη ἀλλή εἰ \u1f10\u1f71ν.'), 1 / 17)
+		self.assertEqual(freq_conditional_markers(text='τις ἄλλη ἀλλή εἰ \u1f10\u03acν.'), 2 / 17)
+
+	def test_compiled_lexicons(self):
+		self.assertEqual(compiled_lexicons['freq_alpha'], compile_lexicon({'ἄλφα', 'αβ'}))
+		self.assertIs(register_lexicon('omega', ['ὦ']), compiled_lexicons['omega'])
+		self.assertRaises(ValueError, register_lexicon, 'omega', ['ὦ'])
+
+	def test_invalid_declarations(self):
+		self.assertRaises(ValueError, lexicon_feature, 'freq_alpha', {'α'})
+		self.assertRaises(ValueError, lexicon_feature, 'freq_zeta', {'ζ'}, denominator='sentences')
+		self.assertRaises(ValueError, lexicon_feature, 'freq_eta', 'η')
+
+if __name__ == '__main__':
+	unittest.main()
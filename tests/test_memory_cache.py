@@ -0,0 +1,140 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test the in-memory cache of tokens'''
+import unittest
+import os
+import gc
+import tracemalloc
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature, register_artifact
+from qcrit.memory_cache import MemoryCache, approximate_bytes
+from qcrit.extract_features import parse_tess
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', '?'))
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+calls = []
+
+def _count_words(words):
+	calls.append(words)
+	return len(words)
+
+register_artifact('counted_words', source='words', func=_count_words)
+
+@feature(tokenize_type='words')
+def num_words(text, counted_words):
+	return counted_words
+
+@feature(tokenize_type='sentences')
+def num_sentences(text):
+	return len(text)
+
+@feature(tokenize_type='sentence_words')
+def num_sentence_words(text):
+	return len(text)
+
+class TestMemoryCache(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+		calls.clear()
+
+	def tearDown(self):
+		textual_feature.setup_memory_cache()
+
+	def test_least_recently_used_eviction(self):
+		cache = MemoryCache(max_entries=2)
+		cache.put('a', 1)
+		cache.put('b', 2)
+		self.assertEqual(cache.get('a'), 1)
+		cache.put('c', 3)
+		self.assertNotIn('b', cache)
+		self.assertEqual(cache.get('b', 'missing'), 'missing')
+		self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 1, 'entries': 2, 'bytes': cache.nbytes})
+		cache.clear()
+		self.assertEqual((len(cache), cache.nbytes, cache.hits), (0, 0, 1))
+		self.assertRaises(ValueError, MemoryCache, max_entries=0)
+		self.assertRaises(ValueError, MemoryCache, max_bytes=1.5)
+
+	def test_byte_budget(self):
+		word = 'a' * 1000
+		cache = MemoryCache(max_bytes=3 * approximate_bytes([word] * 100))
+		for i in range(3):
+			cache.put(i, [word] * 100)
+		self.assertEqual((len(cache), cache.evictions), (3, 0))
+		cache.put(3, [word] * 100)
+		self.assertEqual((len(cache), cache.evictions), (3, 1))
+		self.assertLessEqual(cache.nbytes, cache.max_bytes)
+		cache.put(4, [word] * 1000)
+		self.assertNotIn(4, cache)
+		self.assertGreater(approximate_bytes([word] * 100), 100 * 1000)
+		self.assertGreater(approximate_bytes({word: [word] * 10}), 11 * 1000)
+
+	def test_remeasure(self):
+		cache = MemoryCache(max_bytes=2 * approximate_bytes(['a' * 1000] * 100))
+		value = []
+		cache.put('b', ['a' * 1000] * 100)
+		cache.put('a', value)
+		nbytes = cache.nbytes
+		value.extend(['a' * 1000] * 100)
+		cache.remeasure('a')
+		self.assertEqual(cache.nbytes, nbytes - approximate_bytes([]) + approximate_bytes(value))
+		#The entry grew past the budget, so the least recently used entry is evicted
+		value.extend(['a' * 1000] * 100)
+		cache.remeasure('a')
+		self.assertEqual((list(cache._entries), cache.evictions), (['a'], 1)) #pylint: disable=protected-access
+		value.clear()
+		cache.remeasure('a')
+		self.assertEqual(cache.nbytes, approximate_bytes([]))
+		cache.remeasure('missing')
+
+	def test_lazy_tokens_measured(self):
+		#The tokens a cached _TokenizedText computes once it is cached count towards the budget
+		file_name = os.path.join(_DEMO_DIR, 'euripides.heracles.tess')
+		text = parse_tess(file_name)
+		gc.collect()
+		tracemalloc.start()
+		try:
+			start = tracemalloc.get_traced_memory()[0]
+			for f in (num_sentences, num_words, num_sentence_words):
+				f(text=text, filepath=file_name)
+			gc.collect()
+			retained = tracemalloc.get_traced_memory()[0] - start
+		finally:
+			tracemalloc.stop()
+		self.assertGreaterEqual(textual_feature.memory_cache.nbytes, retained * 0.9)
+
+	def test_interleaved_files(self):
+		for _ in range(3):
+			self.assertEqual(num_words(text='a b. c?', filepath='abc/def'), 5)
+			self.assertEqual(num_words(text='a b c. d e?', filepath='abc/ghi'), 7)
+		self.assertEqual(len(calls), 2)
+		textual_feature.invalidate_tokens('words')
+		num_words(text='a b. c?', filepath='abc/def')
+		self.assertEqual(len(calls), 3)
+
+	def test_changed_files(self):
+		with TemporaryDirectory() as tmp_dir:
+			filepath = os.path.join(tmp_dir, 'a.txt')
+			with open(filepath, mode='w') as text_file:
+				text_file.write('a b. c?')
+			self.assertEqual(num_words(text='a b. c?', filepath=filepath), 5)
+			self.assertEqual(num_words(text='a b. c?', filepath=filepath), 5)
+			with open(filepath, mode='w') as text_file:
+				text_file.write('a b. c d?')
+			self.assertEqual(num_words(text='a b. c d?', filepath=filepath), 6)
+		self.assertEqual(len(calls), 2)
+
+	def test_entry_budget(self):
+		textual_feature.setup_memory_cache(max_entries=3)
+		num_words(text='a b. c?', filepath='abc/def')
+		num_words(text='a b c. d e?', filepath='abc/ghi')
+		num_words(text='a b. c?', filepath='abc/def')
+		self.assertEqual(len(calls), 3)
+		self.assertGreater(textual_feature.memory_cache.evictions, 0)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,102 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test metrics of feature extraction'''
+import unittest
+import os
+import json
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature
+from qcrit.extract_features import main, parse_tess
+from qcrit.metrics import Metrics
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+@feature(tokenize_type='sentences')
+def num_sentences(text):
+	return len(text)
+
+@feature(tokenize_type='words')
+def num_words(text):
+	return len(text)
+
+@feature(tokenize_type='words')
+def num_distinct_words(text):
+	return len(set(text))
+
+class TestMetrics(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+		textual_feature.metrics.reset()
+
+	def test_counters_and_timers(self):
+		metrics = Metrics()
+		metrics.increment('a')
+		metrics.increment('a', 2)
+		with metrics.time('b'):
+			pass
+		metrics.add_time('b', 1.5)
+		other = Metrics()
+		other.increment('a')
+		other.increment('c')
+		other.add_time('b', 1, calls=3)
+		metrics.merge(other)
+		metrics.merge(other.as_dict())
+		result = metrics.pop()
+		self.assertEqual(result['counters'], {'a': 5, 'c': 2})
+		self.assertEqual(result['timers']['b']['calls'], 8)
+		self.assertGreaterEqual(result['timers']['b']['seconds'], 3.5)
+		self.assertEqual(metrics.as_dict(), {'counters': {}, 'timers': {}})
+
+	def test_feature_metrics(self):
+		text = 'Aaa bbb. Ccc ddd.'
+		num_sentences(text=text, filepath='abc/def')
+		num_words(text=text, filepath='abc/def')
+		num_distinct_words(text=text, filepath='abc/def')
+		num_words(text=text)
+		counters = textual_feature.metrics.counters
+		self.assertEqual(counters['tokens.words.misses'], 1)
+		self.assertEqual(counters['tokens.words.hits'], 1)
+		self.assertEqual(counters['tokens._tokenized_text.misses'], 1)
+		self.assertEqual(counters['tokens._tokenized_text.hits'], 1)
+		self.assertEqual(counters['memory_cache.hits'], 2)
+		self.assertEqual(counters['memory_cache.misses'], 3)
+		self.assertEqual(counters['memory_cache.bytes_added'], textual_feature.memory_cache.nbytes)
+		self.assertEqual(textual_feature.metrics.timers['tokenize.sentences'][1], 1)
+		self.assertEqual(textual_feature.metrics.timers['tokenize.words'][1], 1)
+		textual_feature.clear_cache()
+		self.assertEqual(counters['memory_cache.bytes_removed'], counters['memory_cache.bytes_added'])
+
+	def test_main(self):
+		with TemporaryDirectory() as tmp_dir:
+			results = []
+			for jobs in (1, 2):
+				metrics_file = os.path.join(tmp_dir, f'{jobs}.json')
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+					features=['num_sentences', 'num_words', 'num_distinct_words'], metrics_file=metrics_file, jobs=jobs
+				)
+				with open(metrics_file) as json_file:
+					results.append(json.load(json_file))
+		num_files = sum(1 for file_name in os.listdir(_DEMO_DIR) if file_name.endswith('.tess'))
+		for result in results:
+			self.assertEqual(result['counters']['files'], num_files)
+			self.assertEqual(result['counters']['tokens.words.misses'], num_files)
+			self.assertEqual(result['counters']['tokens.words.hits'], num_files)
+			self.assertEqual(result['timers']['tokenize.sentences']['calls'], num_files)
+			self.assertEqual(result['timers']['extract_features']['calls'], 1)
+		self.assertEqual(
+			{name: count for name, count in results[0]['counters'].items() if name.startswith('tokens.')},
+			{name: count for name, count in results[1]['counters'].items() if name.startswith('tokens.')}
+		)
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+			metrics_file=_DEMO_DIR
+		)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,86 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test profiling of feature extraction'''
+import unittest
+import os
+import json
+from time import sleep
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature
+from qcrit.extract_features import main, parse_tess
+from qcrit.profiling import Profile
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+_FEATURES = ['num_sentences', 'slow_num_words']
+
+@feature(tokenize_type='sentences')
+def num_sentences(text):
+	return len(text)
+
+@feature(tokenize_type='words')
+def slow_num_words(text):
+	sleep(0.01)
+	return len(text)
+
+class TestProfiling(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def test_report(self):
+		profile = Profile()
+		profile.record_feature('a', 'x', 3)
+		profile.record_feature('b', 'x', 1)
+		profile.record_feature('a', 'y', 2)
+		profile.record_file('x', 1, {'words': 2})
+		profile.record_file('y', 0, {'words': 1})
+		self.assertEqual(profile.feature_seconds(), {'a': 5, 'b': 1})
+		self.assertEqual(profile.file_seconds(), {'x': 7, 'y': 3})
+		self.assertEqual(profile.tokenize_seconds(), {'words': 3})
+		report = profile.report(top=1)
+		self.assertIn('Slowest features, excluding tokenization (1 of 2)', report)
+		self.assertIn('      5.0000   50.00     50.00  a', report)
+		self.assertIn('      7.0000   70.00     70.00  x', report)
+		self.assertNotIn('  b\n', report)
+		merged = Profile()
+		merged.merge(profile)
+		merged.merge(profile.as_dict())
+		self.assertEqual(merged.file_seconds(), {'x': 14, 'y': 6})
+		self.assertEqual(profile.pop()['features'], {'a': {'x': 3, 'y': 2}, 'b': {'x': 1}})
+		self.assertEqual(profile.as_dict(), {'features': {}, 'files': {}})
+
+	def test_main(self):
+		with TemporaryDirectory() as tmp_dir:
+			profiles = []
+			for jobs in (1, 2):
+				profile_file = os.path.join(tmp_dir, f'{jobs}.json')
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+					features=_FEATURES, profile_file=profile_file, jobs=jobs
+				)
+				with open(profile_file) as json_file:
+					self.assertEqual(set(json.load(json_file)), {'features', 'files'})
+				profiles.append(Profile.load(profile_file))
+		file_names = sorted(
+			os.path.join(_DEMO_DIR, file_name) for file_name in os.listdir(_DEMO_DIR) if file_name.endswith('.tess')
+		)
+		for profile in profiles:
+			self.assertEqual(sorted(profile.features), sorted(_FEATURES))
+			self.assertEqual(sorted(profile.features['slow_num_words']), file_names)
+			self.assertEqual(sorted(profile.files), file_names)
+			self.assertEqual(set(profile.tokenize_seconds()), {'_tokenized_text', 'sentences', 'words'})
+			feature_seconds = profile.feature_seconds()
+			self.assertGreaterEqual(feature_seconds['slow_num_words'], 0.01 * len(file_names))
+			#Tokenization is not attributed to the features
+			self.assertLess(feature_seconds['num_sentences'], profile.tokenize_seconds()['sentences'])
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+			features=_FEATURES, profile_file='profile.json', piece_size=1000
+		)
+
+if __name__ == '__main__':
+	unittest.main()
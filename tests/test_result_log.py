@@ -0,0 +1,118 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test the append-only log of extraction results'''
+import unittest
+import os
+import pickle
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature
+from qcrit.extract_features import main, parse_tess
+from qcrit.result_log import ResultLog, read_log, log_path, finalize
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+_FILE_NAMES = sorted(
+	os.path.join(_DEMO_DIR, file_name) for file_name in os.listdir(_DEMO_DIR) if file_name.endswith('.tess')
+)
+_HASHES = {'a': 'code a', 'b': 'code b'}
+_CONFIG = {'terminal_punctuation': ('.',), 'language': None}
+
+class _Calls:
+	#The hash of the code of a feature includes the values it refers to, so the calls are recorded by an object
+	#whose repr does not change
+	def __init__(self):
+		self.calls = []
+		self.crash = False
+
+_calls = _Calls()
+
+@feature(tokenize_type='words')
+def logged_num_words(text):
+	_calls.calls.append(len(text))
+	if _calls.crash and len(_calls.calls) == 3:
+		raise RuntimeError('Simulated crash')
+	return len(text)
+
+class TestResultLog(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+		_calls.calls.clear()
+		_calls.crash = False
+
+	def test_log(self):
+		with TemporaryDirectory() as tmp_dir:
+			path = os.path.join(tmp_dir, 'output.pickle.log')
+			with ResultLog(path, _HASHES, _CONFIG) as log:
+				self.assertEqual(log.completed, {})
+				log.append(_FILE_NAMES[0], {'a': 1, 'b': 2})
+				log.append(_FILE_NAMES[1], {'a': 3})
+			self.assertEqual(read_log(path, _HASHES, _CONFIG)[0], {
+				_FILE_NAMES[0]: {'a': 1, 'b': 2}, _FILE_NAMES[1]: {'a': 3}
+			})
+
+			#Values computed by other code, or with other tokenizers, are left out
+			self.assertEqual(read_log(path, {'a': 'code a', 'b': 'new code'}, _CONFIG)[0][_FILE_NAMES[0]], {'a': 1})
+			self.assertEqual(read_log(path, _HASHES, {'terminal_punctuation': (';',), 'language': None})[0], {
+				_FILE_NAMES[0]: {}, _FILE_NAMES[1]: {}
+			})
+
+			#A record cut short by a crash is discarded, and the log can still be appended to
+			with open(path, mode='rb') as log_file:
+				data = log_file.read()
+			with open(path, mode='wb') as log_file:
+				log_file.write(data[:-5])
+			with ResultLog(path, _HASHES, _CONFIG) as log:
+				self.assertEqual(log.completed, {_FILE_NAMES[0]: {'a': 1, 'b': 2}})
+				log.append(_FILE_NAMES[1], {'b': 4})
+			self.assertEqual(read_log(path, _HASHES, _CONFIG)[0][_FILE_NAMES[1]], {'b': 4})
+
+	def test_finalize(self):
+		with TemporaryDirectory() as tmp_dir:
+			output_file = os.path.join(tmp_dir, 'output.pickle')
+			with ResultLog(log_path(output_file), _HASHES, _CONFIG) as log:
+				log.append(_FILE_NAMES[1], {'a': 1, 'b': 2})
+				log.append(_FILE_NAMES[0], {'a': 3})
+				log.append(_FILE_NAMES[0], {'b': 4})
+				log.append(_FILE_NAMES[2], {'a': 5})
+			rows = finalize(output_file, _FILE_NAMES, ['b', 'a'], feature_hashes=_HASHES, tokenizer_config=_CONFIG)
+			expected = {_FILE_NAMES[0]: {'b': 4, 'a': 3}, _FILE_NAMES[1]: {'b': 2, 'a': 1}}
+			self.assertEqual(rows, expected)
+			self.assertEqual(list(rows), _FILE_NAMES[:2])
+			with open(output_file, mode='rb') as pickle_file:
+				self.assertEqual(pickle.load(pickle_file), expected)
+			self.assertFalse(os.path.exists(log_path(output_file)))
+
+	def test_resume(self):
+		with TemporaryDirectory() as tmp_dir:
+			output_file = os.path.join(tmp_dir, 'output.pickle')
+			_calls.crash = True
+			with self.assertRaises(RuntimeError):
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+					features=['logged_num_words'], output_file=output_file
+				)
+			self.assertFalse(os.path.exists(output_file))
+			self.assertEqual(len(read_log(log_path(output_file), {}, None)[0]), 2)
+
+			#Only the files missing from the log are extracted
+			_calls.crash = False
+			finished = _calls.calls[:2]
+			_calls.calls.clear()
+			main(
+				corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+				features=['logged_num_words'], output_file=output_file
+			)
+			self.assertEqual(len(_calls.calls), len(_FILE_NAMES) - 2)
+			self.assertFalse(os.path.exists(log_path(output_file)))
+			with open(output_file, mode='rb') as pickle_file:
+				self.assertEqual(pickle.load(pickle_file), {
+					file_name: {'logged_num_words': num_words}
+					for file_name, num_words in zip(_FILE_NAMES, finished + _calls.calls)
+				})
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,148 @@
+#pylint: disable = missing-docstring, invalid-name, function-redefined
+'''Test the persistent store of feature values'''
+import unittest
+import os
+import pickle
+import shutil
+from io import StringIO
+from contextlib import redirect_stdout
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature
+from qcrit.extract_features import main, parse_tess
+from qcrit.result_store import ResultStore, feature_hash, config_hash
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+calls = []
+
+def _scaled_feature(scale):
+	@feature(tokenize_type='words')
+	def scaled(text):
+		calls.append('scaled')
+		return len(text) * scale
+	return scaled
+
+_OFFSET = 1
+
+def _offset(value):
+	return value + _OFFSET
+
+class TestResultStore(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+		calls.clear()
+
+	def test_feature_hash(self):
+		def first(text):
+			return len(text)
+		first_hash = feature_hash(feature(tokenize_type='words')(first))
+		self.assertEqual(feature_hash(feature(tokenize_type='words')(first)), first_hash)
+		def first(text):
+			return len(text) + 1
+		self.assertNotEqual(feature_hash(feature(tokenize_type='words')(first)), first_hash)
+		def first(text):
+			return len(text)
+		self.assertNotEqual(feature_hash(feature(tokenize_type='sentences')(first)), first_hash)
+		self.assertEqual(feature_hash(feature(tokenize_type='words')(first)), first_hash)
+
+		#Values in the closure and module-level helpers are part of the code
+		self.assertNotEqual(feature_hash(_scaled_feature(2)), feature_hash(_scaled_feature(3)))
+		def second(text):
+			return _offset(len(text))
+		second_hash = feature_hash(feature(tokenize_type='words')(second))
+		global _OFFSET
+		_OFFSET = 2
+		try:
+			self.assertNotEqual(feature_hash(feature(tokenize_type='words')(second)), second_hash)
+		finally:
+			_OFFSET = 1
+		self.assertEqual(feature_hash(feature(tokenize_type='words')(second)), second_hash)
+		self.assertNotEqual(config_hash({'terminal_punctuation': ('.',)}, parse_tess), config_hash(None, parse_tess))
+
+	def test_store(self):
+		with TemporaryDirectory() as tmp_dir:
+			db_path = os.path.join(tmp_dir, 'results.sqlite')
+			with ResultStore(db_path) as store:
+				store.put([('x', 'a', 'code', 'config', 1.5), ('x', 'b', 'code', 'config', [2])])
+				self.assertEqual(len(store), 2)
+			with ResultStore(db_path) as store:
+				self.assertEqual(store.lookup('x', {'a': 'code', 'b': 'other', 'c': 'code'}, 'config'), {
+					'a': (1.5, True), 'b': ('code changed', False), 'c': ('not stored', False)
+				})
+				self.assertEqual(store.lookup('x', {'a': 'code'}, 'other')['a'], ('configuration changed', False))
+				rows, extractions, report = store.plan(
+					[(['a', 'b'], ['f', 'g'])], {'f': 'x', 'g': 'y'}, {'a': 'code', 'b': 'code'},
+					{'f': 'config', 'g': 'config'}
+				)
+				self.assertEqual(rows, {'f': {'a': 1.5, 'b': [2]}})
+				self.assertEqual(extractions, [(['a', 'b'], ['g'])])
+				self.assertEqual(report.counts(), {
+					'reused': 2, 'code changed': 0, 'configuration changed': 0, 'not stored': 2
+				})
+				#Values are replaced once they are computed again
+				store.put([('x', 'a', 'new code', 'config', 3)])
+				self.assertEqual(len(store), 2)
+				self.assertEqual(store.lookup('x', {'a': 'new code'}, 'config'), {'a': (3, True)})
+
+	def test_main(self):
+		with TemporaryDirectory() as tmp_dir:
+			corpus_dir = os.path.join(tmp_dir, 'corpus')
+			shutil.copytree(_DEMO_DIR, corpus_dir)
+			file_names = sorted(
+				os.path.join(corpus_dir, file_name) for file_name in os.listdir(corpus_dir) if file_name.endswith('.tess')
+			)
+			db_path = os.path.join(tmp_dir, 'results.sqlite')
+
+			def extract(output_name, jobs=1):
+				calls.clear()
+				output_file = os.path.join(tmp_dir, output_name)
+				main(
+					corpus_dir=corpus_dir, file_extension_to_parse_function={'tess': parse_tess},
+					features=['scaled'], output_file=output_file, result_store=db_path, jobs=jobs
+				)
+				with open(output_file, mode='rb') as pickle_file:
+					return pickle.load(pickle_file)
+
+			_scaled_feature(2)
+			first = extract('1.pickle')
+			self.assertEqual(len(calls), len(file_names))
+			self.assertEqual(extract('2.pickle', jobs=2), first)
+			self.assertEqual(calls, [])
+
+			#Only the changed file is computed again
+			with open(file_names[0], mode='a') as tess_file:
+				tess_file.write('<tlg.x.y> Καὶ τοῦτο. ')
+			changed = extract('3.pickle')
+			self.assertEqual(calls, ['scaled'])
+			self.assertEqual(changed[file_names[1]], first[file_names[1]])
+
+			#Every file is computed again once the code of the feature changes
+			_scaled_feature(3)
+			scaled = extract('4.pickle')
+			self.assertEqual(len(calls), len(file_names))
+			self.assertEqual(scaled, {file_name: {'scaled': row['scaled'] * 3 / 2} for file_name, row in changed.items()})
+
+			#Without an output file, the reused values are printed too, in the order of the files
+			calls.clear()
+			output = StringIO()
+			with redirect_stdout(output):
+				main(
+					corpus_dir=corpus_dir, file_extension_to_parse_function={'tess': parse_tess},
+					features=['scaled'], result_store=db_path
+				)
+			self.assertEqual(calls, [])
+			printed = [line.split(', ')[0] for line in output.getvalue().splitlines() if ', scaled, ' in line]
+			self.assertEqual(printed, file_names)
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+			result_store=_DEMO_DIR
+		)
+
+if __name__ == '__main__':
+	unittest.main()
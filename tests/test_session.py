@@ -0,0 +1,111 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test extraction sessions'''
+import unittest
+import os
+import pickle
+from threading import Thread
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature, ExtractionSession
+from qcrit.extract_features import main, parse_tess
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+_TEXT = 'Aaa bbb! Ccc ddd. Eee fff; ggg hhh? Iii.'
+
+@feature(tokenize_type='sentences')
+def num_sentences(text):
+	return len(text)
+
+@feature(tokenize_type='words')
+def num_words(text):
+	return len(text)
+
+class TestSession(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def test_independent_tokenizers(self):
+		exclamation = ExtractionSession(terminal_punctuation=('!',))
+		question = ExtractionSession(terminal_punctuation=('?',))
+		self.assertEqual(num_sentences(text=_TEXT, session=exclamation), 2)
+		self.assertEqual(num_sentences(text=_TEXT, session=question), 2)
+		self.assertEqual(num_sentences(text=_TEXT), 3)
+		with question:
+			self.assertEqual(num_sentences(text=_TEXT), 2)
+			self.assertEqual(
+				textual_feature.tokenize_types['sentences']['func'](_TEXT), ['Aaa bbb! Ccc ddd. Eee fff; ggg hhh?', 'Iii.']
+			)
+			with exclamation:
+				self.assertEqual(num_sentences(text=_TEXT), 2)
+			self.assertIs(textual_feature.current_session(), question)
+		self.assertIs(textual_feature.current_session(), textual_feature.default_session)
+		self.assertRaises(Exception, exclamation.setup_tokenizers, terminal_punctuation=('.',))
+		self.assertRaises(ValueError, num_sentences, text=_TEXT, session=ExtractionSession())
+
+	def test_concurrent_sessions(self):
+		file_names = sorted(name for name in os.listdir(_DEMO_DIR) if name.endswith('.tess'))
+		texts = {name: parse_tess(os.path.join(_DEMO_DIR, name)) for name in file_names}
+		configs = [('.',), ('.', ';', ';'), ('.', ';', ';'), (';',)]
+		expected = [
+			ExtractionSession(terminal_punctuation=punctuation, features=['num_sentences', 'num_words']).extract(
+				texts[name], name
+			) for punctuation in configs for name in file_names
+		]
+		results = [None] * len(configs)
+
+		def run(i):
+			session = ExtractionSession(terminal_punctuation=configs[i], features=['num_sentences', 'num_words'])
+			results[i] = [session.extract(texts[name], name) for name in file_names]
+
+		threads = [Thread(target=run, args=(i,)) for i in range(len(configs))]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertEqual([scores for result in results for scores in result], expected)
+		self.assertNotEqual(results[0], results[1])
+		self.assertEqual(results[1], results[2])
+
+	def test_memory_caches(self):
+		session = ExtractionSession(terminal_punctuation=('.',))
+		num_words(text=_TEXT, filepath='abc', session=session)
+		self.assertIn(('words', 'abc', None, None), session.memory_cache)
+		self.assertNotIn(('words', 'abc', None, None), textual_feature.memory_cache)
+		session.clear_cache()
+		self.assertEqual(len(session.memory_cache), 0)
+
+	def test_pickle(self):
+		session = ExtractionSession(terminal_punctuation=('!',), features=['num_sentences'])
+		restored = pickle.loads(pickle.dumps(session))
+		self.assertIsNot(restored, session)
+		self.assertEqual(restored.tokenizer_config, session.tokenizer_config)
+		self.assertEqual(restored.extract(_TEXT), {'num_sentences': 2})
+		self.assertIs(pickle.loads(pickle.dumps(textual_feature.default_session)), textual_feature.default_session)
+
+	def test_main(self):
+		session = ExtractionSession(terminal_punctuation=('!',), features=['num_sentences', 'num_words'])
+		with TemporaryDirectory() as tmp_dir:
+			outputs = []
+			for jobs in (1, 2):
+				output_file = os.path.join(tmp_dir, f'{jobs}.pickle')
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+					output_file=output_file, jobs=jobs, session=session
+				)
+				with open(output_file, mode='rb') as pickle_file:
+					outputs.append(pickle.load(pickle_file))
+		self.assertEqual(outputs[0], outputs[1])
+		for file_name, scores in outputs[0].items():
+			self.assertEqual(list(scores), ['num_sentences', 'num_words'])
+			self.assertEqual(scores, session.extract(parse_tess(file_name)))
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess}, session={}
+		)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,192 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test streaming feature extraction'''
+import unittest
+import os
+import pickle
+from collections import Counter
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature, Accumulator, counting_accumulator
+from qcrit.extract_features import main, parse_tess, parse_tess_chunks
+from qcrit.streaming import stream_sentences, accumulate_features, split_text, accumulate_piece, merge_pieces
+from qcrit.features import universal_features, ancient_greek_features
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+_DEMO_FILES = sorted(
+	os.path.join(_DEMO_DIR, file_name) for file_name in os.listdir(_DEMO_DIR) if file_name.endswith('.tess')
+)
+
+@feature(tokenize_type=None, accumulator=Accumulator(
+	init=lambda: 0, update=lambda count, chunk: count + chunk.count(' '), finalize=lambda count: count
+))
+def num_spaces(text):
+	return text.count(' ')
+
+@feature(tokenize_type='sentence_words', accumulator=Accumulator(
+	init=lambda: (0, 0),
+	update=lambda state, sentences: (state[0] + len(sentences), state[1] + sum(map(len, sentences))),
+	finalize=lambda state: state[1] / state[0],
+))
+def mean_words_per_sentence(text):
+	return sum(map(len, text)) / len(text)
+
+@feature(tokenize_type='word_counts', accumulator=Accumulator(
+	init=Counter, update=lambda counts, word_counts: counts + word_counts,
+	finalize=lambda counts: counts.most_common(3)
+))
+def most_common_words(text):
+	return text.most_common(3)
+
+@feature(tokenize_type='word_counts', accumulator=counting_accumulator(
+	(Counter(), 0), lambda word_counts: (word_counts, 1), lambda counts, num_pieces: (len(counts), num_pieces)
+))
+def vocabulary_size(text):
+	return len(text), 1
+
+@feature(tokenize_type='words')
+def num_words(text):
+	return len(text)
+
+_ACCUMULATED_FEATURES = ['num_spaces', 'mean_words_per_sentence', 'most_common_words']
+#Features of the feature modules that can be computed from pieces of a text
+_PORTED_FEATURES = [
+	name for name, func in textual_feature.decorated_features.items()
+	if func.__module__ in (universal_features.__name__, ancient_greek_features.__name__)
+	and func.accumulator is not None
+]
+
+class TestStreaming(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def test_stream_sentences(self):
+		for file_name in _DEMO_FILES:
+			text = parse_tess(file_name)
+			expected = textual_feature.tokenize_types['sentences']['func'](text)
+			self.assertEqual(list(stream_sentences(parse_tess_chunks(file_name))), expected)
+			self.assertEqual(list(stream_sentences(text[i:i + 7] for i in range(0, len(text), 7))), expected)
+		self.assertEqual(list(stream_sentences([])), [])
+		self.assertEqual(list(stream_sentences(['Aaa bbb', '. Ccc', ' ddd. Eee'])), ['Aaa bbb.', 'Ccc ddd.', 'Eee'])
+
+	def test_accumulate_features(self):
+		feature_tuples = [(name, textual_feature.decorated_features[name]) for name in _ACCUMULATED_FEATURES]
+		for file_name in _DEMO_FILES:
+			text = parse_tess(file_name)
+			self.assertEqual(
+				accumulate_features(parse_tess_chunks(file_name), feature_tuples),
+				{name: func(text=text) for name, func in feature_tuples}
+			)
+
+	def test_linear_cost(self):
+		#Summing the counts of a piece costs as much as the piece, not as much as the counts summed so far
+		feature_tuples = [('vocabulary_size', textual_feature.decorated_features['vocabulary_size'])]
+		def sentences(num_sentences):
+			#Every sentence has new words, so the vocabulary grows with the text
+			return [
+				' '.join(''.join(chr(ord('a') + int(digit)) for digit in str(i * 10 + j)) for j in range(10)) + '. '
+				for i in range(num_sentences)
+			]
+		def seconds(num_sentences):
+			chunks = sentences(num_sentences)
+			best = float('inf')
+			for _ in range(3):
+				start = perf_counter()
+				size, num_pieces = accumulate_features(chunks, feature_tuples)['vocabulary_size']
+				best = min(best, perf_counter() - start)
+			#The full stop is counted as a word too
+			self.assertEqual(size, 10 * num_sentences + 1)
+			self.assertGreater(num_pieces, 10)
+			return best
+		#Four times as many sentences take about four times as long, against sixteen times for quadratic cost
+		self.assertLess(seconds(8000) / seconds(2000), 8)
+
+	def test_split_text(self):
+		for file_name in _DEMO_FILES:
+			text = parse_tess(file_name)
+			pieces = split_text(text, 2000)
+			self.assertGreater(len(pieces), 10)
+			self.assertEqual(''.join(piece for piece, _ in pieces), text)
+			self.assertTrue(all(len(piece) >= 2000 for piece, _ in pieces[:-1]))
+			self.assertEqual(
+				[piece[start:end] for piece, sentence_spans in pieces for start, end in sentence_spans],
+				textual_feature.tokenize_types['sentences']['func'](text)
+			)
+		self.assertEqual(split_text('', 10), [('', [])])
+		self.assertEqual(split_text('Aaa bbb ccc ddd eee', 5), [('Aaa bbb ccc ddd eee', [(0, 19)])])
+
+	def test_pieces_split_as_whole(self):
+		#On its own, the end of a piece ending in an abbreviation before punctuation is split differently
+		text = 'ὦ Σωκράτης ἀλλ.; εἰ καὶ ὦ. ' * 3
+		feature_tuples = [
+			(name, textual_feature.decorated_features[name]) for name in ('average_sentence_length', 'mean_sentence_length')
+		]
+		pieces = split_text(text, 20)
+		self.assertGreater(len(pieces), 1)
+		self.assertEqual(
+			merge_pieces((accumulate_piece(piece, feature_tuples, spans) for piece, spans in pieces), feature_tuples),
+			{name: func(text=text) for name, func in feature_tuples}
+		)
+		self.assertEqual(textual_feature.decorated_features['average_sentence_length'](text=text), 15.75)
+
+	def test_ported_features(self):
+		self.assertIn('freq_men', _PORTED_FEATURES)
+		self.assertIn('mean_word_length', _PORTED_FEATURES)
+		feature_tuples = [(name, textual_feature.decorated_features[name]) for name in _PORTED_FEATURES]
+		for file_name in _DEMO_FILES:
+			text = parse_tess(file_name)
+			expected = {name: func(text=text, filepath=file_name) for name, func in feature_tuples}
+			self.assertEqual(accumulate_features(parse_tess_chunks(file_name), feature_tuples), expected)
+			self.assertEqual(
+				merge_pieces((
+					accumulate_piece(piece, feature_tuples, sentence_spans) for piece, sentence_spans in split_text(text, 3000)
+				), feature_tuples),
+				expected
+			)
+
+	def test_main_pieces(self):
+		with TemporaryDirectory() as tmp_dir:
+			outputs = []
+			for i, (piece_size, jobs) in enumerate(((None, 1), (5000, 1), (5000, 2))):
+				output_file = os.path.join(tmp_dir, f'{i}.pickle')
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+					features=_PORTED_FEATURES, output_file=output_file, piece_size=piece_size, jobs=jobs
+				)
+				with open(output_file, mode='rb') as pickle_file:
+					outputs.append(pickle.load(pickle_file))
+			self.assertEqual(outputs[0], outputs[1])
+			self.assertEqual(outputs[0], outputs[2])
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess},
+			features=['num_spaces'], piece_size=5000
+		)
+
+	def test_features_without_accumulators(self):
+		self.assertRaises(
+			ValueError, main, corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse_tess_chunks},
+			streaming=True
+		)
+		self.assertRaises(ValueError, feature, tokenize_type='words', accumulator=len)
+
+	def test_main_streaming(self):
+		with TemporaryDirectory() as tmp_dir:
+			outputs = []
+			for i, (parse, streaming) in enumerate(((parse_tess, False), (parse_tess_chunks, True), (parse_tess, True))):
+				output_file = os.path.join(tmp_dir, f'{i}.pickle')
+				main(
+					corpus_dir=_DEMO_DIR, file_extension_to_parse_function={'tess': parse},
+					features=_ACCUMULATED_FEATURES, output_file=output_file, streaming=streaming
+				)
+				with open(output_file, mode='rb') as pickle_file:
+					outputs.append(pickle.load(pickle_file))
+			self.assertEqual(outputs[0], outputs[1])
+			self.assertEqual(outputs[0], outputs[2])
+
+if __name__ == '__main__':
+	unittest.main()
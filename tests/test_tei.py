@@ -0,0 +1,136 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test the parsing of TEI XML files'''
+import unittest
+import os
+import io
+import pickle
+import tracemalloc
+from functools import partial
+from tempfile import TemporaryDirectory
+from xml.sax.saxutils import escape
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.textual_feature import textual_feature as feature, counting_accumulator
+from qcrit.extract_features import main, parse_tess, parse_tess_chunks, FILE_PARSERS, FILE_CHUNK_PARSERS
+from qcrit.tei import parse_tei, parse_tei_chunks
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+_P5 = '''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE TEI SYSTEM "tei_all.dtd">
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+	<teiHeader><fileDesc><titleStmt><title>Ilias</title></titleStmt></fileDesc></teiHeader>
+	<text>
+		<body>
+			<div type="edition">
+				<head>Book 1</head>
+				<p>μῆνιν ἄειδε<note>a note</note> θεὰ &mdash; Πη<lb break="no"/>ληϊάδεω
+					<app><lem>Ἀχιλῆος</lem><rdg>Ἀχιλλῆος</rdg></app>.</p>
+				<sp><speaker>A</speaker><l>one <hi>two</hi> three;</l><l>four</l></sp>
+			</div>
+		</body>
+	</text>
+</TEI>
+'''
+
+_P4 = '''<TEI.2><teiHeader><title>Title</title></teiHeader><text><body><div1 type="book">
+<l>first line<lb/>second</l><milestone unit="card"/>third <corr sic="lien">line</corr>;
+</div1></body></text></TEI.2>
+'''
+
+@feature(tokenize_type='words', accumulator=counting_accumulator((0,), lambda words: (len(words),), lambda n: n))
+def tei_num_words(text):
+	return len(text)
+
+@feature(tokenize_type='sentences', accumulator=counting_accumulator(
+	(0,), lambda sentences: (len(sentences),), lambda n: n
+))
+def tei_num_sentences(text):
+	return len(text)
+
+def _write_tei(tess_file_name, xml_file_name):
+	#A TEI version of a .tess file, with a line element for each tagged line
+	with open(xml_file_name, mode='w', encoding='utf-8') as xml_file:
+		xml_file.write('<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><title>Title</title></teiHeader>\n')
+		xml_file.write('<text><front><p>Preface</p></front><body><div>\n')
+		for chunk in parse_tess_chunks(tess_file_name):
+			xml_file.write(f'\t<l>{escape(chunk.strip())}<note>A note.</note></l>\n')
+		xml_file.write('</div></body></text></TEI>\n')
+
+class TestTei(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def test_parse(self):
+		p5 = io.BytesIO(_P5.encode('utf-8'))
+		self.assertEqual(list(parse_tei_chunks(p5)), [
+			'μῆνιν ἄειδε ', 'θεὰ — Πηληϊάδεω Ἀχιλῆος. ', 'one two three; ', 'four '
+		])
+		p5.seek(0)
+		self.assertEqual(parse_tei(p5, skip=()), (
+			'Book 1 μῆνιν ἄειδε a note θεὰ — Πηληϊάδεω ἈχιλῆοςἈχιλλῆος. A one two three; four '
+		))
+		p5.seek(0)
+		parse_dialogue = partial(parse_tei, include={'teiHeader', 'sp'}, skip={'speaker'})
+		self.assertEqual(parse_dialogue(p5), 'Ilias one two three; four ')
+		self.assertEqual(parse_tei(io.BytesIO(_P4.encode('utf-8'))), 'first line second third line; ')
+		self.assertEqual(parse_tei(io.BytesIO(b'<TEI><teiHeader/></TEI>')), '')
+
+		with TemporaryDirectory() as tmp_dir:
+			file_name = os.path.join(tmp_dir, 'text.xml')
+			with open(file_name, mode='w', encoding='utf-8') as xml_file:
+				xml_file.write(_P5)
+			p5.seek(0)
+			self.assertEqual(parse_tei(file_name), parse_tei(p5))
+			self.assertEqual(''.join(parse_tei_chunks(file_name)), parse_tei(file_name))
+
+	def test_memory(self):
+		#Elements are dropped as they are read, so memory use does not grow with the file
+		data = ('<TEI><text><body><div>' + ''.join(
+			f'<p n="{i}">Some <hi>words</hi> of paragraph {i}.<note>A note.</note></p>' for i in range(50000)
+		) + '</div></body></text></TEI>').encode('utf-8')
+		tracemalloc.start()
+		try:
+			num_chunks = sum(1 for _ in parse_tei_chunks(io.BytesIO(data)))
+			peak = tracemalloc.get_traced_memory()[1]
+		finally:
+			tracemalloc.stop()
+		self.assertEqual(num_chunks, 50000)
+		self.assertLess(peak, len(data) / 10)
+
+	def test_main(self):
+		self.assertIs(FILE_PARSERS['xml'], parse_tei)
+		self.assertIs(FILE_CHUNK_PARSERS['xml'], parse_tei_chunks)
+		with TemporaryDirectory() as tmp_dir:
+			corpus_dir = os.path.join(tmp_dir, 'corpus')
+			os.mkdir(corpus_dir)
+			tess_file_names = sorted(name for name in os.listdir(_DEMO_DIR) if name.endswith('.tess'))
+			for file_name in tess_file_names:
+				_write_tei(os.path.join(_DEMO_DIR, file_name), os.path.join(corpus_dir, file_name[:-len('tess')] + 'xml'))
+			results = []
+			for corpus, parse_functions, options in (
+				(_DEMO_DIR, {'tess': parse_tess}, {}),
+				(corpus_dir, {'xml': FILE_PARSERS['xml']}, {}),
+				(corpus_dir, {'xml': FILE_CHUNK_PARSERS['xml']}, {'streaming': True}),
+				(corpus_dir, {'xml': FILE_CHUNK_PARSERS['xml']}, {'streaming': True, 'jobs': 2}),
+			):
+				output_file = os.path.join(tmp_dir, f'output{len(results)}.pickle')
+				main(
+					corpus_dir=corpus, file_extension_to_parse_function=parse_functions,
+					features=['tei_num_words', 'tei_num_sentences'], output_file=output_file, **options
+				)
+				with open(output_file, mode='rb') as pickle_file:
+					results.append({
+						os.path.splitext(os.path.basename(file_name))[0]: values
+						for file_name, values in pickle.load(pickle_file).items()
+					})
+			self.assertEqual(len(results[0]), len(tess_file_names))
+			for result in results[1:]:
+				self.assertEqual(result, results[0])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,80 @@
+#pylint: disable = missing-docstring, invalid-name, protected-access
+'''Test the persistent token cache'''
+import unittest
+import os
+from threading import Thread
+from tempfile import TemporaryDirectory
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.token_cache import TokenCache
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', '?'))
+
+class TestTokenCache(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def tearDown(self):
+		textual_feature.token_cache = None
+
+	def test_round_trip(self):
+		with TemporaryDirectory() as cache_dir:
+			cache = TokenCache(cache_dir)
+			key = TokenCache.key('words', 'abc', None)
+			self.assertIsNone(cache.get(key))
+			cache.put(key, [(0, 3), (4, 70000)])
+			self.assertEqual(cache.get(key), [(0, 3), (4, 70000)])
+
+	def test_concurrent_puts(self):
+		#Threads sharing a cache directory (e.g. those of concurrent sessions) write the same entries at once
+		with TemporaryDirectory() as cache_dir:
+			errors = []
+			def put():
+				cache = TokenCache(cache_dir)
+				try:
+					for i in range(200):
+						cache.put(TokenCache.key('words', str(i % 5), None), [(0, i)])
+				except Exception as exp: #pylint: disable=broad-except
+					errors.append(exp)
+			threads = [Thread(target=put) for _ in range(4)]
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+			self.assertEqual(errors, [])
+			self.assertEqual(len(os.listdir(cache_dir)), 5)
+
+	def test_key_depends_on_configuration(self):
+		self.assertNotEqual(TokenCache.key('words', 'abc', ('.',)), TokenCache.key('words', 'abc', ('.', '?')))
+		self.assertNotEqual(TokenCache.key('words', 'abc', None), TokenCache.key('sentences', 'abc', None))
+
+	def test_least_recently_used_eviction(self):
+		with TemporaryDirectory() as cache_dir:
+			cache = TokenCache(cache_dir, max_bytes=200)
+			keys = [TokenCache.key('words', str(i), None) for i in range(3)]
+			cache.put(keys[0], [(0, 1)] * 10)
+			cache.put(keys[1], [(0, 1)] * 10)
+			os.utime(cache._path(keys[0]), (0, 0))
+			os.utime(cache._path(keys[1]), (1, 1))
+			cache.get(keys[0])
+			cache.put(keys[2], [(0, 1)] * 10)
+			self.assertIsNotNone(cache.get(keys[0]))
+			self.assertIsNone(cache.get(keys[1]))
+			self.assertIsNotNone(cache.get(keys[2]))
+
+	def test_cached_tokenization_is_identical(self):
+		text = 'a b c . . . d e. f g? h i.'
+		expected = textual_feature._TokenizedText(text)
+		with TemporaryDirectory() as cache_dir:
+			textual_feature.setup_token_cache(cache_dir)
+			for _ in range(2):
+				tokenized = textual_feature._TokenizedText(text)
+				self.assertEqual(tokenized.sentences(), expected.sentences())
+				self.assertEqual(tokenized.words(), expected.words())
+				self.assertEqual(tokenized.sentence_words(), expected.sentence_words())
+			self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+if __name__ == '__main__':
+	unittest.main()
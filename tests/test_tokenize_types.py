@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 #pylint: disable = missing-docstring, blacklisted-name, unused-argument, invalid-name, line-too-long, protected-access
 import unittest
+from collections import Counter
 import re
 
+import numpy as np
 from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktLanguageVars
 
 import context #pylint: disable=unused-import
 from qcrit import textual_feature
+from qcrit.document import Vocabulary, TokenizedDocument
 
 #[^\s\d’”\'\"）\)\]\}\.,:;]
 #[“‘—\-†&vâ\*\^（α-ωΑ-Ὠ`̔]
@@ -110,6 +113,42 @@ class TestParsers(unittest.TestCase):
 		expected = ['a', 'b', '†', 'c', '.', '"', 'a', 'b', '‡', 'c', '"', '.', 'a', 'b', 'c', '.', '"', 'a', 'b', 'c', '†', '.', '"', 'a', 'b', 'c', '.', '“', 'a', 'b', 'c', '†', '”', '.', 'a', 'b', 'c', '.', '“', 'a', '‡', 'b', 'c', '.', '”', 'a', 'b', 'c', '.']
 		self.assertEqual(expected, result)
 
+	def test_shared_tokenization_spaced_ellipsis(self):
+		s = 'a b c . . . d e. f g. . . h i.'
+		tokenized = textual_feature._TokenizedText(s)
+		self.assertEqual(tokenized.sentences(), textual_feature.sentence_tokenizer.tokenize(s))
+		self.assertEqual(tokenized.words(), textual_feature.word_tokenizer.word_tokenize(s))
+		self.assertEqual(
+			tokenized.sentence_words(),
+			[textual_feature.word_tokenizer.word_tokenize(sentence) for sentence in tokenized.sentences()]
+		)
+
+	def test_document(self):
+		s = 'a b c . . . d e. f g; b b a.'
+		tokenized = textual_feature._TokenizedText(s)
+		document = tokenized.document()
+		#The word spans are not kept once the document is built
+		self.assertIsNone(tokenized._word_spans)
+		self.assertEqual([list(sentence) for sentence in document.sentence_words], tokenized.sentence_words())
+		self.assertEqual(list(document.words), [word for sentence in tokenized.sentence_words() for word in sentence])
+		self.assertEqual(document.token_lengths.tolist(), [len(word) for word in document.words])
+		self.assertEqual(document.sentence_words[-1][1:], ['b', 'a', '.'])
+		self.assertEqual(len(document.vocabulary), len(set(document.words)))
+
+	def test_vocabulary_word_lengths(self):
+		vocabulary = Vocabulary()
+		words = [f'w{i}' for i in range(5000)]
+		document = TokenizedDocument(vocabulary, [words[:3000], words[2000:]])
+		self.assertEqual(vocabulary.word_lengths.dtype, np.int32)
+		self.assertEqual(vocabulary.word_lengths.tolist(), [len(word) for word in words])
+		self.assertEqual(document.token_lengths.tolist(), [len(word) for word in words[:3000] + words[2000:]])
+
+	def test_word_counts(self):
+		s = 'a b c . . . d e. f g; b b a.'
+		result = textual_feature.tokenize_types['word_counts']['func'](s)
+		self.assertEqual(result, Counter(textual_feature.tokenize_types['words']['func'](s)))
+		self.assertEqual(result['b'], 3)
+
 '''
 #Plutarch Camillus
 "οὐ μὴν π.,ρῆκεν αὐτῷ τὴν ἀρχὴν ὁ δῆμος, ἀλλὰ  βοῶν μήτε ἱππεύοντος αὐτοῦ μήτε ὁπλομαχοῦντος ἐν τοῖς ἀγῶσι δεῖσθαι, βουλευομένου δὲ μόνον καί προστάττοντος, ἠνάγκασεν ὑποστῆναι τὴν στρατηγίαν καί μεθ' ἑνὸς τῶν συναρχόντων Λευκίου Φουρίου τὸν στρατὸν ἄγειν εὐθὺς ἐπὶ τοὺς πολεμίους."
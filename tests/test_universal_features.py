@@ -0,0 +1,118 @@
+#pylint: disable = missing-docstring, invalid-name
+'''Test the universal features against their original, pure Python implementations'''
+import unittest
+import os
+from statistics import mean, StatisticsError
+from collections import Counter
+from string import punctuation
+from math import nan, isnan
+
+import context #pylint: disable=unused-import
+from qcrit import textual_feature
+from qcrit.extract_features import parse_tess
+from qcrit.features import universal_features
+from qcrit.features.universal_features import _WORD_REGEX
+
+textual_feature.setup_tokenizers(terminal_punctuation=('.', ';', ';')) #'FULL STOP', 'SEMICOLON', 'GREEK QUESTION MARK'
+
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+def average_sentence_length(text):
+	try:
+		return mean(sum(len(word) for word in sentence) for sentence in text)
+	except StatisticsError:
+		return 0
+
+def ratio_capital_to_lowercase(text):
+	capital_cnt = sum(1 for word in text for letter in word if letter.isupper())
+	lowercase_cnt = sum(1 for word in text for letter in word if letter.islower())
+	return capital_cnt / lowercase_cnt if lowercase_cnt else nan
+
+def ratio_lowercase_to_totalchars(text):
+	lowercase_cnt = sum(1 for word in text for letter in word if letter.islower())
+	total_cnt = sum(len(word) for word in text)
+	return lowercase_cnt / total_cnt if total_cnt else 0
+
+def ratio_punctuation_to_spaces(text):
+	punctuation_cnt = sum(text.count(punc) for punc in f'{punctuation}‘’“”') #include slant quotes
+	space_cnt = text.count(' ')
+	return punctuation_cnt / space_cnt if space_cnt else nan
+
+def mean_word_length(text):
+	try:
+		return mean(len(word) for word in text if _WORD_REGEX.match(word))
+	except StatisticsError:
+		return 0
+
+def freq_single_occurrence_words(text):
+	counts = Counter(word for word in text if _WORD_REGEX.match(word))
+	total = sum(counts.values())
+	return sum(freq for _, freq in counts.items() if freq == 1) / total if total else 0
+
+def freq_double_occurrence_words(text):
+	counts = Counter(word for word in text if _WORD_REGEX.match(word))
+	total = sum(counts.values())
+	return sum(freq for _, freq in counts.items() if freq == 2) / total if total else 0
+
+def freq_words_with_word_length_three(text):
+	counts = Counter(
+		'invalid_word_placeholder' if not _WORD_REGEX.match(word) else
+		'valid_word_invalid_len_placeholder' if len(word) != 3 else
+		'valid_word_valid_len_placeholder' for word in text
+	)
+	valid_word_cnt = len(text) - counts['invalid_word_placeholder']
+	return counts['valid_word_valid_len_placeholder'] / valid_word_cnt if valid_word_cnt else 0
+
+def freq_words_in_interval_word_length_4_6_inclusive(text):
+	counts = Counter(
+		'invalid_word_placeholder' if not _WORD_REGEX.match(word) else
+		'valid_word_invalid_len_placeholder' if not 4 <= len(word) <= 6 else
+		'valid_word_valid_len_placeholder' for word in text
+	)
+	valid_word_cnt = len(text) - counts['invalid_word_placeholder']
+	return counts['valid_word_valid_len_placeholder'] / valid_word_cnt if valid_word_cnt else 0
+
+_REFERENCE_FEATURES = {
+	average_sentence_length: 'sentence_words',
+	ratio_capital_to_lowercase: 'words',
+	ratio_lowercase_to_totalchars: 'words',
+	ratio_punctuation_to_spaces: None,
+	mean_word_length: 'words',
+	freq_single_occurrence_words: 'words',
+	freq_double_occurrence_words: 'words',
+	freq_words_with_word_length_three: 'words',
+	freq_words_in_interval_word_length_4_6_inclusive: 'words',
+}
+
+class TestUniversalFeatures(unittest.TestCase):
+
+	def setUp(self):
+		textual_feature.clear_cache()
+
+	def assertEquivalent(self, text, filepath=None):
+		for reference, tokenize_type in _REFERENCE_FEATURES.items():
+			expected = reference(textual_feature.tokenize_types[tokenize_type]['func'](text))
+			result = getattr(universal_features, reference.__name__)(text=text, filepath=filepath)
+			message = f'{reference.__name__} differs for {filepath or repr(text)}'
+			self.assertIs(type(result), type(expected), message)
+			if isnan(expected):
+				self.assertTrue(isnan(result), message)
+			else:
+				self.assertEqual(result, expected, message)
+
+	def test_demo_corpus(self):
+		for file_name in sorted(os.listdir(_DEMO_DIR)):
+			if file_name.endswith(f'{os.extsep}tess'):
+				filepath = os.path.join(_DEMO_DIR, file_name)
+				self.assertEquivalent(parse_tess(filepath), filepath)
+
+	def test_edge_cases(self):
+		for text in (
+			'', ' ', '. ; .', 'ABC DEF.', 'ab abcd. ab abcd.', 'abc abc ab. abc; Abc ǅ ß ΣΊΣΥΦΟΣ ἐγὼ.',
+			'a b c . . . d e. f g; b b a.',
+			'Τί οὖν; ἔφη. Οὐδὲν, ὦ Σώκρατες. 123 456. ﬁne café café.',
+		):
+			self.assertEquivalent(text)
+
+if __name__ == '__main__':
+	unittest.main()